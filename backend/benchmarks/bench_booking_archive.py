@@ -0,0 +1,134 @@
+"""
+Booking archive memory benchmark
+
+Compares the memory held by finished bookings as live Pydantic objects
+against the compact BookingArchive column store, and times rehydration.
+
+    python -m backend.benchmarks.bench_booking_archive --count 1000000
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from backend.services.booking_engine import (
+    Booking,
+    BookingArchive,
+    BookingDetails,
+    BookingStatus,
+    GuestProfile,
+    PaymentStatus,
+    PricingBreakdown,
+)
+
+NATIONALITIES = ["TH", "DE", "GB", "US", "RU", "CN", "FR", "AU", "SG", "JP"]
+PROVINCES = ["Phuket", "Bangkok", "Chiang Mai", "Krabi", "Surat Thani"]
+
+
+def make_booking(i: int, rng: random.Random) -> Booking:
+    """Build a realistic finished booking"""
+
+    check_in = date(2023, 1, 1) + timedelta(days=rng.randrange(900))
+    stay_days = rng.choice([30, 31, 45, 60, 90, 180])
+    base_rent = round(rng.uniform(15_000, 150_000), 2)
+    guest_no = i % 200_000
+    created_at = datetime(2022, 12, 1) + timedelta(seconds=rng.randrange(80_000_000))
+    cancelled = rng.random() < 0.15
+
+    return Booking(
+        booking_id=f"book_{i}",
+        property_id=f"prop_{rng.randrange(50_000)}",
+        guest=GuestProfile(
+            guest_id=f"guest_{guest_no}",
+            first_name=f"First{guest_no % 5_000}",
+            last_name=f"Last{guest_no % 20_000}",
+            email=f"guest{guest_no}@example.com",
+            phone=f"+66{800_000_000 + guest_no}",
+            nationality=rng.choice(NATIONALITIES),
+            passport_number=f"P{guest_no:08d}",
+            thai_address=rng.choice(PROVINCES),
+            previous_bookings=rng.randrange(5)
+        ),
+        details=BookingDetails(
+            check_in=check_in,
+            check_out=check_in + timedelta(days=stay_days),
+            guests_count=rng.randint(1, 4)
+        ),
+        pricing=PricingBreakdown(
+            base_rent=base_rent,
+            service_fee=round(base_rent * 0.05, 2),
+            subtotal=base_rent,
+            total_amount=round(base_rent * 1.05, 2),
+            deposit_required=round(base_rent * 0.3, 2),
+            balance_due=round(base_rent * 0.75, 2)
+        ),
+        status=BookingStatus.CANCELLED if cancelled else BookingStatus.CHECKED_OUT,
+        payment_status=PaymentStatus.REFUNDED if cancelled else PaymentStatus.PAID,
+        created_at=created_at,
+        confirmed_at=created_at + timedelta(hours=2),
+        cancelled_at=created_at + timedelta(days=3) if cancelled else None,
+        tm30_filed=not cancelled,
+        deposit_paid=True,
+        confirmation_sent=True
+    )
+
+
+def measure(build) -> tuple:
+    """Return (result, traced bytes) for a builder callable"""
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    def build_live():
+        rng = random.Random(args.seed)
+        return {f"book_{i}": make_booking(i, rng) for i in range(args.count)}
+
+    started = time.perf_counter()
+    live, live_bytes = measure(build_live)
+    print(f"built {args.count} bookings in {time.perf_counter() - started:.1f}s")
+
+    def build_archive():
+        archive = BookingArchive()
+        for booking in live.values():
+            archive.add(booking)
+        return archive
+
+    started = time.perf_counter()
+    archive, archive_bytes = measure(build_archive)
+    archive_seconds = time.perf_counter() - started
+
+    print(f"live Pydantic objects: {live_bytes / 1e6:,.1f} MB "
+          f"({live_bytes / args.count:,.0f} B/booking)")
+    print(f"archive column store:  {archive_bytes / 1e6:,.1f} MB "
+          f"({archive_bytes / args.count:,.0f} B/booking), "
+          f"built in {archive_seconds:.1f}s")
+    print(f"reduction: {live_bytes / max(archive_bytes, 1):.1f}x")
+
+    sample = random.Random(args.seed).sample(list(live), min(10_000, args.count))
+    started = time.perf_counter()
+    for booking_id in sample:
+        archive.get(booking_id)
+    elapsed = time.perf_counter() - started
+    print(f"rehydrate: {elapsed / len(sample) * 1e6:.1f} us/booking")
+
+    booking_id = sample[0]
+    assert archive.get(booking_id).model_dump() == live[booking_id].model_dump()
+
+
+if __name__ == "__main__":
+    main()
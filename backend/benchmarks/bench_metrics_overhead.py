@@ -0,0 +1,69 @@
+"""
+Metrics overhead benchmark
+
+Times instrumented hot paths with the metrics registry enabled and
+disabled to check the instrumentation is cheap enough to leave on.
+
+    python -m backend.benchmarks.bench_metrics_overhead
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+from backend.benchmarks.data_generator import build_services
+from backend.core.metrics import REGISTRY, render_prometheus
+from backend.core.property_manager import PropertySearchEngine
+
+
+async def measure(iterations: int) -> dict:
+    services = build_services(1_000, 5_000)
+    property_manager = services["property_manager"]
+    today = services["generator"].today
+    search_engine = PropertySearchEngine(property_manager)
+    property_ids = list(property_manager.properties)
+
+    async def pricing():
+        for i in range(iterations):
+            check_in = today + timedelta(days=i % 365)
+            await property_manager.calculate_dynamic_price(
+                property_ids[i % len(property_ids)], check_in, check_in + timedelta(days=60)
+            )
+
+    async def search():
+        for i in range(iterations // 100):
+            await search_engine.search_properties({"location": "phuket"})
+
+    results = {}
+    for name, case in (("calculate_dynamic_price", pricing), ("search_properties", search)):
+        timings = {}
+        for enabled in (False, True, False, True):
+            REGISTRY.enabled = enabled
+            started = time.perf_counter()
+            await case()
+            elapsed = time.perf_counter() - started
+            timings[enabled] = min(timings.get(enabled, elapsed), elapsed)
+        results[name] = timings
+
+    REGISTRY.enabled = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args.iterations))
+    for name, timings in results.items():
+        overhead = timings[True] / timings[False] - 1
+        print(f"{name:<26} off {timings[False]:.3f}s  on {timings[True]:.3f}s  "
+              f"overhead {overhead:+.1%}")
+
+    exposition = render_prometheus()
+    print(f"exposition: {len(exposition.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
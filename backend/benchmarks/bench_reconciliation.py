@@ -0,0 +1,153 @@
+"""
+Settlement reconciliation benchmark
+
+Generates a synthetic ledger and a matching settlement export with a small
+share of injected mismatches, then times the streaming reconciler.
+
+    python -m backend.benchmarks.bench_reconciliation --rows 1000000
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from backend.services.payment_processor import (
+    Currency,
+    PaymentDetails,
+    PaymentMethod,
+    PaymentProvider,
+    PaymentService,
+    PaymentStatus,
+    PaymentTransaction,
+)
+from backend.services.settlement_reconciliation import SettlementReconciler
+
+
+def build_ledger(rows: int, seed: int) -> PaymentService:
+    """Populate a PaymentService with synthetic Stripe transactions"""
+
+    rng = random.Random(seed)
+    service = PaymentService()
+    now = datetime.now()
+
+    for i in range(rows):
+        amount = round(rng.uniform(15_000, 250_000), 2)
+        details = PaymentDetails.model_construct(
+            amount=amount,
+            currency=Currency.THB,
+            payment_method=PaymentMethod.CREDIT_CARD,
+            provider=PaymentProvider.STRIPE
+        )
+        transaction = PaymentTransaction.model_construct(
+            transaction_id=f"stripe_{i}",
+            booking_id=f"book_{i}",
+            payer_id=f"guest_{i % 50_000}",
+            recipient_id=f"owner_{i % 5_000}",
+            payment_details=details,
+            status=PaymentStatus.COMPLETED,
+            gross_amount=amount,
+            fee_amount=round(amount * 0.029, 2),
+            net_amount=round(amount * 0.971, 2),
+            provider_transaction_id=f"ch_{i:010d}",
+            provider_fee=None,
+            created_at=now,
+            completed_at=now
+        )
+        service.transactions[transaction.transaction_id] = transaction
+
+    return service
+
+
+def write_settlement(service: PaymentService, path: str, seed: int, fmt: str) -> int:
+    """Write a Stripe-style export in minor units with ~0.1% mismatches"""
+
+    rng = random.Random(seed + 1)
+    injected = 0
+
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(handle)
+            writer.writerow(["id", "amount", "fee", "currency", "created"])
+
+        for transaction in service.transactions.values():
+            amount = round(transaction.gross_amount * 100)
+            fee = round(transaction.fee_amount * 100)
+            roll = rng.random()
+            if roll < 0.0005:
+                amount += 100
+                injected += 1
+            elif roll < 0.001:
+                fee += 100
+                injected += 1
+            elif roll < 0.0015:
+                injected += 1
+                continue  # missing in settlement
+
+            created = int(transaction.completed_at.timestamp())
+            row = [transaction.provider_transaction_id, amount, fee, "thb", created]
+            if writer:
+                writer.writerow(row)
+            else:
+                handle.write(json.dumps(dict(zip(["id", "amount", "fee", "currency", "created"], row))))
+                handle.write("\n")
+
+    return injected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    service = build_ledger(args.rows, args.seed)
+    print(f"ledger: {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+    fd, path = tempfile.mkstemp(suffix=f".{args.format}")
+    os.close(fd)
+    try:
+        injected = write_settlement(service, path, args.seed, args.format)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"settlement file: {size_mb:.1f} MB, {injected} injected mismatches")
+
+        reconciler = SettlementReconciler(service, chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        reconciler.build_index()
+        index_seconds = time.perf_counter() - started
+
+        # The ledger was built in one go, so its settlement period is a point
+        period = next(iter(service.transactions.values())).completed_at
+        started = time.perf_counter()
+        report = reconciler.reconcile(
+            path, PaymentProvider.STRIPE, period_start=period, period_end=period
+        )
+        elapsed = time.perf_counter() - started
+
+        print(f"index build: {index_seconds:.2f}s")
+        print(f"reconcile (incl. index rebuild): {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+        print(f"mismatches: {report['mismatch_counts']}")
+
+        # Second pass under tracemalloc: index rebuild plus streaming
+        tracemalloc.start()
+        reconciler.reconcile(
+            path, PaymentProvider.STRIPE, period_start=period, period_end=period
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak traced memory per run: {peak / 1e6:.1f} MB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
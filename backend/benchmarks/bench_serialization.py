@@ -0,0 +1,197 @@
+"""
+Serialization benchmark
+
+Compares per-object ``model_dump_json`` with the precompiled FastSerializer
+(full and projected) for Property, Booking and PaymentTransaction pages.
+
+    python -m backend.benchmarks.bench_serialization --count 20 --repeat 2000
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from backend.core.property_manager import (
+    Location,
+    PricingStrategy,
+    Property,
+    PropertyAmenities,
+    PropertyDetails,
+    PropertyStatus,
+    PropertyType,
+)
+from backend.core.serialization import get_serializer
+from backend.services.booking_engine import (
+    Booking,
+    BookingDetails,
+    GuestProfile,
+    PricingBreakdown,
+)
+from backend.services.payment_processor import (
+    Currency,
+    PaymentDetails,
+    PaymentMethod,
+    PaymentProvider,
+    PaymentTransaction,
+)
+
+# Fields a search result card actually renders
+PROPERTY_CARD_FIELDS = [
+    "property_id",
+    "details.title",
+    "details.property_type",
+    "details.bedrooms",
+    "details.location.province",
+    "pricing.base_monthly_rate",
+    "average_rating",
+]
+BOOKING_LIST_FIELDS = [
+    "booking_id",
+    "property_id",
+    "status",
+    "details.check_in",
+    "details.check_out",
+    "pricing.total_amount",
+]
+TRANSACTION_LIST_FIELDS = [
+    "transaction_id",
+    "booking_id",
+    "status",
+    "gross_amount",
+    "created_at",
+]
+
+
+def make_property(i: int) -> Property:
+    now = datetime.now()
+    return Property(
+        property_id=f"prop_{i}",
+        owner_id=f"owner_{i % 100}",
+        details=PropertyDetails(
+            title=f"Sea view villa {i}",
+            description="Private pool villa five minutes from the beach. " * 6,
+            property_type=PropertyType.VILLA,
+            bedrooms=3,
+            bathrooms=3,
+            area_sqm=240.0,
+            amenities=PropertyAmenities(swimming_pool=True, parking=True),
+            location=Location(
+                address=f"{i} Moo 5",
+                district="Thalang",
+                province="Phuket",
+                postal_code="83110",
+                latitude=8.03,
+                longitude=98.30,
+                walkability_score=40,
+                transit_score=20,
+                convenience_score=70
+            ),
+            chanote_title=f"CH-{i}"
+        ),
+        pricing=PricingStrategy(
+            base_monthly_rate=95_000,
+            security_deposit=95_000,
+            minimum_stay_days=30
+        ),
+        status=PropertyStatus.ACTIVE,
+        created_at=now,
+        updated_at=now,
+        photos=[f"https://cdn.siamstay.example/p/{i}/{n}.jpg" for n in range(20)]
+    )
+
+
+def make_booking(i: int) -> Booking:
+    check_in = date(2025, 1, 1) + timedelta(days=i % 300)
+    return Booking(
+        booking_id=f"book_{i}",
+        property_id=f"prop_{i % 500}",
+        guest=GuestProfile(
+            guest_id=f"guest_{i}",
+            first_name="Anna",
+            last_name="Schmidt",
+            email=f"guest{i}@example.com",
+            phone="+66812345678",
+            nationality="DE",
+            passport_number=f"C{i:08d}"
+        ),
+        details=BookingDetails(
+            check_in=check_in,
+            check_out=check_in + timedelta(days=60),
+            guests_count=2
+        ),
+        pricing=PricingBreakdown(
+            base_rent=120_000,
+            service_fee=6_000,
+            subtotal=120_000,
+            total_amount=126_000,
+            deposit_required=40_000,
+            balance_due=86_000
+        ),
+        created_at=datetime.now()
+    )
+
+
+def make_transaction(i: int) -> PaymentTransaction:
+    return PaymentTransaction(
+        transaction_id=f"stripe_{i}",
+        booking_id=f"book_{i}",
+        payer_id=f"guest_{i}",
+        recipient_id=f"owner_{i % 100}",
+        payment_details=PaymentDetails(
+            amount=126_000,
+            currency=Currency.THB,
+            payment_method=PaymentMethod.CREDIT_CARD,
+            provider=PaymentProvider.STRIPE,
+            card_last4="4242",
+            card_brand="visa"
+        ),
+        gross_amount=126_000,
+        fee_amount=3_654,
+        net_amount=122_346,
+        created_at=datetime.now()
+    )
+
+
+def timed(label: str, repeat: int, func, baseline: float = None) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - started) / repeat
+    speedup = f"  {baseline / per_call:5.1f}x" if baseline else ""
+    print(f"  {label:<38} {per_call * 1e6:9.1f} us/page{speedup}")
+    return per_call
+
+
+def bench(name: str, objs, fields, repeat: int):
+    serializer = get_serializer(type(objs[0]))
+    size_full = len(serializer.dumps_many(objs))
+    size_projected = len(serializer.dumps_many(objs, fields))
+    print(f"{name}: {len(objs)} objects/page, "
+          f"{size_full:,} B full, {size_projected:,} B projected")
+
+    baseline = timed(
+        "model_dump_json per object", repeat,
+        lambda: b"[" + b",".join(o.model_dump_json().encode() for o in objs) + b"]"
+    )
+    timed("FastSerializer.dumps_many", repeat,
+          lambda: serializer.dumps_many(objs), baseline)
+    timed("FastSerializer.dumps_many (projected)", repeat,
+          lambda: serializer.dumps_many(objs, fields), baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    bench("Property", [make_property(i) for i in range(args.count)],
+          PROPERTY_CARD_FIELDS, args.repeat)
+    bench("Booking", [make_booking(i) for i in range(args.count)],
+          BOOKING_LIST_FIELDS, args.repeat)
+    bench("PaymentTransaction", [make_transaction(i) for i in range(args.count)],
+          TRANSACTION_LIST_FIELDS, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
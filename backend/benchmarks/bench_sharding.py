@@ -0,0 +1,82 @@
+"""
+Sharded deployment benchmark
+
+Runs a burst of concurrent property searches and price quotes against a
+single in-process PropertySearchEngine and against ShardRouter with
+1..N worker processes. Scaling is bounded by the number of cores.
+
+    python -m backend.benchmarks.bench_sharding --properties 20000 --shards 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from backend.benchmarks.data_generator import DataGenerator
+from backend.core.property_manager import PropertyManager, PropertySearchEngine
+from backend.services.sharding import ShardRouter, ShardStrategy
+
+FILTERS = [
+    {"min_price": 40_000},
+    {"location": "phuket"},
+    {"bedrooms": 3, "max_price": 90_000},
+    {"location": "bangkok", "bedrooms": 2},
+]
+FIELDS = ["property_id", "details.title", "pricing.base_monthly_rate"]
+
+
+async def burst(search, quote, property_ids, check_in, requests: int) -> float:
+    rng = random.Random(1)
+    calls = []
+    for i in range(requests):
+        if i % 2:
+            calls.append(search(rng.choice(FILTERS), 1, 20, FIELDS))
+        else:
+            calls.append(quote(rng.choice(property_ids), check_in, check_in.replace(year=check_in.year + 1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*calls)
+    return requests / (time.perf_counter() - started)
+
+
+async def run(args):
+    generator = DataGenerator(args.seed)
+    properties = list(generator.properties(args.properties))
+    property_ids = [p.property_id for p in properties]
+
+    manager = PropertyManager()
+    manager.properties = {p.property_id: p for p in properties}
+    search_engine = PropertySearchEngine(manager)
+    rate = await burst(
+        search_engine.search_properties, manager.calculate_dynamic_price,
+        property_ids, generator.today, args.requests
+    )
+    print(f"{'in-process':<22} {rate:10,.0f} req/s")
+
+    for shard_count in range(1, args.shards + 1):
+        async with ShardRouter(shard_count, ShardStrategy(args.strategy)) as router:
+            await router.load_properties(properties)
+            rate = await burst(
+                router.search_properties, router.calculate_dynamic_price,
+                property_ids, generator.today, args.requests
+            )
+        print(f"{f'{shard_count} shard(s)':<22} {rate:10,.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--properties", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strategy", choices=[s.value for s in ShardStrategy], default="province")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s), {args.properties} properties, {args.requests} requests")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
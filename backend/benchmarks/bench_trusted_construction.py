@@ -0,0 +1,58 @@
+"""
+Trusted construction benchmark
+
+Compares full validation with trusted construction when rebuilding
+Booking and PaymentTransaction objects from stored ``model_dump()`` records.
+
+    python -m backend.benchmarks.bench_trusted_construction --count 100000
+"""
+
+import argparse
+import time
+
+from backend.benchmarks.bench_serialization import make_booking, make_transaction
+from backend.core.trusted import build_model
+from backend.services.booking_engine import Booking, BookingEngine
+from backend.services.payment_processor import PaymentTransaction
+
+
+def throughput(label: str, model, records, trusted: bool) -> float:
+    started = time.perf_counter()
+    for record in records:
+        build_model(model, record, trusted)
+    rate = len(records) / (time.perf_counter() - started)
+    print(f"  {label:<10} {rate:12,.0f} objects/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    booking_records = [make_booking(i).model_dump() for i in range(args.count)]
+    transaction_records = [
+        make_transaction(i).model_dump() for i in range(args.count)
+    ]
+
+    for name, model, records in (
+        ("Booking", Booking, booking_records),
+        ("PaymentTransaction", PaymentTransaction, transaction_records),
+    ):
+        print(f"{name} ({args.count} records):")
+        validated = throughput("validated", model, records, trusted=False)
+        trusted = throughput("trusted", model, records, trusted=True)
+        print(f"  speedup    {trusted / validated:12.1f}x")
+
+    # Same comparison through the engine's bulk loader
+    for trusted in (False, True):
+        engine = BookingEngine(auto_archive=False)
+        started = time.perf_counter()
+        engine.load_bookings(booking_records, trusted=trusted)
+        elapsed = time.perf_counter() - started
+        mode = "trusted" if trusted else "validated"
+        print(f"BookingEngine.load_bookings ({mode}): {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
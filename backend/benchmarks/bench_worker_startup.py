@@ -0,0 +1,87 @@
+"""
+Worker startup benchmark for the payment provider registry
+
+Measures cold import time of a worker that only handles PromptPay:
+eagerly importing every provider module and SDK (the old factory layout)
+versus resolving just the needed provider through the lazy registry.
+SDKs that are not installed are skipped and listed.
+
+    python -m backend.benchmarks.bench_worker_startup --runs 10
+"""
+
+import argparse
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+
+from backend.services.payment_processor import PROVIDER_REGISTRY
+
+EAGER_WORKER = """
+import importlib, importlib.util, json, sys, time
+started = time.perf_counter()
+from backend.services.payment_processor import PROVIDER_REGISTRY
+for provider in PROVIDER_REGISTRY.providers():
+    PROVIDER_REGISTRY.get_class(provider)
+    for sdk in PROVIDER_REGISTRY.spec(provider).sdk_modules:
+        if importlib.util.find_spec(sdk):
+            importlib.import_module(sdk)
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": len(sys.modules)}))
+"""
+
+LAZY_WORKER = """
+import importlib, importlib.util, json, sys, time
+started = time.perf_counter()
+from backend.services.payment_processor import PaymentProvider, PaymentService, PROVIDER_REGISTRY
+service = PaymentService()
+service.configure_provider(PaymentProvider.PROMPTPAY, merchant_id="bench")
+service.get_processor(PaymentProvider.PROMPTPAY)
+for sdk in PROVIDER_REGISTRY.spec(PaymentProvider.PROMPTPAY).sdk_modules:
+    if importlib.util.find_spec(sdk):
+        importlib.import_module(sdk)
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": len(sys.modules)}))
+"""
+
+
+def run_worker(script: str, runs: int) -> dict:
+    samples = []
+    modules = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output)
+        samples.append(result["seconds"])
+        modules = result["modules"]
+    return {"median": statistics.median(samples), "min": min(samples), "modules": modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    missing = sorted({
+        sdk
+        for provider in PROVIDER_REGISTRY.providers()
+        for sdk in PROVIDER_REGISTRY.spec(provider).sdk_modules
+        if importlib.util.find_spec(sdk) is None
+    })
+    if missing:
+        print(f"SDKs not installed (skipped): {', '.join(missing)}")
+
+    eager = run_worker(EAGER_WORKER, args.runs)
+    lazy = run_worker(LAZY_WORKER, args.runs)
+
+    for name, result in (("eager (all providers)", eager), ("registry (PromptPay)", lazy)):
+        print(f"{name:<24} median {result['median'] * 1e3:8.1f} ms  "
+              f"min {result['min'] * 1e3:8.1f} ms  modules {result['modules']}")
+    print(f"saved: {(eager['median'] - lazy['median']) * 1e3:.1f} ms per worker start")
+
+
+if __name__ == "__main__":
+    main()
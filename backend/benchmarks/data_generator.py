@@ -0,0 +1,294 @@
+"""
+Seeded synthetic data for SiamStay benchmarks
+
+Generates properties, non-overlapping bookings and matching payment
+transactions. The same seed always produces the same dataset.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Any
+
+from backend.core.property_manager import (
+    PricingStrategy,
+    Property,
+    PropertyAmenities,
+    PropertyDetails,
+    PropertyManager,
+    PropertyStatus,
+    PropertyType,
+    Location,
+)
+from backend.core.trusted import construct_trusted
+from backend.services.booking_engine import (
+    Booking,
+    BookingDetails,
+    BookingEngine,
+    BookingStatus,
+    GuestProfile,
+    PaymentStatus as BookingPaymentStatus,
+    PricingBreakdown,
+)
+from backend.services.payment_processor import (
+    Currency,
+    PaymentDetails,
+    PaymentMethod,
+    PaymentProvider,
+    PaymentService,
+    PaymentStatus,
+    PaymentTransaction,
+)
+
+# Province -> (weight, district, postal code, lat, lon)
+PROVINCES = {
+    "Bangkok": (30, "Watthana", "10110", 13.73, 100.57),
+    "Phuket": (25, "Thalang", "83110", 8.03, 98.30),
+    "Chiang Mai": (15, "Mueang Chiang Mai", "50200", 18.79, 98.98),
+    "Chon Buri": (12, "Bang Lamung", "20150", 12.93, 100.88),
+    "Surat Thani": (10, "Ko Samui", "84320", 9.51, 100.01),
+    "Krabi": (8, "Ao Nang", "81180", 8.04, 98.82),
+}
+PROPERTY_TYPES = list(PropertyType)
+NATIONALITIES = ["TH", "DE", "GB", "US", "RU", "CN", "FR", "AU", "SG", "JP", "IN", "KR"]
+STAY_LENGTHS = [30, 31, 45, 60, 90, 120, 180]
+
+# Named dataset sizes: (properties, bookings)
+SCALES = {
+    "small": (1_000, 20_000),
+    "medium": (10_000, 200_000),
+    "large": (100_000, 1_000_000),
+}
+
+
+class DataGenerator:
+    """Deterministic generator for benchmark datasets"""
+
+    def __init__(self, seed: int = 42, today: date = date(2025, 6, 1)):
+        self.seed = seed
+        self.today = today
+        self.now = datetime.combine(today, datetime.min.time())
+        self._provinces = list(PROVINCES)
+        self._province_weights = [PROVINCES[p][0] for p in self._provinces]
+
+    def properties(self, count: int) -> Iterator[Property]:
+        """Yield ``count`` properties, ~90% of them active"""
+
+        rng = random.Random(self.seed)
+        for i in range(count):
+            province = rng.choices(self._provinces, self._province_weights)[0]
+            _, district, postal_code, lat, lon = PROVINCES[province]
+            property_type = rng.choice(PROPERTY_TYPES)
+            base_rate = round(rng.lognormvariate(10.6, 0.5), -2) + 5_000
+            created_at = self.now - timedelta(days=rng.randrange(30, 1_500))
+
+            yield construct_trusted(Property, {
+                "property_id": f"prop_{i:06d}",
+                "owner_id": f"owner_{i // 3:06d}",
+                "details": construct_trusted(PropertyDetails, {
+                    "title": f"{property_type.value.title()} {i} in {district}",
+                    "description": "Long-stay rental with fast wifi and workspace.",
+                    "property_type": property_type,
+                    "bedrooms": rng.randint(0 if property_type == PropertyType.STUDIO else 1, 6),
+                    "bathrooms": rng.randint(1, 4),
+                    "area_sqm": float(rng.randrange(25, 450)),
+                    "amenities": construct_trusted(PropertyAmenities, {
+                        "swimming_pool": rng.random() < 0.4,
+                        "gym": rng.random() < 0.3,
+                        "parking": rng.random() < 0.6,
+                        "workspace": rng.random() < 0.5,
+                        "washing_machine": rng.random() < 0.7,
+                    }),
+                    "location": construct_trusted(Location, {
+                        "address": f"{rng.randint(1, 999)}/{rng.randint(1, 99)}",
+                        "district": district,
+                        "province": province,
+                        "postal_code": postal_code,
+                        "latitude": lat + rng.uniform(-0.15, 0.15),
+                        "longitude": lon + rng.uniform(-0.15, 0.15),
+                    }),
+                    "chanote_title": f"CH-{i}" if rng.random() < 0.95 else None,
+                    "juristic_person_approval": rng.random() < 0.8,
+                }),
+                "pricing": construct_trusted(PricingStrategy, {
+                    "base_monthly_rate": base_rate,
+                    "cleaning_fee": 1_500.0,
+                    "security_deposit": base_rate,
+                    "minimum_stay_days": 30,
+                    "monthly_discount": rng.choice([0.0, 0.05, 0.1]),
+                    "long_term_discount": rng.choice([0.0, 0.1, 0.15]),
+                }),
+                "status": (
+                    PropertyStatus.ACTIVE if rng.random() < 0.9
+                    else rng.choice(list(PropertyStatus))
+                ),
+                "created_at": created_at,
+                "updated_at": created_at,
+                "published_at": created_at + timedelta(days=rng.randrange(1, 30)),
+                "photos": [f"https://cdn.siamstay.example/{i}/{n}.jpg" for n in range(8)],
+                "views_count": rng.randrange(20_000),
+                "bookings_count": rng.randrange(200),
+                "average_rating": round(rng.uniform(3.0, 5.0), 2),
+            })
+
+    def bookings(
+        self,
+        properties: List[Property],
+        count: int
+    ) -> Iterator[Booking]:
+        """Yield ``count`` non-overlapping bookings spread over ``properties``"""
+
+        rng = random.Random(self.seed + 1)
+        per_property = max(count // max(len(properties), 1), 1)
+        made = 0
+
+        for prop in properties:
+            # Walk forward laying down consecutive stays; the average stay plus
+            # gap is ~87 days, so starting here leaves ~95% of them historical
+            cursor = self.today - timedelta(days=int(per_property * 87 * 0.95))
+            for _ in range(per_property):
+                if made >= count:
+                    return
+                cursor += timedelta(days=rng.randrange(0, 15))
+                stay_days = rng.choice(STAY_LENGTHS)
+                check_in, check_out = cursor, cursor + timedelta(days=stay_days)
+                cursor = check_out
+                yield self._booking(made, prop, check_in, check_out, rng)
+                made += 1
+
+    def _booking(
+        self,
+        index: int,
+        prop: Property,
+        check_in: date,
+        check_out: date,
+        rng: random.Random
+    ) -> Booking:
+        stay_days = (check_out - check_in).days
+        base_rent = round(prop.pricing.base_monthly_rate * stay_days / 30, 2)
+        service_fee = round(base_rent * 0.05, 2)
+        total = base_rent + service_fee + (prop.pricing.cleaning_fee or 0)
+
+        if check_out <= self.today:
+            status = BookingStatus.CANCELLED if rng.random() < 0.1 else BookingStatus.CHECKED_OUT
+        elif check_in <= self.today:
+            status = BookingStatus.CHECKED_IN
+        else:
+            status = BookingStatus.CONFIRMED if rng.random() < 0.8 else BookingStatus.PENDING
+
+        guest_no = rng.randrange(max(index // 3, 1))
+        created_at = datetime.combine(check_in, datetime.min.time()) - timedelta(
+            days=rng.randrange(7, 120)
+        )
+
+        return construct_trusted(Booking, {
+            "booking_id": f"book_{index:07d}",
+            "property_id": prop.property_id,
+            "guest": construct_trusted(GuestProfile, {
+                "guest_id": f"guest_{guest_no:07d}",
+                "first_name": f"Guest{guest_no}",
+                "last_name": "Traveller",
+                "email": f"guest{guest_no}@example.com",
+                "phone": f"+66{800_000_000 + guest_no}",
+                "nationality": rng.choice(NATIONALITIES),
+                "passport_number": f"P{guest_no:08d}",
+            }),
+            "details": construct_trusted(BookingDetails, {
+                "check_in": check_in,
+                "check_out": check_out,
+                "guests_count": rng.randint(1, 4),
+            }),
+            "pricing": construct_trusted(PricingBreakdown, {
+                "base_rent": base_rent,
+                "cleaning_fee": prop.pricing.cleaning_fee or 0.0,
+                "service_fee": service_fee,
+                "security_deposit": prop.pricing.security_deposit,
+                "subtotal": base_rent,
+                "total_amount": total,
+                "deposit_required": round(total * 0.3, 2),
+                "balance_due": round(total * 0.7, 2),
+            }),
+            "status": status,
+            "payment_status": (
+                BookingPaymentStatus.PENDING if status == BookingStatus.PENDING
+                else BookingPaymentStatus.REFUNDED if status == BookingStatus.CANCELLED
+                else BookingPaymentStatus.PAID
+            ),
+            "created_at": created_at,
+            "confirmed_at": (
+                None if status == BookingStatus.PENDING
+                else created_at + timedelta(hours=2)
+            ),
+        })
+
+    def transactions(
+        self,
+        bookings: List[Booking],
+        owners: Dict[str, str]
+    ) -> Iterator[PaymentTransaction]:
+        """Yield one payment transaction per non-pending booking"""
+
+        rng = random.Random(self.seed + 2)
+        providers = [
+            (PaymentProvider.STRIPE, PaymentMethod.CREDIT_CARD, 0.029),
+            (PaymentProvider.PROMPTPAY, PaymentMethod.PROMPTPAY, 0.0),
+            (PaymentProvider.BINANCE_PAY, PaymentMethod.CRYPTOCURRENCY, 0.01),
+        ]
+
+        for i, booking in enumerate(bookings):
+            if booking.status == BookingStatus.PENDING:
+                continue
+            provider, method, fee_rate = rng.choices(providers, [60, 35, 5])[0]
+            amount = booking.pricing.total_amount
+            created_at = booking.confirmed_at or booking.created_at
+
+            yield construct_trusted(PaymentTransaction, {
+                "transaction_id": f"{provider.value}_{i:07d}",
+                "booking_id": booking.booking_id,
+                "payer_id": booking.guest.guest_id,
+                "recipient_id": owners[booking.property_id],
+                "payment_details": construct_trusted(PaymentDetails, {
+                    "amount": amount,
+                    "currency": Currency.THB,
+                    "payment_method": method,
+                    "provider": provider,
+                }),
+                "status": (
+                    PaymentStatus.REFUNDED if booking.status == BookingStatus.CANCELLED
+                    else PaymentStatus.COMPLETED
+                ),
+                "gross_amount": amount,
+                "fee_amount": round(amount * fee_rate, 2),
+                "net_amount": round(amount * (1 - fee_rate), 2),
+                "provider_transaction_id": f"{provider.value[:2]}_{i:010d}",
+                "created_at": created_at,
+                "completed_at": created_at + timedelta(minutes=5),
+            })
+
+
+def build_services(
+    property_count: int,
+    booking_count: int,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Build populated PropertyManager, BookingEngine and PaymentService"""
+
+    generator = DataGenerator(seed)
+
+    property_manager = PropertyManager()
+    properties = list(generator.properties(property_count))
+    property_manager.properties = {p.property_id: p for p in properties}
+
+    bookings = list(generator.bookings(properties, booking_count))
+    booking_engine = BookingEngine()
+    booking_engine.load_bookings(bookings)
+
+    owners = {p.property_id: p.owner_id for p in properties}
+    payment_service = PaymentService()
+    payment_service.load_transactions(generator.transactions(bookings, owners))
+
+    return {
+        "generator": generator,
+        "property_manager": property_manager,
+        "booking_engine": booking_engine,
+        "payment_service": payment_service,
+    }
@@ -0,0 +1,263 @@
+"""
+SiamStay benchmark suite
+
+Builds a seeded synthetic dataset and times the hot paths: search,
+availability, dynamic pricing, concurrent booking creation and analytics.
+Results are written as JSON so runs from different commits can be compared.
+
+    python -m backend.benchmarks.run_suite --scale medium --output bench.json
+    python -m backend.benchmarks.run_suite --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.benchmarks.data_generator import SCALES, build_services
+from backend.core.property_manager import PropertySearchEngine, PropertyType
+from backend.services.booking_engine import AvailabilityCalendar
+
+SEARCH_FILTERS = [
+    {},
+    {"location": "phuket"},
+    {"location": "bangkok", "min_price": 20_000, "max_price": 60_000},
+    {"property_type": PropertyType.VILLA, "bedrooms": 3},
+    {"location": "chiang mai", "property_type": PropertyType.CONDO, "max_price": 30_000},
+]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles for one case"""
+
+    ordered = sorted(latencies)
+    percentile = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {
+        "ops": len(ordered),
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 1),
+        "p50_us": round(percentile(0.50) * 1e6, 1),
+        "p95_us": round(percentile(0.95) * 1e6, 1),
+        "p99_us": round(percentile(0.99) * 1e6, 1),
+    }
+
+
+async def run_case(
+    operation: Callable[[int], Awaitable[Any]],
+    iterations: int
+) -> Dict[str, float]:
+    """Time ``operation(i)`` sequentially ``iterations`` times"""
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        op_started = time.perf_counter()
+        await operation(i)
+        latencies.append(time.perf_counter() - op_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def run_suite(scale: str, seed: int, iterations: int) -> Dict[str, Any]:
+    property_count, booking_count = SCALES[scale]
+
+    started = time.perf_counter()
+    services = build_services(property_count, booking_count, seed)
+    setup_seconds = time.perf_counter() - started
+
+    property_manager = services["property_manager"]
+    booking_engine = services["booking_engine"]
+    payment_service = services["payment_service"]
+    generator = services["generator"]
+    search_engine = PropertySearchEngine(property_manager, booking_engine.availability)
+
+    rng = random.Random(seed)
+    property_ids = list(property_manager.properties)
+    results: Dict[str, Any] = {}
+
+    async def search(i: int):
+        await search_engine.search_properties(
+            SEARCH_FILTERS[i % len(SEARCH_FILTERS)], page=1 + i % 3
+        )
+    results["search_properties"] = await run_case(search, max(iterations // 10, 50))
+
+    async def sorted_search(i: int):
+        await search_engine.search_properties(
+            SEARCH_FILTERS[i % len(SEARCH_FILTERS)], page=1 + i % 3,
+            sort=("price_asc", "rating", "conversion", "recency")[i % 4], facets=True
+        )
+    results["sorted_search"] = await run_case(sorted_search, max(iterations // 10, 50))
+
+    def random_window():
+        check_in = generator.today + timedelta(days=rng.randrange(0, 365))
+        return check_in, check_in + timedelta(days=rng.choice([30, 60, 90]))
+
+    async def availability(i: int):
+        check_in, check_out = random_window()
+        booking_engine.availability.check_availability(
+            rng.choice(property_ids), check_in, check_out
+        )
+    results["check_availability"] = await run_case(availability, iterations)
+
+    async def next_window(i: int):
+        booking_engine.availability.earliest_check_in(
+            rng.choice(property_ids), rng.choice([30, 60, 90]),
+            generator.today, generator.today + timedelta(days=365)
+        )
+    results["earliest_check_in"] = await run_case(next_window, iterations)
+
+    async def flexible_search(i: int):
+        await search_engine.search_properties({
+            **SEARCH_FILTERS[i % len(SEARCH_FILTERS)],
+            "flexible_dates": {
+                "stay_days": 60,
+                "earliest_check_in": generator.today,
+                "latest_check_in": generator.today + timedelta(days=90),
+            },
+        })
+    results["flexible_search"] = await run_case(flexible_search, max(iterations // 10, 50))
+
+    calendar = AvailabilityCalendar()
+
+    async def block(i: int):
+        check_in, check_out = random_window()
+        calendar.block_dates(f"bench_{i % 1_000}", check_in, check_out, f"bench_book_{i}")
+    results["block_dates"] = await run_case(block, iterations)
+
+    async def price(i: int):
+        check_in, check_out = random_window()
+        await property_manager.calculate_dynamic_price(
+            rng.choice(property_ids), check_in, check_out
+        )
+    results["calculate_dynamic_price"] = await run_case(price, iterations)
+
+    for concurrency in (1, 16, 128):
+        results[f"create_booking_c{concurrency}"] = await bench_create_booking(
+            booking_engine, concurrency, iterations, generator.today
+        )
+
+    results["get_booking_analytics"] = await run_case(
+        lambda i: booking_engine.get_booking_analytics(), 5
+    )
+    results["get_payment_analytics"] = await run_case(
+        lambda i: payment_service.get_payment_analytics(), 5
+    )
+
+    return {
+        "meta": {
+            "scale": scale,
+            "seed": seed,
+            "properties": property_count,
+            "bookings": booking_count,
+            "transactions": len(payment_service.transactions),
+            "setup_seconds": round(setup_seconds, 2),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+async def bench_create_booking(
+    booking_engine,
+    concurrency: int,
+    total: int,
+    today: date
+) -> Dict[str, float]:
+    """Create ``total`` bookings with ``concurrency`` in-flight requests"""
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def create(i: int):
+        # Fresh property per request so availability never conflicts
+        check_in = today + timedelta(days=30 + i % 300)
+        async with semaphore:
+            op_started = time.perf_counter()
+            await booking_engine.create_booking(
+                f"bench_c{concurrency}_{i}",
+                {
+                    "guest_id": f"bench_guest_{i}",
+                    "first_name": "Bench",
+                    "last_name": "Guest",
+                    "email": f"bench{i}@example.com",
+                    "phone": "+66800000000",
+                    "nationality": "DE",
+                },
+                {
+                    "check_in": check_in,
+                    "check_out": check_in + timedelta(days=60),
+                    "guests_count": 2,
+                },
+                {
+                    "base_rent": 60_000,
+                    "subtotal": 60_000,
+                    "total_amount": 63_000,
+                    "deposit_required": 20_000,
+                    "balance_due": 43_000,
+                },
+            )
+            latencies.append(time.perf_counter() - op_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(create(i) for i in range(total)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print throughput change per case against a previous results file"""
+
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta']['scale']}):")
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+        change = result["ops_per_sec"] / max(previous["ops_per_sec"], 1e-9) - 1
+        flag = "  REGRESSION" if change < -0.10 else ""
+        print(f"  {name:<28} {change:+7.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=2_000)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_suite(args.scale, args.seed, args.iterations))
+
+    for name, result in report["results"].items():
+        print(f"{name:<28} {result['ops_per_sec']:>12,.1f} ops/s  "
+              f"p50 {result['p50_us']:>10,.1f} us  p95 {result['p95_us']:>10,.1f} us")
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(report, json.load(handle))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Bulk Compliance Engine for SiamStay
+Incrementally re-checks only properties whose compliance inputs changed
+"""
+
+from typing import Dict, List, Optional, Any, Set, Tuple
+from datetime import datetime
+import asyncio
+import logging
+
+from backend.core.metrics import timed
+from backend.core.property_manager import (
+    Property,
+    PropertyManager,
+    compliance_issues,
+)
+
+logger = logging.getLogger(__name__)
+
+# Field paths that feed compliance_issues()
+COMPLIANCE_FIELDS = (
+    "details.chanote_title",
+    "details.property_type",
+    "details.juristic_person_approval",
+    "pricing.minimum_stay_days",
+)
+
+
+def _is_relevant(path: str) -> bool:
+    """Whether a changed field path can affect compliance"""
+    return any(
+        field == path or field.startswith(path + ".")
+        for field in COMPLIANCE_FIELDS
+    )
+
+
+def compliance_fingerprint(property_obj: Property) -> Tuple[Any, ...]:
+    """Snapshot of the compliance inputs, to detect out-of-band edits"""
+    details = property_obj.details
+    return (
+        details.chanote_title,
+        details.property_type,
+        details.juristic_person_approval,
+        property_obj.pricing.minimum_stay_days,
+    )
+
+
+class BulkComplianceEngine:
+    """Dirty-tracking compliance checker with a non-compliance index
+
+    Subscribes to ``PropertyManager`` change notifications and only
+    re-checks properties whose compliance-relevant fields changed. The
+    index of non-compliant properties (overall and per issue) is kept
+    up to date for the admin dashboard.
+    """
+
+    def __init__(self, property_manager: PropertyManager, batch_size: int = 1000):
+        self.property_manager = property_manager
+        self.batch_size = batch_size
+
+        self._dirty: Set[str] = set(property_manager.properties)
+        self._fingerprints: Dict[str, Tuple[Any, ...]] = {}
+
+        # property_id -> issues, only for non-compliant properties
+        self.issues: Dict[str, List[str]] = {}
+        # issue -> property_ids
+        self.by_issue: Dict[str, Set[str]] = {}
+        self.last_run_at: Optional[datetime] = None
+
+        property_manager.add_change_listener(self._on_property_change)
+
+    def _on_property_change(self, property_id: str, changed: Set[str]):
+        if not changed or any(_is_relevant(path) for path in changed):
+            self._dirty.add(property_id)
+
+    def mark_dirty(self, property_id: str):
+        """Force a re-check of one property on the next run"""
+        self._dirty.add(property_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def detect_changes(self) -> int:
+        """Mark properties edited without going through ``update_property``
+
+        Compares cheap fingerprints instead of re-running the rules.
+        """
+
+        found = 0
+        for property_id, property_obj in self.property_manager.properties.items():
+            if property_id in self._dirty:
+                continue
+            if self._fingerprints.get(property_id) != compliance_fingerprint(property_obj):
+                self._dirty.add(property_id)
+                found += 1
+        return found
+
+    def _set_issues(self, property_id: str, issues: List[str]):
+        for issue in self.issues.pop(property_id, ()):
+            holders = self.by_issue.get(issue)
+            if holders:
+                holders.discard(property_id)
+                if not holders:
+                    del self.by_issue[issue]
+
+        if issues:
+            self.issues[property_id] = issues
+            for issue in issues:
+                self.by_issue.setdefault(issue, set()).add(property_id)
+
+    @timed("compliance")
+    async def run(self, detect_out_of_band: bool = False) -> Dict[str, Any]:
+        """Re-check all dirty properties in batches
+
+        The event loop is yielded between batches; properties changed
+        meanwhile are marked dirty again for the next run.
+        """
+
+        if detect_out_of_band:
+            self.detect_changes()
+
+        dirty = list(self._dirty)
+        self._dirty.clear()
+        properties = self.property_manager.properties
+        checked_at = datetime.now()
+        checked = newly_compliant = newly_non_compliant = 0
+
+        for start in range(0, len(dirty), self.batch_size):
+            if start:
+                await asyncio.sleep(0)
+            for property_id in dirty[start:start + self.batch_size]:
+                property_obj = properties.get(property_id)
+                if property_obj is None:
+                    # Deleted since it was marked
+                    self._set_issues(property_id, [])
+                    self._fingerprints.pop(property_id, None)
+                    continue
+
+                issues = compliance_issues(property_obj)
+                compliant = not issues
+                if compliant != property_obj.compliance_check:
+                    if compliant:
+                        newly_compliant += 1
+                    else:
+                        newly_non_compliant += 1
+                    property_obj.compliance_check = compliant
+                    property_obj.updated_at = checked_at
+
+                self._set_issues(property_id, issues)
+                self._fingerprints[property_id] = compliance_fingerprint(property_obj)
+                checked += 1
+
+        self.last_run_at = checked_at
+        logger.info(
+            "Compliance run checked %d of %d properties, %d non-compliant",
+            checked, len(properties), len(self.issues)
+        )
+
+        return {
+            "checked": checked,
+            "skipped": len(properties) - checked,
+            "newly_compliant": newly_compliant,
+            "newly_non_compliant": newly_non_compliant,
+            "non_compliant_total": len(self.issues),
+            "checked_at": checked_at
+        }
+
+    def non_compliant(
+        self,
+        issue: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        """Page through non-compliant properties, optionally by issue"""
+
+        if issue is None:
+            property_ids = sorted(self.issues)
+        else:
+            property_ids = sorted(self.by_issue.get(issue, ()))
+
+        start = (page - 1) * page_size
+        return {
+            "properties": [
+                {"property_id": property_id, "issues": self.issues[property_id]}
+                for property_id in property_ids[start:start + page_size]
+            ],
+            "total_count": len(property_ids),
+            "page": page,
+            "page_size": page_size
+        }
+
+    def issue_counts(self) -> Dict[str, int]:
+        """Number of properties affected by each issue"""
+        return {issue: len(holders) for issue, holders in self.by_issue.items()}
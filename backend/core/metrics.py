@@ -0,0 +1,246 @@
+"""
+Metrics for SiamStay
+Lightweight counters, histograms and timers with Prometheus text exposition
+"""
+
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
+import asyncio
+
+# Latency buckets in seconds, tuned for in-process service calls
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+    0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[Tuple[str, Labels, Tuple[Tuple[str, str], ...], float]]:
+        return [
+            (self.name, labels, (), value)
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        state = self._values.get(labels)
+        return int(sum(state[:-1])) if state else 0
+
+    def sum(self, labels: Labels = ()) -> float:
+        state = self._values.get(labels)
+        return state[-1] if state else 0.0
+
+    def samples(self) -> List[Tuple[str, Labels, Tuple[Tuple[str, str], ...], float]]:
+        samples = []
+        for labels, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                samples.append(
+                    (f"{self.name}_bucket", labels, (("le", _format_value(bound)),), cumulative)
+                )
+            cumulative += state[len(self.buckets)]
+            samples.append((f"{self.name}_bucket", labels, (("le", "+Inf"),), cumulative))
+            samples.append((f"{self.name}_sum", labels, (), state[-1]))
+            samples.append((f"{self.name}_count", labels, (), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Named collection of metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self.enabled = True
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def metrics(self) -> List[Any]:
+        return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def reset(self):
+        """Clear all recorded values (metric definitions are kept)"""
+        for metric in self._metrics.values():
+            metric._values.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+# Shared metrics used across services
+OPERATION_SECONDS = REGISTRY.histogram(
+    "siamstay_operation_seconds",
+    "Latency of service operations",
+    ("component", "operation"),
+)
+OPERATION_ERRORS = REGISTRY.counter(
+    "siamstay_operation_errors_total",
+    "Service operations that raised",
+    ("component", "operation"),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "siamstay_cache_requests_total",
+    "Cache lookups by result",
+    ("cache", "result"),
+)
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    "siamstay_lock_wait_seconds",
+    "Time spent waiting to acquire a lock",
+    ("lock",),
+)
+
+
+def timed(component: str, operation: Optional[str] = None) -> Callable:
+    """Decorator recording latency and errors of a sync or async callable"""
+
+    def decorator(func: Callable) -> Callable:
+        labels = (component, operation or func.__name__)
+        observe = OPERATION_SECONDS.observe
+        errors = OPERATION_ERRORS.inc
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not REGISTRY.enabled:
+                    return await func(*args, **kwargs)
+                started = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors(labels)
+                    raise
+                finally:
+                    observe(perf_counter() - started, labels)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors(labels)
+                raise
+            finally:
+                observe(perf_counter() - started, labels)
+        return wrapper
+
+    return decorator
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    if REGISTRY.enabled:
+        CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+
+@asynccontextmanager
+async def timed_lock(lock: asyncio.Lock, name: str):
+    """Acquire ``lock``, recording how long the caller waited for it"""
+
+    started = perf_counter()
+    async with lock:
+        if REGISTRY.enabled:
+            LOCK_WAIT_SECONDS.observe(perf_counter() - started, (name,))
+        yield
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return f"{value:.1f}"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample_name, labels, extra, value in metric.samples():
+            pairs = list(zip(metric.labelnames, labels)) + list(extra)
+            value_text = str(value) if isinstance(value, int) else _format_value(value)
+            if pairs:
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+                lines.append(f"{sample_name}{{{label_text}}} {value_text}")
+            else:
+                lines.append(f"{sample_name} {value_text}")
+    return "\n".join(lines) + "\n"
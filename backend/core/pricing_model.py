@@ -0,0 +1,322 @@
+"""
+Pricing Model for SiamStay
+Nightly batch scoring of per-(property, month) price factors
+"""
+
+from typing import Dict, List, Optional, Any, Iterable, Set, Tuple
+from datetime import datetime, date
+import asyncio
+import json
+import logging
+import os
+
+from backend.core.metrics import timed
+from backend.core.property_manager import Property, PropertyAmenities, PropertyManager
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL_FEATURES = ["province", "property_type"]
+NUMERIC_FEATURES = [
+    "bedrooms",
+    "bathrooms",
+    "area_sqm",
+    "base_monthly_rate",
+    "amenity_count",
+    "average_rating",
+    "bookings_count",
+    "views_count",
+    "month_sin",
+    "month_cos",
+]
+
+
+def add_months(day: date, months: int) -> Tuple[int, int]:
+    """(year, month) ``months`` after the month of ``day``"""
+    index = day.year * 12 + day.month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+class PriceFactorCache:
+    """Price factors by property and (year, month), read in O(1) at quote time"""
+
+    def __init__(self):
+        self.factors: Dict[str, Dict[Tuple[int, int], float]] = {}
+        self.model_version: Optional[str] = None
+        self.generated_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return sum(len(months) for months in self.factors.values())
+
+    def get(self, property_id: str, year: int, month: int) -> Optional[float]:
+        months = self.factors.get(property_id)
+        if months is None:
+            return None
+        return months.get((year, month))
+
+    def replace(
+        self,
+        rows: Iterable[Tuple[str, int, int, float]],
+        model_version: str
+    ):
+        """Swap in the results of a batch run as one unit"""
+
+        factors: Dict[str, Dict[Tuple[int, int], float]] = {}
+        for property_id, year, month, factor in rows:
+            factors.setdefault(property_id, {})[(year, month)] = factor
+        self.factors = factors
+        self.model_version = model_version
+        self.generated_at = datetime.now()
+
+    def invalidate(self, property_id: str):
+        self.factors.pop(property_id, None)
+
+    def save(self, path: str):
+        payload = {
+            "model_version": self.model_version,
+            "generated_at": self.generated_at.isoformat() if self.generated_at else None,
+            "factors": [
+                [property_id, year, month, factor]
+                for property_id, months in self.factors.items()
+                for (year, month), factor in months.items()
+            ],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PriceFactorCache":
+        with open(path, encoding="utf-8") as handle:
+            payload = json.load(handle)
+
+        cache = cls()
+        cache.replace(
+            (tuple(row) for row in payload["factors"]),
+            payload["model_version"]
+        )
+        if payload["generated_at"]:
+            cache.generated_at = datetime.fromisoformat(payload["generated_at"])
+        return cache
+
+
+def property_features(properties: List[Property]):
+    """One feature row per property (missing values are left as NaN)"""
+
+    import pandas as pd
+
+    amenity_fields = list(PropertyAmenities.model_fields)
+    return pd.DataFrame({
+        "property_id": [p.property_id for p in properties],
+        "province": [p.details.location.province for p in properties],
+        "property_type": [p.details.property_type.value for p in properties],
+        "bedrooms": [p.details.bedrooms for p in properties],
+        "bathrooms": [p.details.bathrooms for p in properties],
+        "area_sqm": [p.details.area_sqm for p in properties],
+        "base_monthly_rate": [p.pricing.base_monthly_rate for p in properties],
+        "amenity_count": [
+            sum(getattr(p.details.amenities, name) for name in amenity_fields)
+            for p in properties
+        ],
+        "average_rating": [p.average_rating for p in properties],
+        "bookings_count": [p.bookings_count for p in properties],
+        "views_count": [p.views_count for p in properties],
+    }).astype({"area_sqm": float, "average_rating": float})
+
+
+def _add_month_features(frame):
+    import numpy as np
+
+    angle = 2 * np.pi * (frame["month"].to_numpy() - 1) / 12
+    frame["month_sin"] = np.sin(angle)
+    frame["month_cos"] = np.cos(angle)
+    return frame
+
+
+def feature_frame(properties: List[Property], months: List[Tuple[int, int]]):
+    """One row per (property, month): the property rows crossed with months"""
+
+    import numpy as np
+
+    per_property = property_features(properties)
+    frame = per_property.loc[per_property.index.repeat(len(months))].reset_index(drop=True)
+    frame["year"] = np.tile([year for year, _ in months], len(properties))
+    frame["month"] = np.tile([month for _, month in months], len(properties))
+    return _add_month_features(frame)
+
+
+class PricePredictor:
+    """Gradient-boosted regressor of the price factor over the base rate"""
+
+    def __init__(self, pipeline: Any = None, version: Optional[str] = None):
+        self.pipeline = pipeline
+        self.version = version
+
+    @classmethod
+    def train(cls, frame, target, version: Optional[str] = None) -> "PricePredictor":
+        """Fit on a feature frame and observed factors (realized / base rate)"""
+
+        from sklearn.compose import ColumnTransformer
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import OneHotEncoder
+
+        pipeline = Pipeline([
+            ("features", ColumnTransformer([
+                ("categorical", OneHotEncoder(handle_unknown="ignore", sparse_output=False), CATEGORICAL_FEATURES),
+                ("numeric", "passthrough", NUMERIC_FEATURES),
+            ])),
+            ("model", HistGradientBoostingRegressor(max_iter=200, learning_rate=0.05)),
+        ])
+        pipeline.fit(frame[CATEGORICAL_FEATURES + NUMERIC_FEATURES], target)
+        return cls(pipeline, version or datetime.now().strftime("%Y%m%d%H%M%S"))
+
+    def predict(self, frame):
+        return self.pipeline.predict(frame[CATEGORICAL_FEATURES + NUMERIC_FEATURES])
+
+    def save(self, path: str):
+        import joblib
+        joblib.dump({"pipeline": self.pipeline, "version": self.version}, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PricePredictor":
+        import joblib
+        payload = joblib.load(path)
+        return cls(payload["pipeline"], payload["version"])
+
+
+def training_frame(properties: Dict[str, Property], booking_engine: Any):
+    """Observed (property, check-in month) factors from booking history
+
+    The factor is the booked nightly rent over the listed nightly rate.
+    Archived bookings are read column-wise from the booking archive.
+    """
+
+    import pandas as pd
+
+    archive = booking_engine.archive
+    live = list(booking_engine.bookings.values())
+    bookings = pd.DataFrame({
+        "property_id": archive.column("property_id") + [b.property_id for b in live],
+        "check_in": archive.column("details", "check_in") + [b.details.check_in for b in live],
+        "nights": archive.column("details", "stay_duration_days") + [b.details.stay_duration_days for b in live],
+        "base_rent": archive.column("pricing", "base_rent") + [b.pricing.base_rent for b in live],
+    })
+    bookings = bookings[
+        bookings["property_id"].isin(list(properties)) & (bookings["nights"] > 0)
+    ].copy()
+
+    listed = pd.Series({
+        property_id: prop.pricing.base_monthly_rate / 30
+        for property_id, prop in properties.items()
+    })
+    bookings["factor"] = (bookings["base_rent"] / bookings["nights"]) / bookings["property_id"].map(listed)
+    check_in = pd.to_datetime(bookings["check_in"])
+    bookings["year"] = check_in.dt.year
+    bookings["month"] = check_in.dt.month
+
+    observed = bookings.groupby(["property_id", "year", "month"], as_index=False)["factor"].mean()
+
+    frame = property_features(
+        [properties[property_id] for property_id in observed["property_id"]]
+    )
+    frame["year"] = observed["year"].to_numpy()
+    frame["month"] = observed["month"].to_numpy()
+    frame = _add_month_features(frame)
+
+    return frame, observed["factor"].to_numpy()
+
+
+class PricingModelStage:
+    """Scores the whole inventory for the coming months in one batch
+
+    Results replace ``property_manager.price_factors`` atomically, which
+    ``calculate_dynamic_price`` reads per month of stay; properties or
+    months missing from the cache fall back to the rule-based factors.
+    """
+
+    def __init__(
+        self,
+        property_manager: PropertyManager,
+        predictor: Optional[PricePredictor] = None,
+        months_ahead: int = 12,
+        min_factor: float = 0.6,
+        max_factor: float = 1.8,
+        cache_path: Optional[str] = None
+    ):
+        self.property_manager = property_manager
+        self.predictor = predictor
+        self.months_ahead = months_ahead
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.cache_path = cache_path
+
+        if property_manager.price_factors is None:
+            cache = PriceFactorCache()
+            if cache_path and os.path.exists(cache_path):
+                cache = PriceFactorCache.load(cache_path)
+            property_manager.price_factors = cache
+
+        property_manager.add_change_listener(self._on_property_change)
+
+    def _on_property_change(self, property_id: str, changed: Set[str]):
+        if not changed:
+            # Deleted
+            self.property_manager.price_factors.invalidate(property_id)
+
+    def retrain(self, booking_engine: Any) -> PricePredictor:
+        """Fit a fresh model on the booking history"""
+
+        frame, target = training_frame(self.property_manager.properties, booking_engine)
+        self.predictor = PricePredictor.train(frame, target)
+        logger.info("Trained pricing model %s on %d observations", self.predictor.version, len(target))
+        return self.predictor
+
+    def score(self, start: date) -> List[Tuple[str, int, int, float]]:
+        """Vectorized inference over every (property, month) pair"""
+
+        import numpy as np
+
+        properties = list(self.property_manager.properties.values())
+        if not properties:
+            return []
+
+        months = [add_months(start, offset) for offset in range(self.months_ahead)]
+        frame = feature_frame(properties, months)
+        factors = np.clip(self.predictor.predict(frame), self.min_factor, self.max_factor)
+
+        return list(zip(
+            frame["property_id"].tolist(),
+            frame["year"].tolist(),
+            frame["month"].tolist(),
+            np.round(factors, 4).tolist(),
+        ))
+
+    @timed("pricing_model")
+    async def run(self, start: Optional[date] = None) -> Dict[str, Any]:
+        """Nightly job: score, swap the cache in, persist it"""
+
+        if self.predictor is None:
+            logger.warning("No pricing model loaded; quotes use rule-based factors")
+            return {"scored": 0, "model_version": None}
+
+        start = start or date.today()
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, self.score, start)
+
+        cache = self.property_manager.price_factors
+        cache.replace(rows, self.predictor.version)
+        if self.cache_path:
+            cache.save(self.cache_path)
+
+        logger.info(
+            "Scored %d (property, month) price factors with model %s",
+            len(rows), self.predictor.version
+        )
+        return {
+            "scored": len(rows),
+            "properties": len(self.property_manager.properties),
+            "months": self.months_ahead,
+            "model_version": self.predictor.version,
+            "generated_at": cache.generated_at
+        }
@@ -4,11 +4,20 @@ Handles property onboarding, validation, and lifecycle management
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Annotated, Callable, Set, Tuple
 from enum import Enum
 from datetime import datetime, date
-from pydantic import BaseModel, Field
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, computed_field
+import heapq
+import json
 import logging
+import math
+
+from backend.core.metrics import record_cache, timed
+from backend.core.serialization import get_serializer
 
 logger = logging.getLogger(__name__)
 
@@ -108,6 +117,16 @@ class PricingStrategy(BaseModel):
     long_term_discount: float = Field(ge=0, le=1, default=0)  # 3+ months
 
 
+class PropertyPhoto(BaseModel):
+    """An ingested photo and the URLs of its resized variants"""
+    content_hash: str  # SHA-256 of the uploaded bytes
+    original_url: str
+    width: int
+    height: int
+    variants: Dict[str, str] = {}  # variant name ("thumb", "card", "web") -> URL
+    source_urls: List[str] = []  # Other photo URLs of the property with the same bytes
+
+
 class Property(BaseModel):
     """Complete property model"""
     property_id: str
@@ -123,6 +142,7 @@ class Property(BaseModel):
     
     # Media
     photos: List[str] = []  # URLs to property photos
+    photo_variants: List[PropertyPhoto] = []  # Processed photos, see PhotoPipeline
     virtual_tour_url: Optional[str] = None
     video_url: Optional[str] = None
     
@@ -136,23 +156,116 @@ class Property(BaseModel):
     verification_status: str = "pending"  # pending, verified, rejected
     compliance_check: bool = False
     tm30_ready: bool = False
+    
+    def photo_urls(self, variant: str = "card") -> List[str]:
+        """Photo URLs at ``variant`` size, originals for unprocessed photos
+        
+        URLs holding the same bytes are listed once.
+        """
+        
+        by_url = {
+            url: photo
+            for photo in self.photo_variants
+            for url in (photo.original_url, *photo.source_urls)
+        }
+        urls = []
+        shown = set()
+        for url in self.photos:
+            photo = by_url.get(url)
+            if photo is None:
+                urls.append(url)
+            elif photo.content_hash not in shown:
+                shown.add(photo.content_hash)
+                urls.append(photo.variants.get(variant, photo.original_url))
+        for photo in self.photo_variants:
+            if photo.content_hash not in shown:
+                shown.add(photo.content_hash)
+                urls.append(photo.variants.get(variant, photo.original_url))
+        return urls
+    
+    @computed_field
+    @property
+    def card_photo_urls(self) -> List[str]:
+        """Card-size photo URLs for listing pages and search results"""
+        return self.photo_urls("card")
+
+
+def compliance_issues(property_obj: Property) -> List[str]:
+    """Thai legal compliance problems for a property (empty if compliant)"""
+    
+    issues = []
+    
+    # Check minimum stay requirement
+    if property_obj.pricing.minimum_stay_days < 30:
+        issues.append(
+            "Minimum stay must be 30+ days for legal compliance"
+        )
+    
+    # Check property documentation
+    if not property_obj.details.chanote_title:
+        issues.append("Chanote title required for verification")
+    
+    # For condos, check juristic person approval
+    if (property_obj.details.property_type == PropertyType.CONDO and 
+        not property_obj.details.juristic_person_approval):
+        issues.append(
+            "Juristic person approval required for condo rentals"
+        )
+    
+    return issues
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(name: str) -> TypeAdapter:
+    """Validator for one top-level Property field, with its constraints"""
+    field = Property.model_fields[name]
+    return TypeAdapter(Annotated[field.annotation, field], config=ConfigDict(title=name))
+
+
+# Called with (property_id, changed field paths such as "pricing.minimum_stay_days");
+# creation reports every top-level field, deletion an empty set
+PropertyChangeListener = Callable[[str, Set[str]], None]
 
 
 class PropertyManager:
     """Service for managing property lifecycle"""
     
+    # Sections updated by merging into the existing nested model
+    NESTED_SECTIONS = ("details", "pricing")
+    # Fields that cannot be changed through update_property
+    IMMUTABLE_FIELDS = ("property_id", "owner_id", "created_at")
+    
     def __init__(self):
         self.properties: Dict[str, Property] = {}
+        self.change_listeners: List[PropertyChangeListener] = []
+        # PriceFactorCache filled by the nightly pricing model stage
+        self.price_factors: Optional[Any] = None
+    
+    def add_change_listener(self, listener: PropertyChangeListener):
+        """Subscribe to property create/update/delete notifications"""
+        self.change_listeners.append(listener)
+    
+    def _notify_change(self, property_id: str, changed: Set[str]):
+        for listener in self.change_listeners:
+            listener(property_id, changed)
     
     async def create_property(
         self,
         owner_id: str,
-        property_data: Dict[str, Any]
+        property_data: Dict[str, Any],
+        property_id: Optional[str] = None
     ) -> Property:
-        """Create new property listing"""
+        """Create new property listing
+        
+        ``property_id`` is normally generated here; the shard router passes
+        one in so ids stay unique across worker processes.
+        """
         
         # Generate property ID
-        property_id = f"prop_{datetime.now().timestamp()}"
+        if property_id is None:
+            property_id = f"prop_{datetime.now().timestamp()}"
+        elif property_id in self.properties:
+            raise ValueError(f"Property {property_id} already exists")
         
         # Validate and create property
         property_obj = Property(
@@ -166,38 +279,84 @@ class PropertyManager:
         
         # Store property
         self.properties[property_id] = property_obj
+        self._notify_change(property_id, set(Property.model_fields))
         
-        logger.info(f"Created property {property_id} for owner {owner_id}")
+        logger.info("Created property %s for owner %s", property_id, owner_id)
         
         return property_obj
     
-    async def validate_compliance(self, property_id: str) -> Dict[str, Any]:
-        """Validate Thai legal compliance for property"""
+    async def update_property(
+        self,
+        property_id: str,
+        updates: Dict[str, Any]
+    ) -> Property:
+        """Update property fields and notify listeners of what changed
+        
+        ``details`` and ``pricing`` updates are merged into the existing
+        section and re-validated; other keys replace top-level fields and
+        are validated against the field type. Every update is validated
+        before any is applied, so a ValueError leaves the property as it was.
+        """
         
         property_obj = self.properties.get(property_id)
         if not property_obj:
             raise ValueError(f"Property {property_id} not found")
         
-        compliance_issues = []
+        validated: Dict[str, Any] = {}
+        for key, value in updates.items():
+            if key in self.NESTED_SECTIONS:
+                section = getattr(property_obj, key)
+                unknown = set(value) - set(type(section).model_fields)
+                if unknown:
+                    raise ValueError(
+                        f"Unknown {key} fields: {', '.join(sorted(unknown))}"
+                    )
+                validated[key] = type(section)(**{**section.model_dump(), **value})
+            elif key in Property.model_fields and key not in self.IMMUTABLE_FIELDS:
+                validated[key] = _field_adapter(key).validate_python(value)
+            else:
+                raise ValueError(f"Field {key} cannot be updated")
         
-        # Check minimum stay requirement
-        if property_obj.pricing.minimum_stay_days < 30:
-            compliance_issues.append(
-                "Minimum stay must be 30+ days for legal compliance"
-            )
+        changed: Set[str] = set()
         
-        # Check property documentation
-        if not property_obj.details.chanote_title:
-            compliance_issues.append("Chanote title required for verification")
+        for key, value in validated.items():
+            if key in self.NESTED_SECTIONS:
+                section = getattr(property_obj, key)
+                changed.update(
+                    f"{key}.{name}" for name in updates[key]
+                    if getattr(section, name) != getattr(value, name)
+                )
+                setattr(property_obj, key, value)
+            elif getattr(property_obj, key) != value:
+                changed.add(key)
+                setattr(property_obj, key, value)
         
-        # For condos, check juristic person approval
-        if (property_obj.details.property_type == PropertyType.CONDO and 
-            not property_obj.details.juristic_person_approval):
-            compliance_issues.append(
-                "Juristic person approval required for condo rentals"
-            )
+        if changed:
+            property_obj.updated_at = datetime.now()
+            self._notify_change(property_id, changed)
+        
+        return property_obj
+    
+    async def delete_property(self, property_id: str):
+        """Remove a property listing"""
+        
+        if self.properties.pop(property_id, None) is None:
+            raise ValueError(f"Property {property_id} not found")
+        
+        self._notify_change(property_id, set())
         
-        compliance_status = len(compliance_issues) == 0
+        logger.info("Deleted property %s", property_id)
+    
+    @timed("property_manager")
+    async def validate_compliance(self, property_id: str) -> Dict[str, Any]:
+        """Validate Thai legal compliance for property"""
+        
+        property_obj = self.properties.get(property_id)
+        if not property_obj:
+            raise ValueError(f"Property {property_id} not found")
+        
+        issues = compliance_issues(property_obj)
+        compliance_status = len(issues) == 0
         
         # Update property compliance
         property_obj.compliance_check = compliance_status
@@ -205,10 +364,11 @@ class PropertyManager:
         
         return {
             "compliant": compliance_status,
-            "issues": compliance_issues,
+            "issues": issues,
             "checked_at": datetime.now()
         }
     
+    @timed("property_manager")
     async def calculate_dynamic_price(
         self,
         property_id: str,
@@ -224,12 +384,19 @@ class PropertyManager:
         base_rate = property_obj.pricing.base_monthly_rate
         stay_days = (check_out - check_in).days
         
-        # Apply seasonal multiplier (placeholder logic)
+        # Model factors per month of stay, falling back to the seasonal rules
         seasonal_factor = 1.0
-        if check_in.month in [12, 1, 2]:  # High season
-            seasonal_factor = 1.3
-        elif check_in.month in [6, 7, 8, 9]:  # Low season
-            seasonal_factor = 0.8
+        pricing_source = "fixed"
+        if property_obj.pricing.seasonal_multiplier:
+            seasonal_factor = self._model_price_factor(property_id, check_in, check_out)
+            pricing_source = "model"
+            if seasonal_factor is None:
+                seasonal_factor = 1.0
+                pricing_source = "rules"
+                if check_in.month in [12, 1, 2]:  # High season
+                    seasonal_factor = 1.3
+                elif check_in.month in [6, 7, 8, 9]:  # Low season
+                    seasonal_factor = 0.8
         
         # Apply length of stay discounts
         discount_factor = 1.0
@@ -250,9 +417,36 @@ class PropertyManager:
             "discount_factor": discount_factor,
             "total_price": round(total_price, 2),
             "cleaning_fee": property_obj.pricing.cleaning_fee,
-            "security_deposit": property_obj.pricing.security_deposit
+            "security_deposit": property_obj.pricing.security_deposit,
+            "pricing_source": pricing_source
         }
     
+    def _model_price_factor(
+        self,
+        property_id: str,
+        check_in: date,
+        check_out: date
+    ) -> Optional[float]:
+        """Night-weighted model factor over the stay, None if any month is missing"""
+        
+        if self.price_factors is None:
+            return None
+        
+        weighted = 0.0
+        nights = 0
+        current = check_in
+        while current < check_out:
+            month_end = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+            month_nights = (min(month_end, check_out) - current).days
+            factor = self.price_factors.get(property_id, current.year, current.month)
+            if factor is None:
+                return None
+            weighted += factor * month_nights
+            nights += month_nights
+            current = month_end
+        
+        return weighted / nights if nights else None
+    
     async def get_property_analytics(self, property_id: str) -> Dict[str, Any]:
         """Get property performance analytics"""
         
@@ -285,19 +479,220 @@ class PropertyManager:
         }
 
 
+# Monthly rate band upper bounds (THB) and labels; the last band is open
+PRICE_BAND_BOUNDS = [20_000, 40_000, 70_000, 120_000]
+PRICE_BAND_LABELS = ["under_20k", "20k_40k", "40k_70k", "70k_120k", "120k_plus"]
+BEDROOM_BUCKETS = ["studio", "1", "2", "3", "4+"]
+AMENITY_NAMES = tuple(PropertyAmenities.model_fields)
+
+# "listed" is oldest listing first, (created_at, property_id); the shard
+# router uses it to merge unsorted searches across shards
+SORT_OPTIONS = ("price_asc", "price_desc", "rating", "conversion", "distance", "recency", "listed")
+EARTH_RADIUS_KM = 6371.0
+
+
+class SortKeys:
+    """Precomputed sort values of one property (ascending = better)"""
+    
+    __slots__ = ("property_obj", "price", "rating", "recency", "latitude", "cos_latitude", "longitude")
+    
+    def __init__(self, property_obj: Property):
+        self.property_obj = property_obj
+        self.price = property_obj.pricing.base_monthly_rate
+        rating = property_obj.average_rating
+        self.rating = -rating if rating is not None else math.inf
+        published_at = property_obj.published_at
+        self.recency = -published_at.timestamp() if published_at else math.inf
+        
+        location = property_obj.details.location
+        if location.latitude is not None and location.longitude is not None:
+            self.latitude = math.radians(location.latitude)
+            self.cos_latitude = math.cos(self.latitude)
+            self.longitude = math.radians(location.longitude)
+        else:
+            self.latitude = None
+    
+    def distance_km(self, latitude: float, cos_latitude: float, longitude: float) -> float:
+        """Haversine distance to a point given in radians"""
+        if self.latitude is None:
+            return math.inf
+        a = (
+            math.sin((self.latitude - latitude) / 2) ** 2
+            + cos_latitude * self.cos_latitude * math.sin((self.longitude - longitude) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def facet_counts(properties: List[Property]) -> Dict[str, Dict[str, int]]:
+    """Counts per province, type, bedroom bucket, price band and amenity, in one pass"""
+    
+    provinces: Dict[str, int] = {}
+    property_types: Dict[str, int] = {}
+    bedrooms = [0] * len(BEDROOM_BUCKETS)
+    price_bands = [0] * len(PRICE_BAND_LABELS)
+    amenities = [0] * len(AMENITY_NAMES)
+    
+    for prop in properties:
+        details = prop.details
+        province = details.location.province
+        provinces[province] = provinces.get(province, 0) + 1
+        property_type = details.property_type.value
+        property_types[property_type] = property_types.get(property_type, 0) + 1
+        bedrooms[min(details.bedrooms, 4)] += 1
+        price_bands[bisect_right(PRICE_BAND_BOUNDS, prop.pricing.base_monthly_rate)] += 1
+        
+        # Amenity flags in field order, read without per-name getattr
+        for index, present in enumerate(details.amenities.__dict__.values()):
+            if present:
+                amenities[index] += 1
+    
+    return {
+        "province": provinces,
+        "property_type": property_types,
+        "bedrooms": dict(zip(BEDROOM_BUCKETS, bedrooms)),
+        "price_band": dict(zip(PRICE_BAND_LABELS, price_bands)),
+        "amenities": dict(zip(AMENITY_NAMES, amenities)),
+    }
+
+
 class PropertySearchEngine:
     """Advanced property search and filtering"""
     
-    def __init__(self, property_manager: PropertyManager):
+    # Changes that can move a property between facet values or filters
+    FACET_FIELDS = {
+        "status", "details", "pricing",
+        "details.location", "details.property_type", "details.bedrooms",
+        "details.amenities", "pricing.base_monthly_rate",
+    }
+    # Changes that stale a property's precomputed sort keys
+    SORT_FIELDS = {
+        "details", "pricing", "details.location", "pricing.base_monthly_rate",
+        "average_rating", "published_at",
+    }
+    
+    def __init__(
+        self,
+        property_manager: PropertyManager,
+        availability: Optional[Any] = None,
+        facet_cache_size: int = 256
+    ):
         self.property_manager = property_manager
+        # AvailabilityCalendar, needed for the flexible_dates filter
+        self.availability = availability
+        # Facet counts by normalized filters, least recently used first
+        self.facet_cache_size = facet_cache_size
+        self._facet_cache: "OrderedDict[tuple, Dict[str, Dict[str, int]]]" = OrderedDict()
+        # property_id -> SortKeys, built on first use; view and booking
+        # counters are read live, so they never invalidate an entry
+        self._sort_index: Dict[str, SortKeys] = {}
+        
+        property_manager.add_change_listener(self._on_property_change)
+    
+    def _on_property_change(self, property_id: str, changed: Set[str]):
+        # Deletions report no fields and always count
+        if not changed or changed & self.FACET_FIELDS:
+            self.invalidate_facets()
+        if not changed or changed & self.SORT_FIELDS:
+            self._sort_index.pop(property_id, None)
+    
+    def _sort_keys(self, prop: Property) -> SortKeys:
+        keys = self._sort_index.get(prop.property_id)
+        # A property object replaced by a bulk load gets fresh keys
+        if keys is None or keys.property_obj is not prop:
+            keys = self._sort_index[prop.property_id] = SortKeys(prop)
+        return keys
+    
+    def _sort_key_function(
+        self,
+        sort: str,
+        near: Optional[Tuple[float, float]]
+    ) -> Callable[[Property], Any]:
+        sort_keys = self._sort_keys
+        if sort == "price_asc":
+            return lambda prop: sort_keys(prop).price
+        if sort == "price_desc":
+            return lambda prop: -sort_keys(prop).price
+        if sort == "rating":
+            return lambda prop: sort_keys(prop).rating
+        if sort == "recency":
+            return lambda prop: sort_keys(prop).recency
+        if sort == "listed":
+            return lambda prop: (prop.created_at, prop.property_id)
+        if sort == "conversion":
+            # Same rate as get_property_analytics
+            return lambda prop: -prop.bookings_count / max(prop.views_count, 1)
+        if sort == "distance":
+            if near is None:
+                raise ValueError("Distance sort needs a near=(latitude, longitude) point")
+            latitude, longitude = math.radians(near[0]), math.radians(near[1])
+            cos_latitude = math.cos(latitude)
+            return lambda prop: sort_keys(prop).distance_km(latitude, cos_latitude, longitude)
+        raise ValueError(f"Unknown sort {sort}; expected one of {', '.join(SORT_OPTIONS)}")
     
+    def invalidate_facets(self):
+        """Drop cached facet counts (call after loading properties in bulk)"""
+        self._facet_cache.clear()
+    
+    def _cached_facets(
+        self,
+        filters: Dict[str, Any],
+        properties: List[Property]
+    ) -> Dict[str, Dict[str, int]]:
+        # Availability changes without notice, so date searches are never cached
+        try:
+            key = None if "flexible_dates" in filters else tuple(sorted(filters.items()))
+            hash(key)
+        except TypeError:
+            key = None
+        
+        if key is not None:
+            facets = self._facet_cache.get(key)
+            record_cache("search_facets", facets is not None)
+            if facets is not None:
+                self._facet_cache.move_to_end(key)
+                return facets
+        
+        facets = facet_counts(properties)
+        if key is not None:
+            self._facet_cache[key] = facets
+            if len(self._facet_cache) > self.facet_cache_size:
+                self._facet_cache.popitem(last=False)
+        return facets
+    
+    @timed("property_search")
     async def search_properties(
         self,
         filters: Dict[str, Any],
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        fields: Optional[List[str]] = None,
+        facets: bool = False,
+        sort: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None,
+        include_sort_keys: bool = False
     ) -> Dict[str, Any]:
-        """Search properties with filters"""
+        """Search properties with filters
+        
+        ``fields`` is an optional list of dotted paths (``"details.title"``);
+        when given, results are plain dicts holding only those fields. An
+        unknown path raises ValueError.
+        Listing cards should request ``card_photo_urls`` rather than
+        ``photos``, which are the full-size originals.
+        
+        The ``flexible_dates`` filter (``stay_days``, ``earliest_check_in``,
+        ``latest_check_in``) keeps properties free for ``stay_days`` nights
+        starting somewhere in that range; the response then maps each
+        returned property to its earliest possible check-in.
+        
+        With ``facets``, the response also counts the whole filtered set by
+        province, property type, bedrooms, price band and amenity.
+        
+        ``sort`` is one of ``SORT_OPTIONS``; only the first ``page *
+        page_size`` matches are selected, with a heap, rather than sorting
+        all of them. ``distance`` sorts from ``near`` and adds each returned
+        property's ``distance_km``. ``include_sort_keys`` returns the key of
+        each result, for the shard router to merge pages.
+        """
         
         # Get all active properties
         all_properties = [
@@ -338,15 +733,92 @@ class PropertySearchEngine:
                 if prop.details.bedrooms >= filters["bedrooms"]
             ]
         
+        # Most expensive filter last, on the smallest candidate set
+        check_ins: Dict[str, date] = {}
+        if "flexible_dates" in filters:
+            if self.availability is None:
+                raise ValueError("Flexible date search needs an availability calendar")
+            flexible = filters["flexible_dates"]
+            for prop in filtered_properties:
+                check_in = self.availability.earliest_check_in(
+                    prop.property_id,
+                    flexible["stay_days"],
+                    flexible["earliest_check_in"],
+                    flexible["latest_check_in"]
+                )
+                if check_in is not None:
+                    check_ins[prop.property_id] = check_in
+            filtered_properties = [
+                prop for prop in filtered_properties
+                if prop.property_id in check_ins
+            ]
+        
         # Apply pagination
         start = (page - 1) * page_size
         end = start + page_size
-        paginated_properties = filtered_properties[start:end]
+        if sort:
+            sort_key = self._sort_key_function(sort, near)
+            # Top-k: O(n log k) for the first pages instead of a full sort
+            paginated_properties = heapq.nsmallest(end, filtered_properties, key=sort_key)[start:]
+        else:
+            paginated_properties = filtered_properties[start:end]
+        
+        extras = {}
+        if sort:
+            extras["sort"] = sort
+            if include_sort_keys:
+                extras["sort_keys"] = [sort_key(prop) for prop in paginated_properties]
+            if sort == "distance":
+                # None for properties without coordinates (sorted last)
+                extras["distance_km"] = {
+                    prop.property_id: round(distance, 2) if distance != math.inf else None
+                    for prop in paginated_properties
+                    for distance in (sort_key(prop),)
+                }
+        if "flexible_dates" in filters:
+            extras["earliest_check_in"] = {
+                prop.property_id: check_ins[prop.property_id]
+                for prop in paginated_properties
+            }
+        if facets:
+            extras["facets"] = self._cached_facets(filters, filtered_properties)
+        
+        if fields:
+            paginated_properties = get_serializer(Property).project(
+                paginated_properties, fields
+            )
         
         return {
             "properties": paginated_properties,
             "total_count": len(filtered_properties),
             "page": page,
             "page_size": page_size,
-            "total_pages": (len(filtered_properties) + page_size - 1) // page_size
+            "total_pages": (len(filtered_properties) + page_size - 1) // page_size,
+            **extras
         }
+    
+    async def search_properties_json(
+        self,
+        filters: Dict[str, Any],
+        page: int = 1,
+        page_size: int = 20,
+        fields: Optional[List[str]] = None,
+        facets: bool = False,
+        sort: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None
+    ) -> bytes:
+        """Search properties and encode the response straight to JSON bytes
+        
+        ``fields`` projects each property as in ``search_properties``.
+        """
+        
+        serializer = get_serializer(Property)
+        if fields:
+            serializer.check_fields(fields)  # Before doing the search
+        results = await self.search_properties(
+            filters, page, page_size, facets=facets, sort=sort, near=near
+        )
+        properties = serializer.dumps_many(results.pop("properties"), fields)
+        envelope = json.dumps(results, separators=(",", ":"), default=str).encode()
+        
+        return b'{"properties":' + properties + b"," + envelope[1:]
@@ -0,0 +1,55 @@
+"""
+Rate Limiting and Retry Helpers for SiamStay
+Token bucket limiter and backoff schedule for calls to external systems
+"""
+
+from typing import Optional
+from time import monotonic
+import asyncio
+import random
+
+from backend.core.metrics import timed_lock
+
+
+class AsyncRateLimiter:
+    """Token bucket limiter shared by coroutines calling one external API
+
+    Time spent queueing for tokens is recorded as lock wait under ``name``.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None, name: str = "rate_limiter"):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.name = name
+        self.capacity = float(burst or max(int(rate), 1))
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until ``tokens`` are available and take them"""
+
+        async with timed_lock(self._lock, self.name):
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    maximum: float = 300.0,
+    jitter: float = 0.1
+) -> float:
+    """Exponential backoff in seconds for the given (1-based) attempt"""
+
+    delay = min(base * (2 ** max(attempt - 1, 0)), maximum)
+    return delay * (1 + random.uniform(-jitter, jitter))
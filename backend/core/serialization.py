@@ -0,0 +1,144 @@
+"""
+Fast JSON Serialization for SiamStay
+Precompiled encoders with field projection for API responses
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Iterable, Sequence, Type, Tuple
+from typing import get_args, get_origin
+from pydantic import BaseModel, TypeAdapter
+
+from backend.core.metrics import record_cache
+
+_CONTAINERS = (list, tuple, set, frozenset, dict)
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """Model type inside a field annotation, and whether it is a collection of them"""
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    for arg in get_args(annotation):
+        model, many = _nested_model(arg)
+        if model is not None:
+            return model, many or get_origin(annotation) in _CONTAINERS
+    return None, False
+
+
+def _field_annotation(model: Type[BaseModel], name: str, path: str) -> Any:
+    field = model.model_fields.get(name)
+    if field is not None:
+        return field.annotation
+    computed = model.__pydantic_decorators__.computed_fields.get(name)
+    if computed is not None:
+        return computed.info.return_type
+    raise ValueError(f"Unknown field: {path}")
+
+
+def build_include(
+    fields: Iterable[str],
+    model: Optional[Type[BaseModel]] = None
+) -> Dict[str, Any]:
+    """Turn dotted field paths into a Pydantic ``include`` mapping
+
+    ``["property_id", "details.title", "details.location.province"]`` becomes
+    ``{"property_id": True, "details": {"title": True, "location": {"province": True}}}``.
+    With ``model``, unknown paths raise ValueError and paths into lists of
+    models (``"photo_variants.original_url"``) apply to every item.
+    """
+
+    include: Dict[str, Any] = {}
+    for field in fields:
+        node = include
+        current = model
+        *parents, leaf = field.split(".")
+        for name in parents:
+            many = False
+            if current is not None:
+                current, many = _nested_model(_field_annotation(current, name, field))
+                if current is None:
+                    raise ValueError(f"Unknown field: {field}")
+            child = node.get(name)
+            if child is True:
+                break  # Whole parent already included
+            node = node.setdefault(name, {})
+            if many:
+                node = node.setdefault("__all__", {})
+        else:
+            if current is not None:
+                _field_annotation(current, leaf, field)
+            node[leaf] = True
+    return include
+
+
+class FastSerializer:
+    """Precompiled JSON encoder for one model type
+
+    Serializes straight to bytes in pydantic-core, and encodes whole lists
+    in a single call instead of one ``model_dump_json`` per object.
+    """
+
+    # Projections requested by callers are few and repeated, cache their maps
+    _include_cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    _INCLUDE_CACHE_SIZE = 256
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._serializer = model.__pydantic_serializer__
+        self._list_adapter = TypeAdapter(List[model])
+
+    def _include(self, fields: Tuple[str, ...]) -> Dict[str, Any]:
+        """Include map for ``fields``; ValueError if one is not on the model"""
+
+        cache = self._include_cache
+        key = (self.model, fields)
+        include = cache.get(key)
+        record_cache("serializer_projection", include is not None)
+        if include is None:
+            include = build_include(fields, self.model)
+            if len(cache) >= self._INCLUDE_CACHE_SIZE:
+                cache.clear()
+            cache[key] = include
+        return include
+
+    def check_fields(self, fields: Sequence[str]):
+        """Raise ValueError if any of ``fields`` is not on the model"""
+        self._include(tuple(fields))
+
+    def _projection(self, fields: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+        if not fields:
+            return None
+        return self._include(tuple(fields))
+
+    def dumps(self, obj: BaseModel, fields: Optional[Sequence[str]] = None) -> bytes:
+        """Encode one object to JSON bytes"""
+        return self._serializer.to_json(obj, include=self._projection(fields))
+
+    def dumps_many(
+        self,
+        objs: Sequence[BaseModel],
+        fields: Optional[Sequence[str]] = None
+    ) -> bytes:
+        """Encode a list of objects to a JSON array in one call"""
+
+        include = self._projection(fields)
+        if include is not None:
+            include = {"__all__": include}
+        return self._list_adapter.dump_json(list(objs), include=include)
+
+    def project(
+        self,
+        objs: Sequence[BaseModel],
+        fields: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """Project objects to plain dicts containing only ``fields``"""
+
+        return self._list_adapter.dump_python(
+            list(objs), include={"__all__": self._include(tuple(fields))}
+        )
+
+
+@lru_cache(maxsize=None)
+def get_serializer(model: Type[BaseModel]) -> FastSerializer:
+    """Shared, lazily compiled serializer for a model type"""
+    return FastSerializer(model)
@@ -0,0 +1,121 @@
+"""
+Trusted Model Construction for SiamStay
+Builds Pydantic models from internal data without re-running validation
+"""
+
+from copy import copy
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple, Type, Union
+from typing import get_args, get_origin
+from pydantic import BaseModel
+
+# How to convert one field: ("model", cls), ("model_list", cls) or ("enum", cls)
+_FieldPlan = Tuple[str, type]
+
+_object_setattr = object.__setattr__
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+class _ModelPlan:
+    """Precomputed construction recipe for one model class"""
+
+    __slots__ = ("conversions", "defaults", "mutable_defaults", "prepare")
+
+    def __init__(self, model: Type[BaseModel]):
+        self.conversions: Dict[str, _FieldPlan] = {}
+        self.defaults: Dict[str, Any] = {}
+        self.mutable_defaults: List[str] = []
+        self.prepare = getattr(model, "_prepare_trusted", None)
+
+        for name, field in model.model_fields.items():
+            if not field.is_required():
+                default = field.get_default(call_default_factory=True)
+                self.defaults[name] = default
+                if field.default_factory is not None or isinstance(
+                    default, (list, dict, set)
+                ):
+                    self.mutable_defaults.append(name)
+
+            annotation = _unwrap_optional(field.annotation)
+            origin = get_origin(annotation)
+            if origin in (list, List):
+                (item,) = get_args(annotation) or (Any,)
+                if isinstance(item, type) and issubclass(item, BaseModel):
+                    self.conversions[name] = ("model_list", item)
+            elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+                self.conversions[name] = ("model", annotation)
+            elif isinstance(annotation, type) and issubclass(annotation, Enum):
+                self.conversions[name] = ("enum", annotation)
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> _ModelPlan:
+    return _ModelPlan(model)
+
+
+def construct_trusted(model: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """Build ``model`` from already-typed internal data, skipping validation
+
+    Nested model dicts are constructed recursively and enum values are
+    coerced from their raw values; everything else is taken as-is, so the
+    input must come from our own code or a previous ``model_dump()`` —
+    never from API requests or JSON that has not been parsed into Python
+    types. Models can derive computed fields via a ``_prepare_trusted``
+    classmethod, mirroring any custom ``__init__`` logic.
+    """
+
+    plan = _plan(model)
+    if plan.prepare is not None:
+        data = plan.prepare(data)
+
+    values = {**plan.defaults, **data}
+    for name in plan.mutable_defaults:
+        if name not in data:
+            values[name] = copy(values[name])
+
+    for name, (kind, target) in plan.conversions.items():
+        value = values.get(name)
+        if value is None:
+            continue
+        if kind == "model":
+            if not isinstance(value, BaseModel):
+                values[name] = construct_trusted(target, value)
+        elif kind == "model_list":
+            values[name] = [
+                item if isinstance(item, BaseModel)
+                else construct_trusted(target, item)
+                for item in value
+            ]
+        elif not isinstance(value, target):
+            values[name] = target(value)
+
+    if model.__pydantic_post_init__:
+        return model.model_construct(**values)
+
+    # Same end state as model_construct, minus its per-field Python loop
+    instance = model.__new__(model)
+    _object_setattr(instance, "__dict__", values)
+    _object_setattr(instance, "__pydantic_fields_set__", set(data))
+    _object_setattr(instance, "__pydantic_extra__", None)
+    _object_setattr(instance, "__pydantic_private__", None)
+    return instance
+
+
+def build_model(
+    model: Type[BaseModel],
+    data: Dict[str, Any],
+    trusted: bool = False
+) -> BaseModel:
+    """Validate ``data`` into ``model``, or construct it directly if trusted"""
+
+    if trusted:
+        return construct_trusted(model, data)
+    return model(**data)
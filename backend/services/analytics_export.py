@@ -0,0 +1,330 @@
+"""
+Analytics Export for SiamStay
+Chunked, incremental columnar export of bookings and transactions
+"""
+
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple, Type, Union
+from typing import get_args, get_origin
+from enum import Enum
+from datetime import datetime, date
+from operator import attrgetter
+from pydantic import BaseModel
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+
+from backend.core.metrics import timed
+from backend.services.booking_engine import Booking, BookingEngine
+from backend.services.payment_processor import PaymentService, PaymentStatus, PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+# Transactions that never change again once in one of these
+FINAL_TRANSACTION_STATUSES = (
+    PaymentStatus.REFUNDED,
+    PaymentStatus.FAILED,
+    PaymentStatus.CANCELLED,
+)
+
+
+class ExportFormat(str, Enum):
+    """Output file formats"""
+    PARQUET = "parquet"  # pyarrow row groups, or pandas part files
+    CSV = "csv"          # Dependency-free fallback
+
+
+class FlatColumn:
+    """One flattened model field, e.g. ``guest__email`` for ``guest.email``"""
+
+    __slots__ = ("path", "name", "kind", "getter")
+
+    def __init__(self, path: Tuple[str, ...], kind: str):
+        self.path = path
+        self.name = "__".join(path)
+        self.kind = kind
+        self.getter = attrgetter(".".join(path))
+
+
+def flat_columns(model: Type[BaseModel], prefix: Tuple[str, ...] = ()) -> List[FlatColumn]:
+    """Flatten nested model fields into scalar columns"""
+
+    columns = []
+    for name, field in model.model_fields.items():
+        path = prefix + (name,)
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            columns.extend(flat_columns(annotation, path))
+        elif isinstance(annotation, type) and issubclass(annotation, Enum):
+            columns.append(FlatColumn(path, "enum"))
+        elif annotation in (str, int, float, bool, date, datetime):
+            columns.append(FlatColumn(path, annotation.__name__))
+        else:
+            columns.append(FlatColumn(path, "json"))
+    return columns
+
+
+def normalize_row(values: Iterable[Any], columns: List[FlatColumn]) -> tuple:
+    """Enums to their values and containers to JSON, ready for writing"""
+
+    row = []
+    for value, column in zip(values, columns):
+        if value is not None:
+            if column.kind == "enum":
+                value = value.value
+            elif column.kind == "json":
+                value = json.dumps(value, default=str)
+        row.append(value)
+    return tuple(row)
+
+
+def flatten(obj: BaseModel, columns: List[FlatColumn]) -> tuple:
+    return normalize_row((column.getter(obj) for column in columns), columns)
+
+
+def fingerprint(row: tuple) -> str:
+    """Stable digest of a flattened row (``hash()`` is salted per process)"""
+    return hashlib.blake2b(repr(row).encode(), digest_size=8).hexdigest()
+
+
+class _ArrowParquetWriter:
+    """Single Parquet file, one row group per chunk"""
+
+    def __init__(self, path: str, columns: List[FlatColumn]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "str": pa.string(), "enum": pa.string(), "json": pa.string(),
+            "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+            "date": pa.date32(), "datetime": pa.timestamp("us"),
+        }
+        self._pa = pa
+        self.schema = pa.schema([(column.name, types[column.kind]) for column in columns])
+        self.path = f"{path}.parquet"
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+
+    def write(self, names: List[str], chunk: List[tuple]):
+        arrays = list(zip(*chunk))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(values, type=field.type) for values, field in zip(arrays, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+class _PandasParquetWriter:
+    """Directory of Parquet part files, one per chunk"""
+
+    def __init__(self, path: str, columns: List[FlatColumn]):
+        import pandas
+
+        self._pandas = pandas
+        self.path = path
+        self._parts = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, names: List[str], chunk: List[tuple]):
+        frame = self._pandas.DataFrame.from_records(chunk, columns=names)
+        frame.to_parquet(os.path.join(self.path, f"part-{self._parts:05d}.parquet"), index=False)
+        self._parts += 1
+
+    def close(self):
+        pass
+
+
+class _CsvWriter:
+    def __init__(self, path: str, columns: List[FlatColumn]):
+        self.path = f"{path}.csv"
+        self._handle = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._handle)
+        self._writer.writerow([column.name for column in columns])
+
+    def write(self, names: List[str], chunk: List[tuple]):
+        self._writer.writerows(chunk)
+
+    def close(self):
+        self._handle.close()
+
+
+def _open_writer(export_format: ExportFormat, path: str, columns: List[FlatColumn]):
+    if export_format == ExportFormat.CSV:
+        return _CsvWriter(path, columns)
+    try:
+        return _ArrowParquetWriter(path, columns)
+    except ImportError:
+        pass
+    try:
+        return _PandasParquetWriter(path, columns)
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow or pandas installed") from None
+
+
+class AnalyticsExporter:
+    """Streams bookings and transactions to columnar files for offline reporting
+
+    Records are flattened and written ``chunk_size`` rows at a time, so
+    memory stays bounded, and the event loop is yielded between chunks to
+    keep booking traffic flowing. Incremental runs compare row fingerprints
+    with the previous run (kept in ``state_path``) and write only new or
+    changed records. Archived bookings are final: each archive row is
+    read straight from the archive columns and written once, past a row
+    watermark, and its fingerprint is then dropped from the state.
+    Transactions in a final status are likewise written once and lose
+    their fingerprint; a watermark over ``PaymentService.transactions``
+    (in insertion order) tells later runs they were already written.
+    """
+
+    KINDS = ("bookings", "transactions")
+
+    def __init__(
+        self,
+        booking_engine: BookingEngine,
+        payment_service: PaymentService,
+        output_dir: str,
+        export_format: ExportFormat = ExportFormat.PARQUET,
+        chunk_size: int = 10_000,
+        state_path: Optional[str] = None
+    ):
+        self.booking_engine = booking_engine
+        self.payment_service = payment_service
+        self.output_dir = output_dir
+        self.export_format = export_format
+        self.chunk_size = chunk_size
+        self.state_path = state_path or os.path.join(output_dir, "export_state.json")
+
+        self.columns = {
+            "bookings": flat_columns(Booking),
+            "transactions": flat_columns(PaymentTransaction),
+        }
+        self.state = self._load_state()
+        # Archive and transaction counts when the current run started, the
+        # next watermarks
+        self._archive_rows = self.state.get("archive_rows", 0)
+        self._transaction_rows = self.state.get("transaction_rows", 0)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        return {
+            "last_run_at": None,
+            "fingerprints": {kind: {} for kind in self.KINDS},
+            "archive_rows": 0,
+            "transaction_rows": 0,
+        }
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.state, handle, separators=(",", ":"))
+        os.replace(tmp_path, self.state_path)
+
+    def _rows(self, kind: str, incremental: bool) -> Iterator[Tuple[tuple, bool]]:
+        """(row, final) pairs; final rows bypass the fingerprint check"""
+
+        columns = self.columns[kind]
+        if kind == "transactions":
+            watermark = self.state.get("transaction_rows", 0) if incremental else 0
+            previous = self.state["fingerprints"][kind]
+            transactions = list(self.payment_service.transactions.values())
+            self._transaction_rows = len(transactions)
+            for index, transaction in enumerate(transactions):
+                final = transaction.status in FINAL_TRANSACTION_STATUSES
+                if final and index < watermark and transaction.transaction_id not in previous:
+                    continue  # Written final by an earlier run
+                yield flatten(transaction, columns), final
+            return
+
+        # Rows archived from here on are picked up by the next run
+        archive = self.booking_engine.archive
+        watermark = self.state.get("archive_rows", 0) if incremental else 0
+        archived = archive.booking_ids_since(watermark)
+        self._archive_rows = archive.stored_rows
+
+        for booking in list(self.booking_engine.bookings.values()):
+            yield flatten(booking, columns), False
+
+        for values in archive.iter_rows([column.path for column in columns], archived):
+            yield normalize_row(values, columns), True
+
+    async def _export_kind(self, kind: str, run_dir: str, incremental: bool) -> Dict[str, int]:
+        columns = self.columns[kind]
+        names = [column.name for column in columns]
+        previous = self.state["fingerprints"][kind]
+        fingerprints = dict(previous) if incremental else {}
+        id_index = names.index("booking_id" if kind == "bookings" else "transaction_id")
+
+        writer = None
+        chunk: List[tuple] = []
+        scanned = written = 0
+
+        for row, final in self._rows(kind, incremental):
+            record_id = row[id_index]
+            scanned += 1
+            if scanned % self.chunk_size == 0:
+                await asyncio.sleep(0)
+            if final:
+                # Final state, written once; its live fingerprint is no longer needed
+                fingerprints.pop(record_id, None)
+            else:
+                digest = fingerprint(row)
+                if incremental and previous.get(record_id) == digest:
+                    continue
+                fingerprints[record_id] = digest
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                writer = writer or _open_writer(self.export_format, os.path.join(run_dir, kind), columns)
+                writer.write(names, chunk)
+                written += len(chunk)
+                chunk = []
+
+        if chunk:
+            writer = writer or _open_writer(self.export_format, os.path.join(run_dir, kind), columns)
+            writer.write(names, chunk)
+            written += len(chunk)
+        if writer is not None:
+            writer.close()
+
+        self.state["fingerprints"][kind] = fingerprints
+        if kind == "bookings":
+            self.state["archive_rows"] = self._archive_rows
+        else:
+            self.state["transaction_rows"] = self._transaction_rows
+        return {"scanned": scanned, "written": written, "path": writer.path if writer else None}
+
+    @timed("analytics_export")
+    async def export(
+        self,
+        kinds: Iterable[str] = KINDS,
+        incremental: bool = True
+    ) -> Dict[str, Any]:
+        """Write one export run; only changed records when ``incremental``"""
+
+        started_at = datetime.now()
+        run_dir = os.path.join(self.output_dir, f"run={started_at.strftime('%Y%m%dT%H%M%S')}")
+        os.makedirs(run_dir, exist_ok=True)
+
+        results = {}
+        for kind in kinds:
+            if kind not in self.KINDS:
+                raise ValueError(f"Unknown export kind {kind}")
+            results[kind] = await self._export_kind(kind, run_dir, incremental)
+
+        # Commit the watermark only once every file is closed
+        self.state["last_run_at"] = started_at.isoformat()
+        self._save_state()
+
+        logger.info(
+            "Exported %s to %s",
+            ", ".join(f"{count['written']} {kind}" for kind, count in results.items()),
+            run_dir
+        )
+        return {"run_dir": run_dir, "incremental": incremental, "started_at": started_at, **results}
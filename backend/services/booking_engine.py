@@ -3,11 +3,20 @@ Booking Engine for SiamStay
 Handles reservations, availability, and booking lifecycle
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Iterable, Iterator, Tuple, Type, Union, Callable
+from typing import get_args, get_origin
+from array import array
+from bisect import bisect_right
 from enum import Enum
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel, Field
 import logging
+import math
+import sys
+
+from backend.core.metrics import timed
+from backend.core.serialization import get_serializer
+from backend.core.trusted import build_model
 
 logger = logging.getLogger(__name__)
 
@@ -67,13 +76,21 @@ class BookingDetails(BaseModel):
     stay_duration_months: float
     
     def __init__(self, **data):
+        super().__init__(**self._prepare_trusted(data))
+    
+    @classmethod
+    def _prepare_trusted(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Derive stay duration fields (shared with trusted construction)"""
         if 'check_in' in data and 'check_out' in data:
             check_in = data['check_in']
             check_out = data['check_out']
             stay_days = (check_out - check_in).days
-            data['stay_duration_days'] = stay_days
-            data['stay_duration_months'] = stay_days / 30.0
-        super().__init__(**data)
+            data = {
+                **data,
+                'stay_duration_days': stay_days,
+                'stay_duration_months': stay_days / 30.0
+            }
+        return data
 
 
 class PricingBreakdown(BaseModel):
@@ -137,6 +154,9 @@ class AvailabilityCalendar:
     def __init__(self):
         # property_id -> {date: booking_id or "blocked"}
         self.calendar: Dict[str, Dict[date, str]] = {}
+        # property_id -> sorted, merged [start, end) day-ordinal runs of
+        # blocked days; rebuilt lazily after the calendar changes
+        self._busy: Dict[str, Tuple[List[int], List[int]]] = {}
     
     def check_availability(
         self,
@@ -173,6 +193,7 @@ class AvailabilityCalendar:
             self.calendar[property_id] = {}
         
         property_calendar = self.calendar[property_id]
+        self._busy.pop(property_id, None)
         
         # Block each date in the range
         current_date = check_in
@@ -192,6 +213,7 @@ class AvailabilityCalendar:
             return
         
         property_calendar = self.calendar[property_id]
+        self._busy.pop(property_id, None)
         
         # Release each date in the range
         current_date = check_in
@@ -199,23 +221,743 @@ class AvailabilityCalendar:
             if current_date in property_calendar:
                 del property_calendar[current_date]
             current_date += timedelta(days=1)
+    
+    def release_bookings(
+        self,
+        property_id: str,
+        booking_ids: Iterable[str]
+    ) -> int:
+        """Release all dates held by the given bookings in one pass"""
+        
+        property_calendar = self.calendar.get(property_id)
+        if not property_calendar:
+            return 0
+        
+        booking_ids = set(booking_ids)
+        released = [
+            day for day, holder in property_calendar.items()
+            if holder in booking_ids
+        ]
+        for day in released:
+            del property_calendar[day]
+        if released:
+            self._busy.pop(property_id, None)
+        
+        return len(released)
+    
+    def hold_dates(
+        self,
+        property_id: str,
+        check_in: date,
+        check_out: date,
+        holder: str
+    ) -> List[date]:
+        """Block the free dates in a range for ``holder``
+        
+        Dates already held by someone else are left alone and returned, so
+        an external hold never overwrites a booking.
+        """
+        
+        property_calendar = self.calendar.setdefault(property_id, {})
+        conflicts = []
+        changed = False
+        
+        current_date = check_in
+        while current_date < check_out:
+            current_holder = property_calendar.get(current_date)
+            if current_holder is None:
+                property_calendar[current_date] = holder
+                changed = True
+            elif current_holder != holder:
+                conflicts.append(current_date)
+            current_date += timedelta(days=1)
+        
+        if changed:
+            self._busy.pop(property_id, None)
+        return conflicts
+    
+    def release_hold(
+        self,
+        property_id: str,
+        check_in: date,
+        check_out: date,
+        holder: str
+    ) -> int:
+        """Release the dates in a range held by ``holder`` only"""
+        
+        property_calendar = self.calendar.get(property_id)
+        if not property_calendar:
+            return 0
+        
+        released = 0
+        current_date = check_in
+        while current_date < check_out:
+            if property_calendar.get(current_date) == holder:
+                del property_calendar[current_date]
+                released += 1
+            current_date += timedelta(days=1)
+        
+        if released:
+            self._busy.pop(property_id, None)
+        return released
+    
+    def _busy_runs(self, property_id: str) -> Tuple[List[int], List[int]]:
+        """Blocked days of a property as parallel run start/end lists"""
+        
+        runs = self._busy.get(property_id)
+        if runs is None:
+            starts: List[int] = []
+            ends: List[int] = []
+            for day in sorted(day.toordinal() for day in self.calendar.get(property_id, ())):
+                if ends and ends[-1] == day:
+                    ends[-1] = day + 1
+                else:
+                    starts.append(day)
+                    ends.append(day + 1)
+            runs = self._busy[property_id] = (starts, ends)
+        return runs
+    
+    def busy_periods(self, property_id: str) -> List[Tuple[date, date]]:
+        """Blocked periods as sorted, merged [start, end) date ranges"""
+        
+        starts, ends = self._busy_runs(property_id)
+        return [
+            (date.fromordinal(start), date.fromordinal(end))
+            for start, end in zip(starts, ends)
+        ]
+    
+    def find_free_windows(
+        self,
+        property_id: str,
+        min_days: int,
+        start: date,
+        end: date,
+        limit: Optional[int] = None
+    ) -> List[Tuple[date, date]]:
+        """Free [start, end) windows of at least ``min_days`` nights
+        
+        Only the part of each gap between ``start`` and ``end`` counts.
+        """
+        
+        starts, ends = self._busy_runs(property_id)
+        first, last = start.toordinal(), end.toordinal()
+        windows: List[Tuple[date, date]] = []
+        
+        # First blocked run ending after the search start
+        i = bisect_right(ends, first)
+        cursor = first
+        while cursor < last and (limit is None or len(windows) < limit):
+            gap_end = min(starts[i], last) if i < len(starts) else last
+            if gap_end - cursor >= min_days:
+                windows.append((date.fromordinal(cursor), date.fromordinal(gap_end)))
+            if i >= len(starts):
+                break
+            cursor = max(cursor, ends[i])
+            i += 1
+        
+        return windows
+    
+    def earliest_check_in(
+        self,
+        property_id: str,
+        stay_days: int,
+        earliest: date,
+        latest: date
+    ) -> Optional[date]:
+        """First check-in between ``earliest`` and ``latest`` allowing ``stay_days`` free nights"""
+        
+        windows = self.find_free_windows(
+            property_id, stay_days, earliest, latest + timedelta(days=stay_days), limit=1
+        )
+        return windows[0][0] if windows else None
+    
+    def find_free_windows_many(
+        self,
+        property_ids: Iterable[str],
+        min_days: int,
+        start: date,
+        end: date,
+        limit: Optional[int] = None
+    ) -> Dict[str, List[Tuple[date, date]]]:
+        """Free windows for several properties, omitting fully booked ones"""
+        
+        results = {}
+        for property_id in property_ids:
+            windows = self.find_free_windows(property_id, min_days, start, end, limit)
+            if windows:
+                results[property_id] = windows
+        return results
+
+
+class GuestRegistry:
+    """Deduplicated guest profiles shared by all of a guest's bookings
+    
+    A booking matches a known guest by guest_id, or by email and passport
+    number together; email or passport alone never merges two people.
+    Profiles are versioned copy-on-write: a booking whose contact or visa
+    details differ gets its own snapshot, so past bookings (and their TM30
+    data) keep the details they were made with, and the guest's current
+    profile only follows newer records. Each guest's booking ids are kept
+    so their stays can be listed without a scan. ``previous_bookings``
+    counts completed (checked-out) stays.
+    """
+    
+    # Bookkeeping fields owned by the registry, never taken from booking input
+    _MANAGED_FIELDS = {"guest_id", "guest_score", "previous_bookings", "verified"}
+    
+    def __init__(self):
+        # guest_id -> current profile
+        self.guests: Dict[str, GuestProfile] = {}
+        self.by_email: Dict[str, str] = {}
+        self.by_passport: Dict[str, str] = {}
+        # (email, passport_number) -> guest_id
+        self.by_identity: Dict[Tuple[str, str], str] = {}
+        # guest_id -> profile snapshots, oldest first; the first is keyed by
+        # the bare guest_id, later ones by "guest_id#n"
+        self.versions: Dict[str, List[GuestProfile]] = {}
+        # guest_id -> timestamp of the record the current profile came from
+        self._current_as_of: Dict[str, datetime] = {}
+        # guest_id -> booking_ids, live and archived
+        self.stays: Dict[str, List[str]] = {}
+    
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return email.strip().lower()
+    
+    def __len__(self) -> int:
+        return len(self.guests)
+    
+    def get(self, guest_id: str) -> Optional[GuestProfile]:
+        return self.guests.get(guest_id)
+    
+    def snapshot_key(self, profile: GuestProfile) -> str:
+        """Key of the registered snapshot ``profile`` is"""
+        
+        for n, version in enumerate(self.versions.get(profile.guest_id, ())):
+            if version is profile:
+                return profile.guest_id if n == 0 else f"{profile.guest_id}#{n}"
+        raise ValueError(f"Guest profile {profile.guest_id} is not registered")
+    
+    def snapshot(self, key: str) -> Optional[GuestProfile]:
+        """Profile snapshot by ``snapshot_key``"""
+        
+        guest_id, _, n = key.partition("#")
+        versions = self.versions.get(guest_id)
+        if not versions:
+            return None
+        return versions[int(n) if n else 0]
+    
+    def find(
+        self,
+        guest_id: Optional[str] = None,
+        email: Optional[str] = None,
+        passport_number: Optional[str] = None
+    ) -> Optional[GuestProfile]:
+        """Look up a guest by id, then passport number, then email"""
+        
+        if guest_id and guest_id in self.guests:
+            return self.guests[guest_id]
+        if passport_number and passport_number in self.by_passport:
+            return self.guests[self.by_passport[passport_number]]
+        if email:
+            known_id = self.by_email.get(self._email_key(email))
+            if known_id:
+                return self.guests[known_id]
+        return None
+    
+    def _match(self, profile: GuestProfile) -> Optional[str]:
+        if profile.guest_id in self.guests:
+            return profile.guest_id
+        if profile.passport_number:
+            return self.by_identity.get(
+                (self._email_key(profile.email), profile.passport_number)
+            )
+        return None
+    
+    def _index(self, guest: GuestProfile):
+        self.by_email[self._email_key(guest.email)] = guest.guest_id
+        if guest.passport_number:
+            self.by_passport[guest.passport_number] = guest.guest_id
+            self.by_identity[
+                (self._email_key(guest.email), guest.passport_number)
+            ] = guest.guest_id
+    
+    def _unindex(self, guest: GuestProfile):
+        email_key = self._email_key(guest.email)
+        if self.by_email.get(email_key) == guest.guest_id:
+            del self.by_email[email_key]
+        if self.by_passport.get(guest.passport_number) == guest.guest_id:
+            del self.by_passport[guest.passport_number]
+    
+    def _details(self, profile: GuestProfile) -> Dict[str, Any]:
+        return {
+            name: getattr(profile, name)
+            for name in GuestProfile.model_fields
+            if name not in self._MANAGED_FIELDS
+        }
+    
+    def resolve(
+        self,
+        profile: GuestProfile,
+        as_of: Optional[datetime] = None,
+        merge: bool = True
+    ) -> GuestProfile:
+        """Return the registered profile snapshot for this booking's guest
+        
+        ``as_of`` is when the booking record was made (now by default). A
+        known guest's details are merged into a new snapshot when they
+        differ; it becomes the current profile only if the record is at
+        least as recent as the one the current profile came from. With
+        ``merge=False`` (stored records) the profile's details are taken
+        as-is instead of filling unset ones from the current profile.
+        """
+        
+        as_of = as_of or datetime.now()
+        guest_id = self._match(profile)
+        if guest_id is None:
+            # Stay history is rebuilt from the bookings linked to this registry
+            profile.previous_bookings = 0
+            self.guests[profile.guest_id] = profile
+            self.versions[profile.guest_id] = [profile]
+            self._current_as_of[profile.guest_id] = as_of
+            self.stays.setdefault(profile.guest_id, [])
+            self._index(profile)
+            return profile
+        
+        current = self.guests[guest_id]
+        if profile is current:
+            return current
+        
+        if merge:
+            updates = {
+                name: getattr(profile, name)
+                for name in profile.model_fields_set - self._MANAGED_FIELDS
+                if getattr(profile, name) is not None
+            }
+        else:
+            updates = self._details(profile)
+        details = {**self._details(current), **updates}
+        
+        versions = self.versions[guest_id]
+        snapshot = next(
+            (version for version in reversed(versions) if self._details(version) == details),
+            None
+        )
+        if snapshot is None:
+            snapshot = current.model_copy(update=updates)
+            versions.append(snapshot)
+        
+        if snapshot is not current and as_of >= self._current_as_of[guest_id]:
+            self._unindex(current)
+            self.guests[guest_id] = snapshot
+            self._current_as_of[guest_id] = as_of
+            self._index(snapshot)
+        elif snapshot.passport_number:
+            # Older details still identify this guest
+            self.by_identity.setdefault(
+                (self._email_key(snapshot.email), snapshot.passport_number), guest_id
+            )
+        
+        return snapshot
+    
+    def add_stay(self, guest_id: str, booking_id: str, completed: bool = False):
+        """Link a booking to its guest"""
+        
+        self.stays.setdefault(guest_id, []).append(booking_id)
+        if completed:
+            self.complete_stay(guest_id)
+    
+    def complete_stay(self, guest_id: str):
+        """Count a checked-out stay towards the guest's history"""
+        
+        for version in self.versions.get(guest_id, ()):
+            version.previous_bookings += 1
+    
+    def booking_ids(self, guest_id: str) -> List[str]:
+        return self.stays.get(guest_id, [])
+
+
+class BookingArchive:
+    """Compact column store for finished (checked-out/cancelled) bookings
+    
+    Every flattened ``Booking`` field is kept in its own column: numbers,
+    dates and timestamps in typed arrays, enums as byte codes and repeated
+    strings interned. Records are rehydrated to ``Booking`` on demand.
+    With a ``GuestRegistry`` only the key of the booking's guest profile
+    snapshot is stored and the shared snapshot is attached on rehydration.
+    """
+    
+    # Sentinels for missing values in integer-backed columns
+    _NONE_INT = -(2 ** 63)
+    _NONE_CODE = 255
+    _EPOCH = datetime(1970, 1, 1)
+    _MICROSECOND = timedelta(microseconds=1)
+    
+    # High-cardinality strings are stored as-is rather than interned
+    _UNIQUE_STRINGS = {
+        ("booking_id",),
+        ("guest", "passport_number"),
+        ("details", "special_requests"),
+        ("review_text",),
+    }
+    
+    def __init__(self, guest_registry: Optional[GuestRegistry] = None):
+        self.guest_registry = guest_registry
+        self._schema: List[Tuple[Tuple[str, ...], str, Any]] = []
+        self._models: Dict[Tuple[str, ...], Type[BaseModel]] = {(): Booking}
+        self._build_schema(Booking, ())
+        
+        self._columns: List[Any] = [
+            self._new_column(kind) for _, kind, _ in self._schema
+        ]
+        self._column_index = {
+            path: i for i, (path, _, _) in enumerate(self._schema)
+        }
+        self._rows: Dict[str, int] = {}
+    
+    def _build_schema(self, model: Type[BaseModel], prefix: Tuple[str, ...]):
+        """Flatten model fields into (path, kind, enum members) columns"""
+        
+        for name, field in model.model_fields.items():
+            path = prefix + (name,)
+            annotation = field.annotation
+            if get_origin(annotation) is Union:
+                annotation = next(
+                    arg for arg in get_args(annotation) if arg is not type(None)
+                )
+            
+            if annotation is GuestProfile and self.guest_registry is not None:
+                self._schema.append((path, "guest", None))
+            elif issubclass(annotation, BaseModel):
+                self._models[path] = annotation
+                self._build_schema(annotation, path)
+            elif issubclass(annotation, Enum):
+                self._schema.append((path, "enum", list(annotation)))
+            elif annotation is bool:
+                self._schema.append((path, "bool", None))
+            elif annotation is int:
+                self._schema.append((path, "int", None))
+            elif annotation is float:
+                self._schema.append((path, "float", None))
+            elif annotation is datetime:
+                self._schema.append((path, "datetime", None))
+            elif annotation is date:
+                self._schema.append((path, "date", None))
+            else:
+                self._schema.append((path, "str", path in self._UNIQUE_STRINGS))
+    
+    @staticmethod
+    def _new_column(kind: str):
+        if kind in ("enum", "bool"):
+            return bytearray()
+        if kind == "float":
+            return array("d")
+        if kind in ("int", "date", "datetime"):
+            return array("q")
+        return []
+    
+    def _encode(self, kind: str, extra: Any, value: Any):
+        if kind == "enum":
+            return self._NONE_CODE if value is None else extra.index(value)
+        if kind == "bool":
+            return 1 if value else 0
+        if kind == "float":
+            return math.nan if value is None else value
+        if kind == "guest":
+            return sys.intern(self.guest_registry.snapshot_key(value))
+        if kind == "int":
+            return self._NONE_INT if value is None else value
+        if kind == "date":
+            return 0 if value is None else value.toordinal()
+        if kind == "datetime":
+            if value is None:
+                return self._NONE_INT
+            return (value - self._EPOCH) // self._MICROSECOND
+        if value is None or extra:
+            return value
+        return sys.intern(value)
+    
+    def _decode(self, kind: str, extra: Any, value: Any):
+        if kind == "enum":
+            return None if value == self._NONE_CODE else extra[value]
+        if kind == "bool":
+            return bool(value)
+        if kind == "float":
+            return None if math.isnan(value) else value
+        if kind == "guest":
+            return self.guest_registry.snapshot(value)
+        if kind == "int":
+            return None if value == self._NONE_INT else value
+        if kind == "date":
+            return None if value == 0 else date.fromordinal(value)
+        if kind == "datetime":
+            if value == self._NONE_INT:
+                return None
+            return self._EPOCH + value * self._MICROSECOND
+        return value
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, booking_id: str) -> bool:
+        return booking_id in self._rows
+    
+    def booking_ids(self) -> List[str]:
+        return list(self._rows)
+    
+    @property
+    def stored_rows(self) -> int:
+        """Physical rows appended so far, including removed ones"""
+        return len(self._columns[0])
+    
+    def booking_ids_since(self, row: int) -> List[str]:
+        """Bookings archived at or after physical row ``row``, in archive order
+        
+        Rows only ever grow, so a saved ``stored_rows`` works as a watermark
+        (a restored and re-archived booking gets a new row).
+        """
+        return [booking_id for booking_id, index in self._rows.items() if index >= row]
+    
+    def add(self, booking: Booking):
+        """Append a booking to the archive"""
+        
+        if booking.booking_id in self._rows:
+            raise ValueError(f"Booking {booking.booking_id} already archived")
+        if booking.created_at.tzinfo is not None:
+            raise ValueError("Only naive timestamps can be archived")
+        
+        row = len(self._columns[0])
+        for column, (path, kind, extra) in zip(self._columns, self._schema):
+            value = booking
+            for name in path:
+                value = getattr(value, name)
+            column.append(self._encode(kind, extra, value))
+        
+        self._rows[booking.booking_id] = row
+    
+    def get(self, booking_id: str) -> Optional[Booking]:
+        """Rehydrate an archived booking"""
+        
+        row = self._rows.get(booking_id)
+        if row is None:
+            return None
+        
+        values: Dict[Tuple[str, ...], Dict[str, Any]] = {
+            path: {} for path in self._models
+        }
+        for column, (path, kind, extra) in zip(self._columns, self._schema):
+            values[path[:-1]][path[-1]] = self._decode(kind, extra, column[row])
+        
+        # Archived data was validated on the way in, build nested models bottom-up
+        for path in sorted(self._models, key=len, reverse=True):
+            model = self._models[path].model_construct(**values[path])
+            if not path:
+                return model
+            values[path[:-1]][path[-1]] = model
+    
+    def remove(self, booking_id: str) -> Optional[Booking]:
+        """Remove a booking from the archive, returning it rehydrated
+        
+        The row's storage is left in place; archives are append-mostly.
+        """
+        
+        booking = self.get(booking_id)
+        if booking is not None:
+            del self._rows[booking_id]
+        return booking
+    
+    def iter_rows(
+        self,
+        paths: List[Tuple[str, ...]],
+        booking_ids: Optional[Iterable[str]] = None
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Decoded field tuples per archived booking, without rehydrating
+        
+        ``paths`` are flattened field paths such as ``("guest", "email")``.
+        """
+        
+        readers = []
+        for path in paths:
+            index = self._column_index.get(path)
+            attribute = None
+            if index is None and path[0] == "guest":
+                # Shared guest profiles are stored by snapshot key only
+                index = self._column_index.get(("guest",))
+                attribute = path[1]
+            if index is None:
+                raise ValueError(f"Unknown booking field {'.'.join(path)}")
+            _, kind, extra = self._schema[index]
+            readers.append((self._columns[index], kind, extra, attribute))
+        
+        if booking_ids is None:
+            rows = self._rows.values()
+        else:
+            rows = (self._rows[booking_id] for booking_id in booking_ids)
+        
+        for row in rows:
+            values = []
+            for column, kind, extra, attribute in readers:
+                value = self._decode(kind, extra, column[row])
+                if attribute is not None and value is not None:
+                    value = getattr(value, attribute)
+                values.append(value)
+            yield tuple(values)
+    
+    def column(self, *path: str) -> List[Any]:
+        """Decoded values of one field for all archived bookings"""
+        
+        index = self._column_index.get(path)
+        if index is None:
+            raise ValueError(f"Unknown booking field {'.'.join(path)}")
+        _, kind, extra = self._schema[index]
+        column = self._columns[index]
+        return [self._decode(kind, extra, column[row]) for row in self._rows.values()]
+
+
+# Called with (booking, previous status) after every status change;
+# previous status is None for newly created bookings
+BookingTransitionListener = Callable[[Booking, Optional[BookingStatus]], None]
 
 
 class BookingEngine:
     """Core booking management service"""
     
-    def __init__(self):
+    # Bookings in these states are moved to the compact archive
+    ARCHIVED_STATUSES = (BookingStatus.CHECKED_OUT, BookingStatus.CANCELLED)
+    # Bookings in these states have released their calendar dates
+    RELEASED_STATUSES = ARCHIVED_STATUSES + (BookingStatus.NO_SHOW,)
+    
+    def __init__(self, auto_archive: bool = True):
         self.bookings: Dict[str, Booking] = {}
         self.availability = AvailabilityCalendar()
+        # property_id -> live booking_ids, so per-property operations skip a full scan
+        self.property_bookings: Dict[str, Set[str]] = {}
+        self.guests = GuestRegistry()
+        self.archive = BookingArchive(self.guests)
+        self.auto_archive = auto_archive
+        self.transition_listeners: List[BookingTransitionListener] = []
+    
+    def add_transition_listener(self, listener: BookingTransitionListener):
+        """Subscribe to booking status transitions"""
+        self.transition_listeners.append(listener)
+    
+    def _notify_transition(self, booking: Booking, previous: Optional[BookingStatus]):
+        for listener in self.transition_listeners:
+            listener(booking, previous)
+    
+    def get_booking(self, booking_id: str) -> Optional[Booking]:
+        """Get a live booking, or rehydrate it from the archive"""
+        
+        booking = self.bookings.get(booking_id)
+        if booking is None:
+            booking = self.archive.get(booking_id)
+        return booking
     
+    def archive_booking(self, booking_id: str):
+        """Move a finished booking into the compact archive"""
+        
+        booking = self.bookings.get(booking_id)
+        if not booking:
+            raise ValueError(f"Booking {booking_id} not found")
+        
+        if booking.status not in self.ARCHIVED_STATUSES:
+            raise ValueError(f"Booking {booking_id} is still active")
+        
+        self.archive.add(booking)
+        del self.bookings[booking_id]
+        self.property_bookings.get(booking.property_id, set()).discard(booking_id)
+    
+    def archive_finished_bookings(self) -> int:
+        """Archive every checked-out or cancelled live booking"""
+        
+        finished = [
+            booking_id for booking_id, booking in self.bookings.items()
+            if booking.status in self.ARCHIVED_STATUSES
+        ]
+        for booking_id in finished:
+            self.archive_booking(booking_id)
+        
+        return len(finished)
+    
+    def restore_booking(self, booking_id: str) -> Booking:
+        """Move an archived booking back to live storage (e.g. to add a review)"""
+        
+        booking = self.archive.remove(booking_id)
+        if not booking:
+            raise ValueError(f"Booking {booking_id} not archived")
+        
+        self.bookings[booking_id] = booking
+        self.property_bookings.setdefault(booking.property_id, set()).add(booking_id)
+        return booking
+    
+    def _update_fields(self, booking_id: str, **fields: Any) -> Booking:
+        """Set fields on a live or archived booking"""
+        
+        booking = self.bookings.get(booking_id)
+        if booking is not None:
+            for name, value in fields.items():
+                setattr(booking, name, value)
+            return booking
+        
+        booking = self.archive.remove(booking_id)
+        if booking is None:
+            raise ValueError(f"Booking {booking_id} not found")
+        for name, value in fields.items():
+            setattr(booking, name, value)
+        # Re-appended as a new row, so incremental exports pick up the change
+        self.archive.add(booking)
+        return booking
+    
+    def set_payment_status(self, booking_id: str, status: PaymentStatus) -> Booking:
+        """Update a live or archived booking's payment status"""
+        return self._update_fields(booking_id, payment_status=status)
+    
+    def mark_tm30_filed(self, booking_id: str) -> Booking:
+        """Record an acknowledged TM30 filing, even if the stay has ended"""
+        return self._update_fields(booking_id, tm30_filed=True)
+    
+    def get_guest_bookings(self, guest_id: str) -> List[Booking]:
+        """All live and archived bookings of one guest, oldest first"""
+        
+        bookings = [
+            self.get_booking(booking_id)
+            for booking_id in self.guests.booking_ids(guest_id)
+        ]
+        return sorted(
+            (booking for booking in bookings if booking is not None),
+            key=lambda booking: booking.created_at
+        )
+    
+    def get_guest_bookings_json(
+        self,
+        guest_id: str,
+        fields: Optional[List[str]] = None
+    ) -> bytes:
+        """A guest's bookings encoded straight to JSON bytes
+        
+        ``fields`` optionally projects each booking to those dotted paths
+        (``"details.check_in"``); unknown paths raise ValueError.
+        """
+        
+        return get_serializer(Booking).dumps_many(self.get_guest_bookings(guest_id), fields)
+    
+    @timed("booking_engine")
     async def create_booking(
         self,
         property_id: str,
         guest_data: Dict[str, Any],
         booking_data: Dict[str, Any],
-        pricing_data: Dict[str, Any]
+        pricing_data: Dict[str, Any],
+        trusted: bool = False,
+        booking_id: Optional[str] = None
     ) -> Booking:
-        """Create new booking reservation"""
+        """Create new booking reservation
+        
+        Pass ``trusted=True`` only for internally generated data (imports,
+        bulk jobs); it skips model validation. API input must stay validated.
+        ``booking_id`` is normally generated here; the shard router passes
+        one in so ids stay unique across worker processes.
+        """
         
         # Validate minimum stay (Thailand requirement)
         check_in = booking_data["check_in"]
@@ -230,28 +972,85 @@ class BookingEngine:
             raise ValueError("Property not available for selected dates")
         
         # Generate booking ID
-        booking_id = f"book_{datetime.now().timestamp()}"
+        if booking_id is None:
+            booking_id = f"book_{datetime.now().timestamp()}"
+        elif booking_id in self.bookings or booking_id in self.archive:
+            raise ValueError(f"Booking {booking_id} already exists")
         
         # Create booking
         booking = Booking(
             booking_id=booking_id,
             property_id=property_id,
-            guest=GuestProfile(**guest_data),
-            details=BookingDetails(**booking_data),
-            pricing=PricingBreakdown(**pricing_data),
+            guest=self.guests.resolve(build_model(GuestProfile, guest_data, trusted)),
+            details=build_model(BookingDetails, booking_data, trusted),
+            pricing=build_model(PricingBreakdown, pricing_data, trusted),
             created_at=datetime.now()
         )
         
         # Store booking
         self.bookings[booking_id] = booking
+        self.property_bookings.setdefault(property_id, set()).add(booking_id)
+        self.guests.add_stay(booking.guest.guest_id, booking_id)
         
         # Block dates
         self.availability.block_dates(property_id, check_in, check_out, booking_id)
         
-        logger.info(f"Created booking {booking_id} for property {property_id}")
+        self._notify_transition(booking, None)
+        
+        logger.info("Created booking %s for property %s", booking_id, property_id)
         
         return booking
     
+    def load_bookings(
+        self,
+        records: Iterable[Union[Booking, Dict[str, Any]]],
+        trusted: bool = True
+    ) -> int:
+        """Bulk-load bookings from storage (``Booking.model_dump()`` records)
+        
+        Records are our own data, so they are constructed without
+        re-validation unless ``trusted=False``. Booking instances are
+        stored as-is.
+        """
+        
+        loaded = 0
+        for record in records:
+            if isinstance(record, Booking):
+                booking = record
+            else:
+                booking = build_model(Booking, record, trusted)
+            
+            booking.guest = self.guests.resolve(
+                booking.guest, booking.created_at, merge=False
+            )
+            self.guests.add_stay(
+                booking.guest.guest_id,
+                booking.booking_id,
+                completed=booking.status == BookingStatus.CHECKED_OUT
+            )
+            
+            if self.auto_archive and booking.status in self.ARCHIVED_STATUSES:
+                self.archive.add(booking)
+            else:
+                self.bookings[booking.booking_id] = booking
+                self.property_bookings.setdefault(
+                    booking.property_id, set()
+                ).add(booking.booking_id)
+                # Finished and no-show bookings no longer hold their dates
+                if booking.status not in self.RELEASED_STATUSES:
+                    self.availability.block_dates(
+                        booking.property_id,
+                        booking.details.check_in,
+                        booking.details.check_out,
+                        booking.booking_id
+                    )
+            loaded += 1
+        
+        logger.info("Loaded %s bookings", loaded)
+        
+        return loaded
+    
+    @timed("booking_engine")
     async def confirm_booking(self, booking_id: str) -> Booking:
         """Confirm booking after payment verification"""
         
@@ -266,13 +1065,16 @@ class BookingEngine:
         booking.status = BookingStatus.CONFIRMED
         booking.confirmed_at = datetime.now()
         
-        # TODO: Send confirmation email
-        booking.confirmation_sent = True
+        # The confirmation is sent by the notification outbox (listening for
+        # this transition); confirmation_sent is set once it is delivered
+        
+        self._notify_transition(booking, BookingStatus.PENDING)
         
-        logger.info(f"Confirmed booking {booking_id}")
+        logger.info("Confirmed booking %s", booking_id)
         
         return booking
     
+    @timed("booking_engine")
     async def cancel_booking(
         self,
         booking_id: str,
@@ -280,7 +1082,7 @@ class BookingEngine:
     ) -> Dict[str, Any]:
         """Cancel booking and calculate refund"""
         
-        booking = self.bookings.get(booking_id)
+        booking = self.get_booking(booking_id)
         if not booking:
             raise ValueError(f"Booking {booking_id} not found")
         
@@ -291,17 +1093,26 @@ class BookingEngine:
         refund_amount = self._calculate_refund(booking)
         
         # Update booking status
+        previous = booking.status
         booking.status = BookingStatus.CANCELLED
         booking.cancelled_at = datetime.now()
         
-        # Release dates
-        self.availability.release_dates(
-            booking.property_id,
-            booking.details.check_in,
-            booking.details.check_out
-        )
+        # Release dates still held by this booking; a no-show's nights may
+        # already belong to a newer booking
+        if previous not in self.RELEASED_STATUSES:
+            self.availability.release_hold(
+                booking.property_id,
+                booking.details.check_in,
+                booking.details.check_out,
+                booking_id
+            )
         
-        logger.info(f"Cancelled booking {booking_id}, refund: {refund_amount}")
+        self._notify_transition(booking, previous)
+        
+        if self.auto_archive:
+            self.archive_booking(booking_id)
+        
+        logger.info("Cancelled booking %s, refund: %s", booking_id, refund_amount)
         
         return {
             "booking_id": booking_id,
@@ -310,6 +1121,60 @@ class BookingEngine:
             "reason": reason
         }
     
+    @timed("booking_engine")
+    async def cancel_property_bookings(
+        self,
+        property_id: str,
+        reason: str = "property_suspended"
+    ) -> List[Dict[str, Any]]:
+        """Cancel every upcoming booking on a property in one pass"""
+        
+        cancellable = [
+            self.bookings[booking_id]
+            for booking_id in self.property_bookings.get(property_id, ())
+            if self.bookings[booking_id].status in (
+                BookingStatus.PENDING, BookingStatus.CONFIRMED
+            )
+        ]
+        if not cancellable:
+            return []
+        
+        cancelled_at = datetime.now()
+        cancellations = []
+        
+        previous_statuses = {}
+        
+        for booking in sorted(cancellable, key=lambda b: b.details.check_in):
+            refund_amount = self._calculate_refund(booking)
+            previous_statuses[booking.booking_id] = booking.status
+            booking.status = BookingStatus.CANCELLED
+            booking.cancelled_at = cancelled_at
+            cancellations.append({
+                "booking_id": booking.booking_id,
+                "cancelled_at": cancelled_at,
+                "refund_amount": refund_amount,
+                "reason": reason
+            })
+        
+        # Release all calendar ranges at once
+        self.availability.release_bookings(
+            property_id,
+            (booking.booking_id for booking in cancellable)
+        )
+        
+        for booking in cancellable:
+            self._notify_transition(booking, previous_statuses[booking.booking_id])
+            if self.auto_archive:
+                self.archive_booking(booking.booking_id)
+        
+        logger.info(
+            "Cancelled %d bookings for property %s (%s)",
+            len(cancellations), property_id, reason
+        )
+        
+        return cancellations
+    
+    @timed("booking_engine")
     async def check_in_guest(
         self,
         booking_id: str,
@@ -328,11 +1193,63 @@ class BookingEngine:
         booking.status = BookingStatus.CHECKED_IN
         booking.checked_in_at = datetime.now()
         
-        # Mark TM30 filing as required
-        # TODO: Integrate with Thai immigration system
-        booking.tm30_filed = True
+        # TM30 is filed asynchronously by the submission queue (listening
+        # for this transition); tm30_filed is set once immigration acknowledges
+        
+        self._notify_transition(booking, BookingStatus.CONFIRMED)
         
-        logger.info(f"Checked in guest for booking {booking_id}")
+        logger.info("Checked in guest for booking %s", booking_id)
+        
+        return booking
+    
+    @timed("booking_engine")
+    async def check_out_guest(self, booking_id: str) -> Booking:
+        """Process guest check-out"""
+        
+        booking = self.bookings.get(booking_id)
+        if not booking:
+            raise ValueError(f"Booking {booking_id} not found")
+        
+        if booking.status != BookingStatus.CHECKED_IN:
+            raise ValueError(f"Booking {booking_id} not checked in")
+        
+        booking.status = BookingStatus.CHECKED_OUT
+        booking.checked_out_at = datetime.now()
+        self.guests.complete_stay(booking.guest.guest_id)
+        
+        self._notify_transition(booking, BookingStatus.CHECKED_IN)
+        
+        if self.auto_archive:
+            self.archive_booking(booking_id)
+        
+        logger.info("Checked out guest for booking %s", booking_id)
+        
+        return booking
+    
+    @timed("booking_engine")
+    async def mark_no_show(self, booking_id: str) -> Booking:
+        """Mark a confirmed booking whose guest never arrived"""
+        
+        booking = self.bookings.get(booking_id)
+        if not booking:
+            raise ValueError(f"Booking {booking_id} not found")
+        
+        if booking.status != BookingStatus.CONFIRMED:
+            raise ValueError(f"Booking {booking_id} cannot be marked as no-show")
+        
+        booking.status = BookingStatus.NO_SHOW
+        
+        # Free the nights for new bookings
+        self.availability.release_hold(
+            booking.property_id,
+            booking.details.check_in,
+            booking.details.check_out,
+            booking_id
+        )
+        
+        self._notify_transition(booking, BookingStatus.CONFIRMED)
+        
+        logger.info("Marked booking %s as no-show", booking_id)
         
         return booking
     
@@ -352,10 +1269,14 @@ class BookingEngine:
         else:
             return total_paid * 0.25  # 25% refund
     
+    @timed("booking_engine")
     async def get_booking_analytics(self) -> Dict[str, Any]:
         """Get overall booking analytics"""
         
-        total_bookings = len(self.bookings)
+        archived_statuses = self.archive.column("status")
+        archived_totals = self.archive.column("pricing", "total_amount")
+        
+        total_bookings = len(self.bookings) + len(self.archive)
         confirmed_bookings = sum(
             1 for b in self.bookings.values() 
             if b.status == BookingStatus.CONFIRMED
@@ -364,6 +1285,9 @@ class BookingEngine:
         total_revenue = sum(
             b.pricing.total_amount for b in self.bookings.values()
             if b.status != BookingStatus.CANCELLED
+        ) + sum(
+            amount for status, amount in zip(archived_statuses, archived_totals)
+            if status != BookingStatus.CANCELLED
         )
         
         return {
@@ -372,7 +1296,8 @@ class BookingEngine:
             "confirmation_rate": confirmed_bookings / max(total_bookings, 1),
             "total_revenue": total_revenue,
             "average_booking_value": total_revenue / max(confirmed_bookings, 1),
-            "average_stay_duration": sum(
-                b.details.stay_duration_days for b in self.bookings.values()
+            "average_stay_duration": (
+                sum(b.details.stay_duration_days for b in self.bookings.values())
+                + sum(self.archive.column("details", "stay_duration_days"))
             ) / max(total_bookings, 1)
         }
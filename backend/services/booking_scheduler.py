@@ -0,0 +1,252 @@
+"""
+Booking Lifecycle Scheduler for SiamStay
+Heap-based deadlines for no-shows, TM30 filing, check-in instructions and payment expiry
+"""
+
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Tuple
+from enum import Enum
+from datetime import datetime, time, timedelta
+from pydantic import BaseModel
+import asyncio
+import heapq
+import itertools
+import logging
+
+from backend.core.rate_limit import backoff_delay
+from backend.services.booking_engine import Booking, BookingEngine, BookingStatus
+
+logger = logging.getLogger(__name__)
+
+
+class LifecycleAction(str, Enum):
+    """Deadline-driven booking actions"""
+    PAYMENT_EXPIRY = "payment_expiry"
+    CHECK_IN_INSTRUCTIONS = "check_in_instructions"
+    NO_SHOW = "no_show"
+    TM30_DUE = "tm30_due"
+
+
+class LifecyclePolicy(BaseModel):
+    """Deadline configuration"""
+    payment_expiry: timedelta = timedelta(hours=48)
+    check_in_instructions_lead: timedelta = timedelta(days=3)
+    no_show_grace: timedelta = timedelta(hours=24)
+    tm30_window: timedelta = timedelta(hours=24)  # Legal filing window
+    check_in_time: time = time(14, 0)
+
+
+# Receives the live booking when its deadline fires
+ActionHandler = Callable[[Booking], Awaitable[Any]]
+
+
+class DeadlineHeap:
+    """Min-heap of (due_at, key) deadlines with lazy cancellation
+
+    Rescheduling or cancelling a key leaves the old heap entry in place and
+    marks it stale, so every operation stays O(log n).
+    """
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._entries: Dict[Tuple[str, LifecycleAction], list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, key: Tuple[str, LifecycleAction], due_at: datetime):
+        self.cancel(key)
+        entry = [due_at, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, key: Tuple[str, LifecycleAction]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[3] = False
+
+    def due_at(self, key: Tuple[str, LifecycleAction]) -> Optional[datetime]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def peek(self) -> Optional[datetime]:
+        """Earliest live deadline"""
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, LifecycleAction]]:
+        """Remove and return every key due at or before ``now``"""
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key, live = heapq.heappop(self._heap)
+            if live:
+                del self._entries[key]
+                due.append(key)
+        return due
+
+
+class BookingLifecycleScheduler:
+    """Keeps booking deadlines in sync with BookingEngine transitions
+
+    Deadlines are derived purely from booking state, so after a restart
+    ``rebuild()`` recreates the schedule from ``BookingEngine.bookings``.
+    Only actions with a handler are scheduled; a failed handler is retried
+    with exponential backoff until it succeeds or the deadline no longer
+    applies.
+    """
+
+    def __init__(
+        self,
+        booking_engine: BookingEngine,
+        policy: Optional[LifecyclePolicy] = None,
+        retry_base_seconds: float = 30.0,
+        max_retry_seconds: float = 3600.0
+    ):
+        self.booking_engine = booking_engine
+        self.policy = policy or LifecyclePolicy()
+        self.retry_base_seconds = retry_base_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.deadlines = DeadlineHeap()
+        self.handlers: Dict[LifecycleAction, ActionHandler] = {
+            LifecycleAction.PAYMENT_EXPIRY: self._expire_payment,
+            LifecycleAction.NO_SHOW: self._mark_no_show,
+        }
+        # Failed attempts of deadlines waiting for a retry
+        self._attempts: Dict[Tuple[str, LifecycleAction], int] = {}
+        booking_engine.add_transition_listener(self._on_transition)
+
+    def set_handler(self, action: LifecycleAction, handler: ActionHandler):
+        """Plug in the handler for an action (e.g. TM30 or notification senders)
+
+        Deadlines of a newly handled action are scheduled for every live
+        booking.
+        """
+
+        newly_handled = action not in self.handlers
+        self.handlers[action] = handler
+        if newly_handled:
+            for booking in self.booking_engine.bookings.values():
+                self.refresh(booking)
+
+    def deadlines_for(self, booking: Booking) -> Dict[LifecycleAction, datetime]:
+        """Pending deadlines implied by a booking's current state"""
+
+        policy = self.policy
+        status = booking.status
+        check_in_at = datetime.combine(booking.details.check_in, policy.check_in_time)
+        deadlines = {}
+
+        if status == BookingStatus.PENDING:
+            deadlines[LifecycleAction.PAYMENT_EXPIRY] = (
+                booking.created_at + policy.payment_expiry
+            )
+
+        if status in (BookingStatus.PENDING, BookingStatus.CONFIRMED):
+            if not booking.check_in_instructions_sent:
+                deadlines[LifecycleAction.CHECK_IN_INSTRUCTIONS] = (
+                    check_in_at - policy.check_in_instructions_lead
+                )
+
+        if status == BookingStatus.CONFIRMED:
+            deadlines[LifecycleAction.NO_SHOW] = check_in_at + policy.no_show_grace
+
+        if status == BookingStatus.CHECKED_IN and not booking.tm30_filed:
+            deadlines[LifecycleAction.TM30_DUE] = (
+                (booking.checked_in_at or check_in_at) + policy.tm30_window
+            )
+
+        return deadlines
+
+    def refresh(self, booking: Booking):
+        """Reschedule one booking's deadlines from its current state"""
+
+        wanted = self.deadlines_for(booking)
+        for action in LifecycleAction:
+            key = (booking.booking_id, action)
+            due_at = wanted.get(action)
+            if due_at is None or action not in self.handlers:
+                self.deadlines.cancel(key)
+                self._attempts.pop(key, None)
+            elif key in self._attempts:
+                continue  # Keeps its retry time
+            elif self.deadlines.due_at(key) != due_at:
+                self.deadlines.schedule(key, due_at)
+
+    def _on_transition(self, booking: Booking, previous: Optional[BookingStatus]):
+        self.refresh(booking)
+
+    def rebuild(self) -> int:
+        """Recreate all deadlines from live booking state (e.g. after restart)"""
+
+        self.deadlines = DeadlineHeap()
+        self._attempts.clear()
+        for booking in self.booking_engine.bookings.values():
+            self.refresh(booking)
+
+        logger.info("Rebuilt lifecycle schedule with %d deadlines", len(self.deadlines))
+        return len(self.deadlines)
+
+    def next_due(self) -> Optional[datetime]:
+        return self.deadlines.peek()
+
+    def _retry_later(self, key: Tuple[str, LifecycleAction], now: datetime) -> datetime:
+        attempts = self._attempts[key] = self._attempts.get(key, 0) + 1
+        retry_at = now + timedelta(seconds=backoff_delay(
+            attempts, base=self.retry_base_seconds, maximum=self.max_retry_seconds
+        ))
+        self.deadlines.schedule(key, retry_at)
+        return retry_at
+
+    async def run_due(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Fire every deadline due at ``now``"""
+
+        now = now or datetime.now()
+        fired = []
+        for key in self.deadlines.pop_due(now):
+            booking_id, action = key
+            booking = self.booking_engine.bookings.get(booking_id)
+            # Archived since it was scheduled, or outdated if the booking
+            # changed without a transition
+            if booking is None or action not in self.deadlines_for(booking):
+                self._attempts.pop(key, None)
+                continue
+
+            handler = self.handlers.get(action)
+            if handler is None:
+                # Handler removed after scheduling; keep the deadline for it
+                self._retry_later(key, now)
+                continue
+
+            try:
+                await handler(booking)
+            except Exception as e:
+                retry_at = self._retry_later(key, now)
+                logger.error(
+                    "Action %s failed for booking %s, retrying at %s: %s",
+                    action.value, booking_id, retry_at, e
+                )
+                fired.append({"booking_id": booking_id, "action": action, "error": str(e)})
+            else:
+                self._attempts.pop(key, None)
+                fired.append({"booking_id": booking_id, "action": action, "handled": True})
+
+        return fired
+
+    async def run(self, max_sleep: float = 60.0):
+        """Fire deadlines as they come due until cancelled"""
+
+        while True:
+            await self.run_due()
+            next_due = self.next_due()
+            delay = max_sleep
+            if next_due is not None:
+                delay = min(max((next_due - datetime.now()).total_seconds(), 0), max_sleep)
+            await asyncio.sleep(delay)
+
+    async def _expire_payment(self, booking: Booking):
+        await self.booking_engine.cancel_booking(booking.booking_id, reason="payment_expired")
+
+    async def _mark_no_show(self, booking: Booking):
+        await self.booking_engine.mark_no_show(booking.booking_id)
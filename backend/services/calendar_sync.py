@@ -0,0 +1,400 @@
+"""
+External Calendar Sync for SiamStay
+Incremental iCal import into AvailabilityCalendar and cached iCal export
+"""
+
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from datetime import datetime, date, timedelta
+from pydantic import BaseModel
+import asyncio
+import hashlib
+import logging
+import uuid
+
+from backend.core.metrics import REGISTRY, timed
+from backend.services.booking_engine import AvailabilityCalendar
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_SYNC_FETCHES = REGISTRY.counter(
+    "siamstay_calendar_sync_fetches_total",
+    "External calendar feed fetches by outcome",
+    ("outcome",),
+)
+CALENDAR_SYNC_CONFLICTS = REGISTRY.counter(
+    "siamstay_calendar_sync_conflict_days_total",
+    "Imported event days that overlap a booking or another feed",
+)
+
+DateRange = Tuple[date, date]
+
+
+def _unfold(text: str) -> List[str]:
+    """Join RFC 5545 continuation lines (starting with a space or tab)"""
+
+    lines: List[str] = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _parse_ical_date(value: str) -> date:
+    # DATE (20250101) or DATE-TIME (20250101T140000Z); nights only need the day
+    return datetime.strptime(value[:8], "%Y%m%d").date()
+
+
+def parse_ical(text: str) -> Dict[str, DateRange]:
+    """Blocked [start, end) ranges of a feed keyed by event UID
+
+    Cancelled events are skipped, and overridden recurrences are keyed by
+    ``UID/RECURRENCE-ID``.
+    """
+
+    events: Dict[str, DateRange] = {}
+    event: Optional[Dict[str, str]] = None
+
+    for line in _unfold(text):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            if "DTSTART" in event and event.get("STATUS", "").upper() != "CANCELLED":
+                start = _parse_ical_date(event["DTSTART"])
+                end = _parse_ical_date(event["DTEND"]) if "DTEND" in event else start
+                uid = event.get("UID") or f"{event['DTSTART']}-{event.get('DTEND', '')}"
+                if "RECURRENCE-ID" in event:
+                    uid = f"{uid}/{event['RECURRENCE-ID']}"
+                events[uid] = (start, max(end, start + timedelta(days=1)))
+            event = None
+        elif event is not None:
+            event[name] = value.strip()
+
+    return events
+
+
+def render_ical(property_id: str, periods: Iterable[DateRange], stamp: datetime) -> bytes:
+    """iCal feed with one all-day event per blocked period"""
+
+    dtstamp = stamp.strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//SiamStay//Availability//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+    ]
+    for start, end in periods:
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:{start:%Y%m%d}-{property_id}@siamstay",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{end:%Y%m%d}",
+            "SUMMARY:Not available",
+            "END:VEVENT",
+        ])
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def subtract_range(outer: DateRange, inner: DateRange) -> List[DateRange]:
+    """Parts of ``outer`` not covered by ``inner``"""
+
+    pieces = []
+    if inner[0] > outer[0]:
+        pieces.append((outer[0], min(inner[0], outer[1])))
+    if inner[1] < outer[1]:
+        pieces.append((max(inner[1], outer[0]), outer[1]))
+    return [(start, end) for start, end in pieces if start < end]
+
+
+class ExternalFeed(BaseModel):
+    """An owner's calendar on another channel, imported into ours"""
+    feed_id: str
+    property_id: str
+    url: str
+
+    # Validators of the last applied response, sent back as conditional headers
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    # Events currently applied to the calendar: uid -> [start, end)
+    events: Dict[str, DateRange] = {}
+    # Event days another holder had when applied, retried on every sync
+    conflicts: Dict[str, List[date]] = {}
+    last_synced_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+class CalendarSyncEngine:
+    """Polls external iCal feeds and applies only what changed
+
+    Feeds are fetched concurrently with ``If-None-Match`` /
+    ``If-Modified-Since``; a 304 or an identical body costs no parsing.
+    Changed feeds are diffed by event UID against what was applied last
+    time, and only the added, removed or moved date ranges touch the
+    calendar. Imported days are held as ``ical:<feed_id>:<uid>`` and never
+    overwrite a booking; days that were taken are remembered per event and
+    held on a later sync once released, even if the feed has not changed.
+    """
+
+    def __init__(
+        self,
+        availability: AvailabilityCalendar,
+        client: Any = None,
+        max_concurrency: int = 16,
+        timeout: float = 10.0
+    ):
+        self.availability = availability
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.feeds: Dict[str, ExternalFeed] = {}
+        self._client = client
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def add_feed(self, property_id: str, url: str) -> ExternalFeed:
+        """Register an external feed for a property"""
+
+        for feed in self.feeds.values():
+            if feed.property_id == property_id and feed.url == url:
+                return feed
+
+        feed = ExternalFeed(
+            feed_id=f"ical_{uuid.uuid4().hex[:12]}",
+            property_id=property_id,
+            url=url
+        )
+        self.feeds[feed.feed_id] = feed
+        return feed
+
+    def remove_feed(self, feed_id: str) -> int:
+        """Unregister a feed and release every day it held"""
+
+        feed = self.feeds.pop(feed_id, None)
+        if feed is None:
+            raise ValueError(f"Calendar feed {feed_id} not found")
+
+        return sum(
+            self.availability.release_hold(feed.property_id, start, end, self._holder(feed, uid))
+            for uid, (start, end) in feed.events.items()
+        )
+
+    def _holder(self, feed: ExternalFeed, uid: str) -> str:
+        return f"ical:{feed.feed_id}:{uid}"
+
+    def _hold(self, feed: ExternalFeed, uid: str, period: DateRange) -> int:
+        conflicts = self.availability.hold_dates(
+            feed.property_id, period[0], period[1], self._holder(feed, uid)
+        )
+        if conflicts:
+            days = feed.conflicts.setdefault(uid, [])
+            days.extend(day for day in conflicts if day not in days)
+            CALENDAR_SYNC_CONFLICTS.inc((), len(conflicts))
+            logger.warning(
+                "Feed %s event %s overlaps %d already blocked days of %s from %s",
+                feed.feed_id, uid, len(conflicts), feed.property_id, conflicts[0]
+            )
+        return len(conflicts)
+
+    def retry_conflicts(self, feed: ExternalFeed) -> int:
+        """Hold conflicting event days that have been released since; returns how many"""
+
+        held = 0
+        for uid, days in list(feed.conflicts.items()):
+            holder = self._holder(feed, uid)
+            taken = [
+                day for day in days
+                if self.availability.hold_dates(
+                    feed.property_id, day, day + timedelta(days=1), holder
+                )
+            ]
+            held += len(days) - len(taken)
+            if taken:
+                feed.conflicts[uid] = taken
+            else:
+                del feed.conflicts[uid]
+
+        if held:
+            logger.info(
+                "Feed %s now holds %d previously conflicting days of %s",
+                feed.feed_id, held, feed.property_id
+            )
+        return held
+
+    def apply_events(self, feed: ExternalFeed, events: Dict[str, DateRange]) -> Dict[str, int]:
+        """Bring the calendar from the feed's last applied events to ``events``"""
+
+        counts = {"added": 0, "removed": 0, "moved": 0, "conflicts": 0}
+        previous = feed.events
+
+        for uid, period in previous.items():
+            if uid not in events:
+                self.availability.release_hold(
+                    feed.property_id, period[0], period[1], self._holder(feed, uid)
+                )
+                feed.conflicts.pop(uid, None)
+                counts["removed"] += 1
+
+        for uid, period in events.items():
+            old = previous.get(uid)
+            if old is None:
+                counts["conflicts"] += self._hold(feed, uid, period)
+                counts["added"] += 1
+            elif old != period:
+                # Only the days that left or joined the event change hands
+                for start, end in subtract_range(old, period):
+                    self.availability.release_hold(
+                        feed.property_id, start, end, self._holder(feed, uid)
+                    )
+                if uid in feed.conflicts:
+                    feed.conflicts[uid] = [
+                        day for day in feed.conflicts[uid] if period[0] <= day < period[1]
+                    ]
+                for piece in subtract_range(period, old):
+                    counts["conflicts"] += self._hold(feed, uid, piece)
+                counts["moved"] += 1
+
+        feed.events = events
+        return counts
+
+    async def sync_feed(self, feed: ExternalFeed) -> str:
+        """Fetch one feed and apply its changes; returns the fetch outcome"""
+
+        headers = {}
+        if feed.etag:
+            headers["If-None-Match"] = feed.etag
+        if feed.last_modified:
+            headers["If-Modified-Since"] = feed.last_modified
+
+        try:
+            response = await self._get_client().get(feed.url, headers=headers)
+            if response.status_code == 304:
+                outcome = "not_modified"
+            else:
+                response.raise_for_status()
+
+                # Servers without validators still often send identical bodies
+                content_hash = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+                if content_hash == feed.content_hash:
+                    outcome = "unchanged"
+                else:
+                    counts = self.apply_events(feed, parse_ical(response.text))
+                    outcome = "updated"
+                    logger.info(
+                        "Synced feed %s for %s: %d added, %d moved, %d removed",
+                        feed.feed_id, feed.property_id,
+                        counts["added"], counts["moved"], counts["removed"]
+                    )
+
+                # Validators only once the body is applied; a failed parse or
+                # apply must refetch in full next time, not get a 304
+                feed.etag = response.headers.get("ETag")
+                feed.last_modified = response.headers.get("Last-Modified")
+                feed.content_hash = content_hash
+
+            if feed.conflicts:
+                self.retry_conflicts(feed)
+        except Exception as e:
+            feed.last_error = str(e)
+            logger.warning("Calendar feed %s failed: %s", feed.feed_id, e)
+            CALENDAR_SYNC_FETCHES.inc(("failed",))
+            return "failed"
+
+        feed.last_error = None
+        feed.last_synced_at = datetime.now()
+        CALENDAR_SYNC_FETCHES.inc((outcome,))
+        return outcome
+
+    @timed("calendar_sync")
+    async def sync_all(self, property_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Sync every feed (or those of ``property_ids``) concurrently"""
+
+        feeds = list(self.feeds.values())
+        if property_ids is not None:
+            wanted = set(property_ids)
+            feeds = [feed for feed in feeds if feed.property_id in wanted]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(feed: ExternalFeed) -> str:
+            async with semaphore:
+                return await self.sync_feed(feed)
+
+        totals = {"not_modified": 0, "unchanged": 0, "updated": 0, "failed": 0}
+        for outcome in await asyncio.gather(*(bounded(feed) for feed in feeds)):
+            totals[outcome] += 1
+        return totals
+
+    async def run(self, poll_interval: float = 900.0):
+        """Sync all feeds until cancelled"""
+
+        while True:
+            await self.sync_all()
+            await asyncio.sleep(poll_interval)
+
+
+class CalendarFeedPublisher:
+    """Our per-property iCal feeds, served from a cached blob
+
+    A blob is rebuilt only when the property's blocked periods differ from
+    the ones it was rendered from, so polling channels are answered
+    without re-rendering, and with a 304 when their ETag still matches.
+    """
+
+    def __init__(self, availability: AvailabilityCalendar):
+        self.availability = availability
+        # property_id -> (periods, blob, etag, last_modified)
+        self._blobs: Dict[str, Tuple[List[DateRange], bytes, str, str]] = {}
+
+    def feed(self, property_id: str) -> Tuple[bytes, str, str]:
+        """(body, ETag, Last-Modified) of a property's feed"""
+
+        periods = self.availability.busy_periods(property_id)
+        cached = self._blobs.get(property_id)
+        if cached is not None and cached[0] == periods:
+            return cached[1], cached[2], cached[3]
+
+        now = datetime.utcnow().replace(microsecond=0)
+        blob = render_ical(property_id, periods, now)
+        etag = f'"{hashlib.blake2b(blob, digest_size=12).hexdigest()}"'
+        last_modified = now.strftime("%a, %d %b %Y %H:%M:%S GMT")
+        self._blobs[property_id] = (periods, blob, etag, last_modified)
+        return blob, etag, last_modified
+
+    def respond(
+        self,
+        property_id: str,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """HTTP status, headers and body for a feed request"""
+
+        blob, etag, last_modified = self.feed(property_id)
+        headers = {
+            "Content-Type": "text/calendar; charset=utf-8",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": "max-age=300",
+        }
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return 304, headers, b""
+        return 200, headers, blob
+
+    def invalidate(self, property_id: str):
+        self._blobs.pop(property_id, None)
@@ -0,0 +1,131 @@
+"""
+Local iCal Feed Stub for SiamStay
+Stand-in for other channels' calendar feeds used in development and testing
+
+    python -m backend.services.ical_stub --port 8931 --directory ./feeds
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+import argparse
+import hashlib
+import os
+import threading
+import time
+
+
+class ICalStubHandler(BaseHTTPRequestHandler):
+    """Serves ``GET <path>`` with ETag / Last-Modified validators"""
+
+    server: "ICalStubServer"
+
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.requests[self.path] = stub.requests.get(self.path, 0) + 1
+            feed = stub.feeds.get(self.path)
+
+        if feed is None:
+            self.send_error(404)
+            return
+
+        body, etag, modified_at = feed
+        last_modified = formatdate(modified_at, usegmt=True)
+
+        if stub.conditional and self._not_modified(etag, modified_at):
+            with stub.lock:
+                stub.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if stub.conditional:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_modified(self, etag: str, modified_at: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in (tag.strip() for tag in if_none_match.split(","))
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ICalStubServer(ThreadingHTTPServer):
+    """HTTP server for iCal feeds set in code or loaded from a directory
+
+    With ``conditional=False`` it behaves like a server without validator
+    support and always answers 200.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], conditional: bool = True):
+        super().__init__(address, ICalStubHandler)
+        self.conditional = conditional
+        self.lock = threading.Lock()
+        # path -> (body, etag, modified_at)
+        self.feeds: Dict[str, Tuple[bytes, str, float]] = {}
+        self.requests: Dict[str, int] = {}
+        self.not_modified = 0
+
+    def set_feed(self, path: str, text: str, modified_at: Optional[float] = None):
+        body = text.encode()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self.lock:
+            current = self.feeds.get(path)
+            if current is not None and current[1] == etag:
+                return
+            self.feeds[path] = (body, etag, modified_at or time.time())
+
+    def load_directory(self, directory: str):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".ics"):
+                file_path = os.path.join(directory, name)
+                with open(file_path, encoding="utf-8") as handle:
+                    self.set_feed(f"/{name}", handle.read(), os.path.getmtime(file_path))
+
+    def url(self, path: str) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+
+def start_stub_server(port: int = 0, **kwargs) -> ICalStubServer:
+    """Start the stub on a background thread; ``port=0`` picks a free port"""
+
+    server = ICalStubServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local iCal feed stub")
+    parser.add_argument("--port", type=int, default=8931)
+    parser.add_argument("--directory", default=".", help="Serves every *.ics file in it")
+    parser.add_argument("--no-conditional", action="store_true", help="Ignore validators, always 200")
+    args = parser.parse_args()
+
+    server = ICalStubServer(("127.0.0.1", args.port), conditional=not args.no_conditional)
+    server.load_directory(args.directory)
+    print(f"iCal stub serving {len(server.feeds)} feed(s) on {server.url('/')}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Guest Notification Outbox for SiamStay
+Coalesced, batched and rate-limited delivery of booking emails and SMS
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from enum import Enum
+from datetime import datetime, date, timedelta
+from pydantic import BaseModel
+import asyncio
+import logging
+import random
+import uuid
+
+from backend.core.metrics import REGISTRY
+from backend.core.rate_limit import AsyncRateLimiter, backoff_delay
+from backend.services.booking_engine import Booking, BookingEngine, BookingStatus
+from backend.services.booking_scheduler import BookingLifecycleScheduler, LifecycleAction
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_DELIVERIES = REGISTRY.counter(
+    "siamstay_notification_deliveries_total",
+    "Guest messages by delivery outcome",
+    ("outcome",),
+)
+NOTIFICATIONS_COALESCED = REGISTRY.counter(
+    "siamstay_notifications_coalesced_total",
+    "Notifications merged into a guest message that was already pending",
+)
+
+
+class NotificationKind(str, Enum):
+    """Booking events guests are told about"""
+    BOOKING_CONFIRMED = "booking_confirmed"
+    BOOKING_CANCELLED = "booking_cancelled"
+    CHECK_IN_INSTRUCTIONS = "check_in_instructions"
+
+
+class DeliveryOutcome(str, Enum):
+    """Per-message result reported by the transport"""
+    DELIVERED = "delivered"
+    REJECTED = "rejected"  # Permanent, e.g. invalid address
+    ERROR = "error"        # Transient, retried
+
+
+class NotificationItem(BaseModel):
+    """One booking event inside a guest message"""
+    booking_id: str
+    property_id: str
+    kind: NotificationKind
+    check_in: date
+    check_out: date
+    enqueued_at: datetime
+
+
+class GuestMessage(BaseModel):
+    """Everything pending for one guest, sent as a single email/SMS"""
+    message_id: str
+    guest_id: str
+    recipient_name: str
+    email: str
+    phone: str
+    items: List[NotificationItem] = []
+
+    created_at: datetime
+    next_attempt_at: datetime
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class DeliveryResult(BaseModel):
+    """Transport answer for one message"""
+    message_id: str
+    outcome: DeliveryOutcome
+    detail: Optional[str] = None
+
+
+SUBJECTS = {
+    NotificationKind.BOOKING_CONFIRMED: "Booking {booking_id} confirmed",
+    NotificationKind.BOOKING_CANCELLED: "Booking {booking_id} cancelled",
+    NotificationKind.CHECK_IN_INSTRUCTIONS: "Check-in instructions for booking {booking_id}",
+}
+
+
+def render_message(message: GuestMessage) -> Tuple[str, str]:
+    """Subject and plain-text body for a guest message"""
+
+    lines = [
+        f"{SUBJECTS[item.kind].format(booking_id=item.booking_id)}: "
+        f"{item.check_in:%d %b %Y} - {item.check_out:%d %b %Y}"
+        for item in message.items
+    ]
+    if len(message.items) == 1:
+        subject = SUBJECTS[message.items[0].kind].format(booking_id=message.items[0].booking_id)
+    else:
+        subject = f"{len(message.items)} updates on your SiamStay bookings"
+    return subject, f"Dear {message.recipient_name},\n\n" + "\n".join(lines) + "\n"
+
+
+class BaseNotificationTransport(ABC):
+    """Email / SMS provider"""
+
+    @abstractmethod
+    async def send_batch(self, messages: List[GuestMessage]) -> List[DeliveryResult]:
+        """Send several messages in one provider call; raise for batch-level failures"""
+        pass
+
+
+class StubNotificationTransport(BaseNotificationTransport):
+    """In-process stand-in that records what would have been sent
+
+    ``error_rate`` and ``batch_failure_rate`` inject transient failures;
+    addresses without an ``@`` are rejected.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        batch_failure_rate: float = 0.0,
+        latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.error_rate = error_rate
+        self.batch_failure_rate = batch_failure_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.batches: List[int] = []
+        self.delivered: List[GuestMessage] = []
+
+    async def send_batch(self, messages: List[GuestMessage]) -> List[DeliveryResult]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.random.random() < self.batch_failure_rate:
+            raise ConnectionError("Provider temporarily unavailable")
+
+        self.batches.append(len(messages))
+        results = []
+        for message in messages:
+            detail = None
+            if "@" not in message.email:
+                outcome, detail = DeliveryOutcome.REJECTED, "Invalid email address"
+            elif self.random.random() < self.error_rate:
+                outcome, detail = DeliveryOutcome.ERROR, "Provider timeout"
+            else:
+                outcome = DeliveryOutcome.DELIVERED
+                self.delivered.append(message)
+            results.append(DeliveryResult(message_id=message.message_id, outcome=outcome, detail=detail))
+        return results
+
+
+class NotificationOutbox:
+    """Queues booking notifications off the booking path
+
+    Confirmations and cancellations are enqueued from booking transitions;
+    check-in instructions come from the lifecycle scheduler, which the
+    outbox registers ``enqueue_check_in_instructions`` with when given one.
+    Events for the same guest within ``coalesce_seconds`` share one
+    message, and a cancellation supersedes the booking's unsent
+    confirmation and instructions. ``confirmation_sent`` and
+    ``check_in_instructions_sent`` are only set once the transport reports
+    delivery, so the queue is in memory only: at startup unsent
+    confirmations are rebuilt from those flags (and the scheduler's own
+    rebuild re-fires unsent instructions). Cancellations are not recovered.
+    """
+
+    def __init__(
+        self,
+        booking_engine: BookingEngine,
+        transport: BaseNotificationTransport,
+        batch_size: int = 100,
+        requests_per_second: float = 5.0,
+        coalesce_seconds: float = 30.0,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 15.0,
+        scheduler: Optional[BookingLifecycleScheduler] = None
+    ):
+        self.booking_engine = booking_engine
+        self.transport = transport
+        self.batch_size = batch_size
+        self.limiter = AsyncRateLimiter(requests_per_second, name="notifications")
+        self.coalesce_window = timedelta(seconds=coalesce_seconds)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        self.queue: Dict[str, GuestMessage] = {}
+        # guest_id -> message_id still open for coalescing (never attempted)
+        self.open_messages: Dict[str, str] = {}
+        self.failed: Dict[str, GuestMessage] = {}
+        self._wakeup = asyncio.Event()
+
+        booking_engine.add_transition_listener(self._on_transition)
+        if scheduler is not None:
+            scheduler.set_handler(
+                LifecycleAction.CHECK_IN_INSTRUCTIONS, self.enqueue_check_in_instructions
+            )
+        self.rebuild_from_bookings()
+
+    def rebuild_from_bookings(self) -> int:
+        """Queue confirmations of live bookings not yet marked as sent"""
+
+        queued = {
+            item.booking_id
+            for message in self.queue.values()
+            for item in message.items
+            if item.kind == NotificationKind.BOOKING_CONFIRMED
+        }
+        unsent = [
+            booking for booking in self.booking_engine.bookings.values()
+            if booking.status == BookingStatus.CONFIRMED
+            and not booking.confirmation_sent
+            and booking.booking_id not in queued
+        ]
+        for booking in unsent:
+            self.enqueue(booking, NotificationKind.BOOKING_CONFIRMED)
+
+        if unsent:
+            logger.info("Rebuilt %d unsent booking confirmations", len(unsent))
+        return len(unsent)
+
+    def _on_transition(self, booking: Booking, previous: Optional[BookingStatus]):
+        if booking.status == BookingStatus.CONFIRMED and not booking.confirmation_sent:
+            self.enqueue(booking, NotificationKind.BOOKING_CONFIRMED)
+        elif booking.status == BookingStatus.CANCELLED:
+            self.enqueue(booking, NotificationKind.BOOKING_CANCELLED)
+
+    async def enqueue_check_in_instructions(self, booking: Booking):
+        """Lifecycle scheduler handler for ``CHECK_IN_INSTRUCTIONS``"""
+
+        # The deadline can fire again (e.g. after a rebuild) while the
+        # first instructions are still waiting for delivery
+        for message in self.queue.values():
+            for item in message.items:
+                if (
+                    item.booking_id == booking.booking_id
+                    and item.kind == NotificationKind.CHECK_IN_INSTRUCTIONS
+                ):
+                    return
+        self.enqueue(booking, NotificationKind.CHECK_IN_INSTRUCTIONS)
+
+    def enqueue(self, booking: Booking, kind: NotificationKind) -> GuestMessage:
+        """Add an event to the guest's open message, opening one if needed"""
+
+        guest = booking.guest
+        now = datetime.now()
+        message = self.queue.get(self.open_messages.get(guest.guest_id, ""))
+
+        if message is None:
+            message = GuestMessage(
+                message_id=f"msg_{uuid.uuid4().hex[:16]}",
+                guest_id=guest.guest_id,
+                recipient_name=f"{guest.first_name} {guest.last_name}",
+                email=guest.email,
+                phone=guest.phone,
+                created_at=now,
+                # The first event opens the window; later ones never extend it
+                next_attempt_at=now + self.coalesce_window
+            )
+            self.queue[message.message_id] = message
+            self.open_messages[guest.guest_id] = message.message_id
+        else:
+            NOTIFICATIONS_COALESCED.inc()
+
+        if kind == NotificationKind.BOOKING_CANCELLED:
+            superseded = (NotificationKind.BOOKING_CONFIRMED, NotificationKind.CHECK_IN_INSTRUCTIONS)
+        else:
+            superseded = (kind,)
+        message.items = [
+            item for item in message.items
+            if not (item.booking_id == booking.booking_id and item.kind in superseded)
+        ]
+        message.items.append(NotificationItem(
+            booking_id=booking.booking_id,
+            property_id=booking.property_id,
+            kind=kind,
+            check_in=booking.details.check_in,
+            check_out=booking.details.check_out,
+            enqueued_at=now
+        ))
+
+        self._wakeup.set()
+        return message
+
+    def _still_relevant(self, item: NotificationItem) -> bool:
+        if item.kind == NotificationKind.BOOKING_CANCELLED:
+            return True
+        booking = self.booking_engine.bookings.get(item.booking_id)
+        if booking is None:
+            return False
+        if item.kind == NotificationKind.CHECK_IN_INSTRUCTIONS:
+            return booking.status == BookingStatus.CONFIRMED
+        return booking.status != BookingStatus.CANCELLED
+
+    def _complete(self, message: GuestMessage):
+        self.queue.pop(message.message_id, None)
+        if self.open_messages.get(message.guest_id) == message.message_id:
+            del self.open_messages[message.guest_id]
+
+    def _delivered(self, message: GuestMessage):
+        for item in message.items:
+            booking = self.booking_engine.bookings.get(item.booking_id)
+            if booking is None:
+                continue  # Archived meanwhile; archived rows are final
+            if item.kind == NotificationKind.BOOKING_CONFIRMED:
+                booking.confirmation_sent = True
+            elif item.kind == NotificationKind.CHECK_IN_INSTRUCTIONS:
+                booking.check_in_instructions_sent = True
+        self._complete(message)
+
+    def _retry_later(self, message: GuestMessage, error: str, now: datetime):
+        message.attempts += 1
+        message.last_error = error
+
+        if message.attempts >= self.max_attempts:
+            logger.error(
+                "Giving up on message %s to guest %s after %d attempts: %s",
+                message.message_id, message.guest_id, message.attempts, error
+            )
+            self.failed[message.message_id] = message
+            self._complete(message)
+            return
+
+        message.next_attempt_at = now + timedelta(
+            seconds=backoff_delay(message.attempts, base=self.retry_base_seconds)
+        )
+
+    async def _send(self, batch: List[GuestMessage]) -> Dict[str, int]:
+        await self.limiter.acquire()
+        now = datetime.now()
+        counts = {outcome.value: 0 for outcome in DeliveryOutcome}
+
+        try:
+            results = await self.transport.send_batch(batch)
+        except Exception as e:
+            for message in batch:
+                self._retry_later(message, str(e), now)
+            counts[DeliveryOutcome.ERROR.value] += len(batch)
+            NOTIFICATION_DELIVERIES.inc((DeliveryOutcome.ERROR.value,), len(batch))
+            return counts
+
+        answered = {result.message_id: result for result in results}
+        for message in batch:
+            result = answered.get(message.message_id) or DeliveryResult(
+                message_id=message.message_id,
+                outcome=DeliveryOutcome.ERROR,
+                detail="Missing from batch response"
+            )
+
+            if result.outcome == DeliveryOutcome.DELIVERED:
+                self._delivered(message)
+            elif result.outcome == DeliveryOutcome.REJECTED:
+                logger.error("Message %s rejected: %s", message.message_id, result.detail)
+                self.failed[message.message_id] = message
+                self._complete(message)
+            else:
+                self._retry_later(message, result.detail or "error", now)
+
+            counts[result.outcome.value] += 1
+            NOTIFICATION_DELIVERIES.inc((result.outcome.value,))
+
+        return counts
+
+    async def process_due(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Send every message whose window or retry delay has passed"""
+
+        now = now or datetime.now()
+        due = []
+        for message in list(self.queue.values()):
+            if message.next_attempt_at > now:
+                continue
+
+            # Closed from here on: new events for the guest open a new message
+            if self.open_messages.get(message.guest_id) == message.message_id:
+                del self.open_messages[message.guest_id]
+
+            message.items = [item for item in message.items if self._still_relevant(item)]
+            if message.items:
+                # In flight; a retry or completion replaces this
+                message.next_attempt_at = datetime.max
+                due.append(message)
+            else:
+                self._complete(message)
+
+        batches = [due[start:start + self.batch_size] for start in range(0, len(due), self.batch_size)]
+        totals = {outcome.value: 0 for outcome in DeliveryOutcome}
+        for counts in await asyncio.gather(*(self._send(batch) for batch in batches)):
+            for outcome, count in counts.items():
+                totals[outcome] += count
+        return totals
+
+    def next_due(self) -> Optional[datetime]:
+        return min((message.next_attempt_at for message in self.queue.values()), default=None)
+
+    async def run(self, max_sleep: float = 5.0):
+        """Deliver messages as they come due until cancelled"""
+
+        while True:
+            await self.process_due()
+            self._wakeup.clear()
+            next_due = self.next_due()
+            delay = max_sleep
+            if next_due is not None:
+                delay = min(max((next_due - datetime.now()).total_seconds(), 0), max_sleep)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
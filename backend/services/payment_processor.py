@@ -4,12 +4,19 @@ Handles multi-currency payments, Thai banking, and international cards
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Callable, Iterable, Type
 from enum import Enum
 from datetime import datetime
 from pydantic import BaseModel, Field
+import asyncio
+import importlib
+import inspect
 import logging
 
+from backend.core.metrics import timed
+from backend.core.serialization import get_serializer
+from backend.core.trusted import build_model
+
 logger = logging.getLogger(__name__)
 
 
@@ -115,6 +122,16 @@ class PaymentTransaction(BaseModel):
 class BasePaymentProcessor(ABC):
     """Abstract base class for payment processors"""
     
+    # Provider calls timed for every concrete processor
+    _TIMED_METHODS = ("process_payment", "refund_payment", "get_transaction_status")
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls._TIMED_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, name, timed("payment_processor", f"{cls.__name__}.{name}")(method))
+    
     @abstractmethod
     async def process_payment(
         self,
@@ -142,150 +159,128 @@ class BasePaymentProcessor(ABC):
         pass
 
 
-class StripeProcessor(BasePaymentProcessor):
-    """Stripe payment processor for international cards"""
-    
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        # TODO: Initialize Stripe client
-    
-    async def process_payment(
-        self,
-        payment_details: PaymentDetails,
-        metadata: Dict[str, Any]
-    ) -> PaymentTransaction:
-        """Process payment via Stripe"""
-        
-        # TODO: Implement Stripe payment processing
-        logger.info(f"Processing Stripe payment: {payment_details.amount} {payment_details.currency}")
-        
-        transaction = PaymentTransaction(
-            transaction_id=f"stripe_{datetime.now().timestamp()}",
-            booking_id=metadata["booking_id"],
-            payer_id=metadata["payer_id"],
-            recipient_id=metadata["recipient_id"],
-            payment_details=payment_details,
-            gross_amount=payment_details.amount,
-            fee_amount=payment_details.amount * 0.029,  # Stripe fee
-            net_amount=payment_details.amount * 0.971,
-            created_at=datetime.now()
-        )
-        
-        return transaction
-    
-    async def refund_payment(
-        self,
-        transaction_id: str,
-        amount: Optional[float] = None
-    ) -> Dict[str, Any]:
-        """Refund Stripe payment"""
-        
-        # TODO: Implement Stripe refund
-        return {
-            "refund_id": f"refund_{datetime.now().timestamp()}",
-            "amount": amount,
-            "status": "pending"
-        }
-    
-    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
-        """Get Stripe transaction status"""
-        # TODO: Implement status check
-        return PaymentStatus.COMPLETED
+class ProviderSpec(BaseModel):
+    """Where a payment provider implementation lives"""
+    import_path: str  # "package.module:ClassName"
+    sdk_modules: List[str] = []  # Third-party SDKs that module imports
 
 
-class ThaiPromptPayProcessor(BasePaymentProcessor):
-    """PromptPay processor for Thai domestic payments"""
+class PaymentProviderRegistry:
+    """Payment processors by provider, imported on first use
     
-    def __init__(self, merchant_id: str):
-        self.merchant_id = merchant_id
+    Provider modules (and the SDKs they pull in) are only imported when a
+    processor for that provider is first requested, so a worker that only
+    handles PromptPay never loads Stripe or web3.
+    """
     
-    async def process_payment(
+    def __init__(self):
+        self._specs: Dict[PaymentProvider, ProviderSpec] = {}
+        self._classes: Dict[PaymentProvider, Type[BasePaymentProcessor]] = {}
+    
+    def register(
         self,
-        payment_details: PaymentDetails,
-        metadata: Dict[str, Any]
-    ) -> PaymentTransaction:
-        """Process PromptPay payment"""
-        
-        logger.info(f"Processing PromptPay payment: {payment_details.amount} THB")
-        
-        transaction = PaymentTransaction(
-            transaction_id=f"promptpay_{datetime.now().timestamp()}",
-            booking_id=metadata["booking_id"],
-            payer_id=metadata["payer_id"],
-            recipient_id=metadata["recipient_id"],
-            payment_details=payment_details,
-            gross_amount=payment_details.amount,
-            fee_amount=0,  # No fee for PromptPay
-            net_amount=payment_details.amount,
-            created_at=datetime.now()
+        provider: PaymentProvider,
+        import_path: str,
+        sdk_modules: Optional[List[str]] = None
+    ):
+        """Register a provider by lazy import path"""
+        self._specs[provider] = ProviderSpec(
+            import_path=import_path,
+            sdk_modules=sdk_modules or []
         )
-        
-        return transaction
+        self._classes.pop(provider, None)
     
-    async def refund_payment(
+    def register_class(
         self,
-        transaction_id: str,
-        amount: Optional[float] = None
-    ) -> Dict[str, Any]:
-        """Refund PromptPay payment"""
-        
-        return {
-            "refund_id": f"promptpay_refund_{datetime.now().timestamp()}",
-            "amount": amount,
-            "status": "manual_process_required"
-        }
+        provider: PaymentProvider,
+        processor_class: Type[BasePaymentProcessor]
+    ):
+        """Register an already imported processor class"""
+        module = processor_class.__module__
+        self._specs[provider] = ProviderSpec(
+            import_path=f"{module}:{processor_class.__qualname__}"
+        )
+        self._classes[provider] = processor_class
     
-    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
-        """Get PromptPay transaction status"""
-        return PaymentStatus.COMPLETED
-
-
-class CryptoProcessor(BasePaymentProcessor):
-    """Cryptocurrency payment processor"""
+    def providers(self) -> List[PaymentProvider]:
+        return list(self._specs)
     
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        # TODO: Initialize crypto payment provider (Binance Pay, etc.)
+    def spec(self, provider: PaymentProvider) -> ProviderSpec:
+        spec = self._specs.get(provider)
+        if not spec:
+            raise ValueError(f"Unsupported payment provider: {provider}")
+        return spec
     
-    async def process_payment(
-        self,
-        payment_details: PaymentDetails,
-        metadata: Dict[str, Any]
-    ) -> PaymentTransaction:
-        """Process cryptocurrency payment"""
-        
-        logger.info(f"Processing crypto payment: {payment_details.amount} {payment_details.currency}")
-        
-        transaction = PaymentTransaction(
-            transaction_id=f"crypto_{datetime.now().timestamp()}",
-            booking_id=metadata["booking_id"],
-            payer_id=metadata["payer_id"],
-            recipient_id=metadata["recipient_id"],
-            payment_details=payment_details,
-            gross_amount=payment_details.amount,
-            fee_amount=payment_details.amount * 0.01,  # 1% crypto fee
-            net_amount=payment_details.amount * 0.99,
-            created_at=datetime.now()
-        )
-        
-        return transaction
+    def is_loaded(self, provider: PaymentProvider) -> bool:
+        return provider in self._classes
     
-    async def refund_payment(
-        self,
-        transaction_id: str,
-        amount: Optional[float] = None
-    ) -> Dict[str, Any]:
-        """Refund crypto payment"""
+    def get_class(self, provider: PaymentProvider) -> Type[BasePaymentProcessor]:
+        """Resolve the processor class, importing its module if needed"""
         
-        return {
-            "refund_id": f"crypto_refund_{datetime.now().timestamp()}",
-            "amount": amount,
-            "status": "blockchain_processing"
-        }
+        processor_class = self._classes.get(provider)
+        if processor_class is None:
+            module_name, _, class_name = self.spec(provider).import_path.partition(":")
+            module = importlib.import_module(module_name)
+            processor_class = getattr(module, class_name)
+            if not issubclass(processor_class, BasePaymentProcessor):
+                raise ValueError(
+                    f"{module_name}:{class_name} is not a BasePaymentProcessor"
+                )
+            self._classes[provider] = processor_class
+            logger.info("Loaded payment provider %s", provider.value)
+        return processor_class
     
-    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
-        """Get crypto transaction status"""
-        return PaymentStatus.COMPLETED
+    def create(self, provider: PaymentProvider, **kwargs) -> BasePaymentProcessor:
+        """Instantiate a processor with provider-specific settings
+        
+        Settings the processor's constructor does not take are ignored, so
+        one settings dict can hold keys for several providers.
+        """
+        
+        processor_class = self.get_class(provider)
+        parameters = inspect.signature(processor_class).parameters.values()
+        if not any(param.kind == param.VAR_KEYWORD for param in parameters):
+            accepted = {param.name for param in parameters}
+            ignored = sorted(set(kwargs) - accepted)
+            if ignored:
+                logger.debug(
+                    "Ignoring settings %s for payment provider %s",
+                    ", ".join(ignored), provider.value
+                )
+            kwargs = {name: value for name, value in kwargs.items() if name in accepted}
+        return processor_class(**kwargs)
+
+
+PROVIDER_REGISTRY = PaymentProviderRegistry()
+PROVIDER_REGISTRY.register(
+    PaymentProvider.STRIPE,
+    "backend.services.payment_providers.stripe_processor:StripeProcessor",
+    sdk_modules=["stripe"]
+)
+PROVIDER_REGISTRY.register(
+    PaymentProvider.PROMPTPAY,
+    "backend.services.payment_providers.promptpay_processor:ThaiPromptPayProcessor",
+    sdk_modules=["promptpay"]
+)
+PROVIDER_REGISTRY.register(
+    PaymentProvider.BINANCE_PAY,
+    "backend.services.payment_providers.crypto_processor:CryptoProcessor",
+    sdk_modules=["web3", "eth_account"]
+)
+
+# Processor classes still importable from this module, resolved lazily
+_LAZY_PROCESSORS = {
+    "StripeProcessor": PaymentProvider.STRIPE,
+    "ThaiPromptPayProcessor": PaymentProvider.PROMPTPAY,
+    "CryptoProcessor": PaymentProvider.BINANCE_PAY,
+}
+
+
+def __getattr__(name: str):
+    provider = _LAZY_PROCESSORS.get(name)
+    if provider is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return PROVIDER_REGISTRY.get_class(provider)
 
 
 class PaymentProcessorFactory:
@@ -298,22 +293,24 @@ class PaymentProcessorFactory:
     ) -> BasePaymentProcessor:
         """Create appropriate payment processor"""
         
-        if provider == PaymentProvider.STRIPE:
-            return StripeProcessor(kwargs["api_key"])
-        elif provider == PaymentProvider.PROMPTPAY:
-            return ThaiPromptPayProcessor(kwargs["merchant_id"])
-        elif provider == PaymentProvider.BINANCE_PAY:
-            return CryptoProcessor(kwargs["api_key"])
-        else:
-            raise ValueError(f"Unsupported payment provider: {provider}")
+        return PROVIDER_REGISTRY.create(provider, **kwargs)
 
 
 class PaymentService:
     """Main payment service orchestrator"""
     
+    # Provider refund statuses meaning the refund was not accepted
+    REFUND_FAILED_STATUSES = ("failed", "declined", "rejected", "error")
+    
     def __init__(self):
         self.transactions: Dict[str, PaymentTransaction] = {}
         self.processors: Dict[PaymentProvider, BasePaymentProcessor] = {}
+        # Settings for processors created on first use
+        self.provider_settings: Dict[PaymentProvider, Dict[str, Any]] = {}
+        # booking_id -> transaction_ids, for refunds and reconciliation
+        self.booking_transactions: Dict[str, List[str]] = {}
+        # transaction_id -> amount refunded so far
+        self.refunded_amounts: Dict[str, float] = {}
     
     def register_processor(
         self,
@@ -323,6 +320,46 @@ class PaymentService:
         """Register a payment processor"""
         self.processors[provider] = processor
     
+    def configure_provider(self, provider: PaymentProvider, **settings):
+        """Enable a provider; its processor is created on first payment"""
+        PROVIDER_REGISTRY.spec(provider)
+        self.provider_settings[provider] = settings
+    
+    def get_processor(self, provider: PaymentProvider) -> BasePaymentProcessor:
+        """Get the processor for a provider, creating it lazily if configured"""
+        
+        processor = self.processors.get(provider)
+        if processor is None:
+            settings = self.provider_settings.get(provider)
+            if settings is None:
+                raise ValueError(f"Payment provider {provider} not configured")
+            processor = PROVIDER_REGISTRY.create(provider, **settings)
+            self.processors[provider] = processor
+        return processor
+    
+    def get_booking_transactions(self, booking_id: str) -> List[PaymentTransaction]:
+        """A booking's transactions, oldest first"""
+        return [
+            self.transactions[transaction_id]
+            for transaction_id in self.booking_transactions.get(booking_id, [])
+        ]
+    
+    def get_booking_transactions_json(
+        self,
+        booking_id: str,
+        fields: Optional[List[str]] = None
+    ) -> bytes:
+        """A booking's transactions encoded straight to JSON bytes
+        
+        ``fields`` optionally projects each transaction to those dotted
+        paths; unknown paths raise ValueError.
+        """
+        
+        return get_serializer(PaymentTransaction).dumps_many(
+            self.get_booking_transactions(booking_id), fields
+        )
+    
+    @timed("payment_service")
     async def process_booking_payment(
         self,
         booking_id: str,
@@ -332,9 +369,7 @@ class PaymentService:
     ) -> PaymentTransaction:
         """Process payment for a booking"""
         
-        processor = self.processors.get(payment_details.provider)
-        if not processor:
-            raise ValueError(f"Payment provider {payment_details.provider} not configured")
+        processor = self.get_processor(payment_details.provider)
         
         metadata = {
             "booking_id": booking_id,
@@ -344,14 +379,189 @@ class PaymentService:
         
         # Process payment
         transaction = await processor.process_payment(payment_details, metadata)
+        if not transaction.provider_transaction_id:
+            # Settlement reconciliation matches on the provider's id
+            logger.warning(
+                "Provider %s returned no transaction id for %s",
+                payment_details.provider.value, transaction.transaction_id
+            )
         
         # Store transaction
         self.transactions[transaction.transaction_id] = transaction
+        self.booking_transactions.setdefault(booking_id, []).append(
+            transaction.transaction_id
+        )
         
-        logger.info(f"Processed payment {transaction.transaction_id} for booking {booking_id}")
+        logger.info(
+            "Processed payment %s for booking %s",
+            transaction.transaction_id, booking_id
+        )
         
         return transaction
     
+    async def _sync_unsettled(self, transaction_ids: List[str]) -> List[str]:
+        """Update pending transactions from their provider's status
+        
+        Returns the ones the provider failed or cancelled. Raises ValueError
+        if a payment is still in flight, before anything is refunded.
+        """
+        
+        unsettled = (PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+        voided = []
+        for transaction_id in transaction_ids:
+            transaction = self.transactions[transaction_id]
+            if transaction.status not in unsettled:
+                continue
+            
+            processor = self.get_processor(transaction.payment_details.provider)
+            status = await processor.get_transaction_status(transaction_id)
+            if status in unsettled:
+                raise ValueError(
+                    f"Payment {transaction_id} is still {status.value} with the provider"
+                )
+            
+            transaction.status = status
+            if status == PaymentStatus.COMPLETED and transaction.completed_at is None:
+                transaction.completed_at = datetime.now()
+            elif status in (PaymentStatus.FAILED, PaymentStatus.CANCELLED):
+                voided.append(transaction_id)
+        
+        return voided
+    
+    async def refund_booking(
+        self,
+        booking_id: str,
+        amount: float
+    ) -> List[Dict[str, Any]]:
+        """Refund a booking up to ``amount`` in total, oldest transaction first
+        
+        Refunds already made count towards ``amount``, so retrying after a
+        failure only refunds what is still owed. Payments we still hold as
+        pending are first checked with their provider: captured ones are
+        refunded, ones the provider failed or cancelled are reported as
+        voided, and if any is still in flight nothing is refunded and a
+        ValueError asks for a retry once it settles.
+        """
+        
+        transaction_ids = self.booking_transactions.get(booking_id, [])
+        refunds = []
+        remaining = round(amount - sum(
+            self.refunded_amounts.get(transaction_id, 0.0)
+            for transaction_id in transaction_ids
+        ), 2)
+        
+        voided = await self._sync_unsettled(transaction_ids)
+        
+        for transaction_id in transaction_ids:
+            transaction = self.transactions[transaction_id]
+            
+            if transaction_id in voided:
+                refunds.append({
+                    "transaction_id": transaction_id,
+                    "amount": 0.0,
+                    "status": "voided"
+                })
+                continue
+            
+            if transaction.status != PaymentStatus.COMPLETED or remaining <= 0:
+                continue
+            
+            refundable = round(
+                transaction.gross_amount - self.refunded_amounts.get(transaction_id, 0.0), 2
+            )
+            if refundable <= 0:
+                continue
+            
+            processor = self.get_processor(transaction.payment_details.provider)
+            
+            refund_amount = min(remaining, refundable)
+            result = await processor.refund_payment(transaction_id, refund_amount)
+            if result.get("status") in self.REFUND_FAILED_STATUSES:
+                raise ValueError(
+                    f"Refund of {refund_amount} on {transaction_id} failed: {result.get('status')}"
+                )
+            
+            refunded = result.get("amount") or refund_amount
+            self.refunded_amounts[transaction_id] = round(
+                self.refunded_amounts.get(transaction_id, 0.0) + refunded, 2
+            )
+            if refunded >= refundable:
+                transaction.status = PaymentStatus.REFUNDED
+            refunds.append({"transaction_id": transaction_id, **result, "amount": refunded})
+            remaining = round(remaining - refunded, 2)
+        
+        return refunds
+    
+    @timed("payment_service")
+    async def refund_bookings(
+        self,
+        cancellations: List[Dict[str, Any]],
+        max_concurrency: int = 10,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Dispatch refunds for cancelled bookings with bounded parallelism
+        
+        ``cancellations`` are the dicts returned by ``BookingEngine`` cancel
+        operations (``booking_id`` and ``refund_amount``).
+        """
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        progress = {
+            "total": len(cancellations),
+            "completed": 0,
+            "failed": 0,
+            "refunded_amount": 0.0
+        }
+        results: List[Dict[str, Any]] = []
+        
+        async def dispatch(cancellation: Dict[str, Any]):
+            booking_id = cancellation["booking_id"]
+            async with semaphore:
+                try:
+                    refunds = await self.refund_booking(
+                        booking_id, cancellation["refund_amount"]
+                    )
+                except Exception as e:
+                    logger.error("Refund failed for booking %s: %s", booking_id, e)
+                    progress["failed"] += 1
+                    results.append({"booking_id": booking_id, "error": str(e)})
+                else:
+                    progress["completed"] += 1
+                    progress["refunded_amount"] += sum(
+                        refund["amount"] or 0 for refund in refunds
+                    )
+                    results.append({"booking_id": booking_id, "refunds": refunds})
+            
+            if progress_callback:
+                progress_callback(dict(progress))
+        
+        await asyncio.gather(*(dispatch(c) for c in cancellations))
+        
+        return {**progress, "results": results}
+    
+    def load_transactions(
+        self,
+        records: Iterable[Union[PaymentTransaction, Dict[str, Any]]],
+        trusted: bool = True
+    ) -> int:
+        """Bulk-load transactions from storage (``model_dump()`` records)"""
+        
+        loaded = 0
+        for record in records:
+            if isinstance(record, PaymentTransaction):
+                transaction = record
+            else:
+                transaction = build_model(PaymentTransaction, record, trusted)
+            self.transactions[transaction.transaction_id] = transaction
+            self.booking_transactions.setdefault(transaction.booking_id, []).append(
+                transaction.transaction_id
+            )
+            loaded += 1
+        
+        logger.info("Loaded %s transactions", loaded)
+        
+        return loaded
+    
     async def calculate_optimal_payment_method(
         self,
         amount: float,
@@ -391,6 +601,7 @@ class PaymentService:
         
         return suggestions
     
+    @timed("payment_service")
     async def get_payment_analytics(self) -> Dict[str, Any]:
         """Get payment processing analytics"""
         
@@ -0,0 +1,69 @@
+"""
+Crypto Payment Provider for SiamStay
+Binance Pay / stablecoin payments (loaded lazily by the provider registry)
+"""
+
+from typing import Dict, Optional, Any
+from datetime import datetime
+import logging
+
+from backend.core.trusted import construct_trusted
+from backend.services.payment_processor import (
+    BasePaymentProcessor,
+    PaymentDetails,
+    PaymentStatus,
+    PaymentTransaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CryptoProcessor(BasePaymentProcessor):
+    """Cryptocurrency payment processor"""
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # TODO: Initialize crypto payment provider (Binance Pay, etc.)
+    
+    async def process_payment(
+        self,
+        payment_details: PaymentDetails,
+        metadata: Dict[str, Any]
+    ) -> PaymentTransaction:
+        """Process cryptocurrency payment"""
+        
+        logger.info(
+            "Processing crypto payment: %s %s",
+            payment_details.amount, payment_details.currency
+        )
+        
+        transaction = construct_trusted(PaymentTransaction, dict(
+            transaction_id=f"crypto_{datetime.now().timestamp()}",
+            booking_id=metadata["booking_id"],
+            payer_id=metadata["payer_id"],
+            recipient_id=metadata["recipient_id"],
+            payment_details=payment_details,
+            gross_amount=payment_details.amount,
+            fee_amount=payment_details.amount * 0.01,  # 1% crypto fee
+            net_amount=payment_details.amount * 0.99,
+            created_at=datetime.now()
+        ))
+        
+        return transaction
+    
+    async def refund_payment(
+        self,
+        transaction_id: str,
+        amount: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Refund crypto payment"""
+        
+        return {
+            "refund_id": f"crypto_refund_{datetime.now().timestamp()}",
+            "amount": amount,
+            "status": "blockchain_processing"
+        }
+    
+    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
+        """Get crypto transaction status"""
+        return PaymentStatus.COMPLETED
@@ -0,0 +1,65 @@
+"""
+PromptPay Payment Provider for SiamStay
+Thai domestic QR payments (loaded lazily by the provider registry)
+"""
+
+from typing import Dict, Optional, Any
+from datetime import datetime
+import logging
+
+from backend.core.trusted import construct_trusted
+from backend.services.payment_processor import (
+    BasePaymentProcessor,
+    PaymentDetails,
+    PaymentStatus,
+    PaymentTransaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ThaiPromptPayProcessor(BasePaymentProcessor):
+    """PromptPay processor for Thai domestic payments"""
+    
+    def __init__(self, merchant_id: str):
+        self.merchant_id = merchant_id
+    
+    async def process_payment(
+        self,
+        payment_details: PaymentDetails,
+        metadata: Dict[str, Any]
+    ) -> PaymentTransaction:
+        """Process PromptPay payment"""
+        
+        logger.info("Processing PromptPay payment: %s THB", payment_details.amount)
+        
+        transaction = construct_trusted(PaymentTransaction, dict(
+            transaction_id=f"promptpay_{datetime.now().timestamp()}",
+            booking_id=metadata["booking_id"],
+            payer_id=metadata["payer_id"],
+            recipient_id=metadata["recipient_id"],
+            payment_details=payment_details,
+            gross_amount=payment_details.amount,
+            fee_amount=0.0,  # No fee for PromptPay
+            net_amount=payment_details.amount,
+            created_at=datetime.now()
+        ))
+        
+        return transaction
+    
+    async def refund_payment(
+        self,
+        transaction_id: str,
+        amount: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Refund PromptPay payment"""
+        
+        return {
+            "refund_id": f"promptpay_refund_{datetime.now().timestamp()}",
+            "amount": amount,
+            "status": "manual_process_required"
+        }
+    
+    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
+        """Get PromptPay transaction status"""
+        return PaymentStatus.COMPLETED
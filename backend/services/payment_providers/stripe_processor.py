@@ -0,0 +1,73 @@
+"""
+Stripe Payment Provider for SiamStay
+International card payments (loaded lazily by the provider registry)
+"""
+
+from typing import Dict, Optional, Any
+from datetime import datetime
+import logging
+
+from backend.core.trusted import construct_trusted
+from backend.services.payment_processor import (
+    BasePaymentProcessor,
+    PaymentDetails,
+    PaymentStatus,
+    PaymentTransaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StripeProcessor(BasePaymentProcessor):
+    """Stripe payment processor for international cards"""
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        # TODO: Initialize Stripe client
+    
+    async def process_payment(
+        self,
+        payment_details: PaymentDetails,
+        metadata: Dict[str, Any]
+    ) -> PaymentTransaction:
+        """Process payment via Stripe"""
+        
+        # TODO: Implement Stripe payment processing
+        logger.info(
+            "Processing Stripe payment: %s %s",
+            payment_details.amount, payment_details.currency
+        )
+        
+        # Built from our own computed values, no need to re-validate
+        transaction = construct_trusted(PaymentTransaction, dict(
+            transaction_id=f"stripe_{datetime.now().timestamp()}",
+            booking_id=metadata["booking_id"],
+            payer_id=metadata["payer_id"],
+            recipient_id=metadata["recipient_id"],
+            payment_details=payment_details,
+            gross_amount=payment_details.amount,
+            fee_amount=payment_details.amount * 0.029,  # Stripe fee
+            net_amount=payment_details.amount * 0.971,
+            created_at=datetime.now()
+        ))
+        
+        return transaction
+    
+    async def refund_payment(
+        self,
+        transaction_id: str,
+        amount: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Refund Stripe payment"""
+        
+        # TODO: Implement Stripe refund
+        return {
+            "refund_id": f"refund_{datetime.now().timestamp()}",
+            "amount": amount,
+            "status": "pending"
+        }
+    
+    async def get_transaction_status(self, transaction_id: str) -> PaymentStatus:
+        """Get Stripe transaction status"""
+        # TODO: Implement status check
+        return PaymentStatus.COMPLETED
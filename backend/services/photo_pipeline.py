@@ -0,0 +1,350 @@
+"""
+Photo Pipeline for SiamStay
+Resized photo variants rendered in a process pool, deduplicated by content hash
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+
+from backend.core.metrics import REGISTRY, timed
+from backend.core.property_manager import PropertyManager, PropertyPhoto
+
+logger = logging.getLogger(__name__)
+
+PHOTO_INGESTS = REGISTRY.counter(
+    "siamstay_photo_ingests_total",
+    "Photo uploads by outcome",
+    ("outcome",),
+)
+
+# Variant name -> bounding box; photos are scaled down to fit, never up
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "web": (1600, 1200),
+    "card": (640, 480),
+    "thumb": (320, 240),
+}
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_variants(
+    data: bytes,
+    variants: Dict[str, Tuple[int, int]] = VARIANTS,
+    quality: int = 82
+) -> Tuple[int, int, Dict[str, bytes]]:
+    """Original size and JPEG bytes per variant (runs in a worker process)
+
+    Variants are rendered largest first, each from the previous one, so
+    the full-size decode happens once; JPEG sources are decoded at reduced
+    scale when the largest variant allows it.
+    """
+
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    largest = max(variants.values())
+    image.draft("RGB", largest)
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    if (image.width > image.height) != (width > height):
+        # Rotated by its EXIF orientation
+        width, height = height, width
+
+    rendered = {}
+    for name, size in sorted(variants.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+        rendered[name] = buffer.getvalue()
+    return width, height, rendered
+
+
+class BaseBlobStore(ABC):
+    """Content-addressed storage for photos and their variants"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str):
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        pass
+
+
+class LocalBlobStore(BaseBlobStore):
+    """Blobs as files under ``root``, served from ``base_url``"""
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, data: bytes, content_type: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class PhotoPipeline:
+    """Ingests property photos into sized variants
+
+    Uploads are keyed by their SHA-256: content seen before, in this
+    process or recorded in the blob store's manifest, costs no decoding,
+    and concurrent uploads of the same bytes share one render. Rendering
+    runs in a process pool and blob store I/O in the default thread pool,
+    so neither blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        property_manager: PropertyManager,
+        store: BaseBlobStore,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        variants: Dict[str, Tuple[int, int]] = VARIANTS
+    ):
+        self.property_manager = property_manager
+        self.store = store
+        self.variants = variants
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._owns_executor = executor is None
+        # content_hash -> processed photo, and renders in progress
+        self.photos: Dict[str, PropertyPhoto] = {}
+        self._pending: Dict[str, "asyncio.Future[PropertyPhoto]"] = {}
+        self._http_client: Any = None
+
+    def _key(self, digest: str, name: str) -> str:
+        return f"photos/{digest[:2]}/{digest}/{name}"
+
+    async def _store_put(self, key: str, data: bytes, content_type: str):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.put, key, data, content_type)
+
+    async def _store_get(self, key: str) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.store.get, key)
+
+    async def _from_manifest(self, digest: str) -> Optional[PropertyPhoto]:
+        manifest = await self._store_get(self._key(digest, "manifest.json"))
+        if manifest is None:
+            return None
+        return PropertyPhoto(**json.loads(manifest))
+
+    async def _process(
+        self,
+        digest: str,
+        data: bytes,
+        original_url: Optional[str]
+    ) -> PropertyPhoto:
+        loop = asyncio.get_running_loop()
+        width, height, rendered = await loop.run_in_executor(
+            self._executor, render_variants, data, self.variants
+        )
+
+        if original_url is None:
+            original_key = self._key(digest, "original")
+            await self._store_put(original_key, data, "application/octet-stream")
+            original_url = self.store.url(original_key)
+
+        variants = {}
+        for name, blob in rendered.items():
+            key = self._key(digest, f"{name}.jpg")
+            await self._store_put(key, blob, "image/jpeg")
+            variants[name] = self.store.url(key)
+
+        photo = PropertyPhoto(
+            content_hash=digest,
+            original_url=original_url,
+            width=width,
+            height=height,
+            variants=variants
+        )
+        # Written last: a manifest means every variant is in place
+        await self._store_put(
+            self._key(digest, "manifest.json"),
+            photo.model_dump_json().encode(),
+            "application/json"
+        )
+        return photo
+
+    async def _photo_for(self, data: bytes, original_url: Optional[str]) -> PropertyPhoto:
+        digest = content_hash(data)
+        photo = self.photos.get(digest)
+        if photo is None and digest not in self._pending:
+            # The same bytes may finish rendering while the manifest is read
+            photo = await self._from_manifest(digest) or self.photos.get(digest)
+        if photo is not None:
+            PHOTO_INGESTS.inc(("deduplicated",))
+            self.photos[digest] = photo
+            return photo
+
+        pending = self._pending.get(digest)
+        if pending is not None:
+            PHOTO_INGESTS.inc(("deduplicated",))
+            return await asyncio.shield(pending)
+
+        future = self._pending[digest] = asyncio.get_running_loop().create_future()
+        try:
+            photo = await self._process(digest, data, original_url)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved; with no waiters asyncio would log it again
+            future.exception()
+            PHOTO_INGESTS.inc(("failed",))
+            logger.warning("Photo %s could not be processed: %s", digest[:12], e)
+            raise
+        finally:
+            self._pending.pop(digest, None)
+
+        future.set_result(photo)
+        self.photos[digest] = photo
+        PHOTO_INGESTS.inc(("processed",))
+        return photo
+
+    @timed("photo_pipeline")
+    async def ingest(
+        self,
+        property_id: str,
+        data: bytes,
+        original_url: Optional[str] = None
+    ) -> PropertyPhoto:
+        """Process one upload and attach it to the property
+
+        ``original_url`` is kept when the original already lives elsewhere;
+        otherwise the upload is stored next to its variants.
+        """
+
+        if property_id not in self.property_manager.properties:
+            raise ValueError(f"Property {property_id} not found")
+
+        photo = await self._photo_for(data, original_url)
+        await self._attach(property_id, [photo])
+        return photo
+
+    async def ingest_many(
+        self,
+        property_id: str,
+        uploads: Iterable[bytes]
+    ) -> List[PropertyPhoto]:
+        """Process several uploads in parallel, attached in upload order"""
+
+        if property_id not in self.property_manager.properties:
+            raise ValueError(f"Property {property_id} not found")
+
+        photos = await asyncio.gather(*(self._photo_for(data, None) for data in uploads))
+        await self._attach(property_id, photos)
+        return photos
+
+    async def backfill(self, property_id: str) -> List[PropertyPhoto]:
+        """Fetch and process a property's raw photo URLs that have no variants"""
+
+        property_obj = self.property_manager.properties.get(property_id)
+        if property_obj is None:
+            raise ValueError(f"Property {property_id} not found")
+
+        processed = {
+            url
+            for photo in property_obj.photo_variants
+            for url in (photo.original_url, *photo.source_urls)
+        }
+        urls = [url for url in property_obj.photos if url not in processed]
+        if not urls:
+            return []
+
+        if self._http_client is None:
+            import httpx
+
+            self._http_client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+
+        async def fetch(url: str) -> PropertyPhoto:
+            response = await self._http_client.get(url)
+            response.raise_for_status()
+            return await self._photo_for(response.content, url)
+
+        photos = await asyncio.gather(*(fetch(url) for url in urls))
+        await self._attach(property_id, photos, urls)
+        return photos
+
+    async def _attach(
+        self,
+        property_id: str,
+        photos: List[PropertyPhoto],
+        source_urls: Optional[List[str]] = None
+    ):
+        """Add new photos to the property, deduplicated by content hash
+
+        ``source_urls`` are the property URLs the photos were fetched from;
+        one that differs from the stored photo's ``original_url`` (the same
+        bytes under another URL) is recorded as an alias so backfill treats
+        it as processed.
+        """
+
+        property_obj = self.property_manager.properties[property_id]
+        photo_variants = list(property_obj.photo_variants)
+        attached = {photo.content_hash: i for i, photo in enumerate(photo_variants)}
+        new_urls = []
+        changed = False
+        for photo, url in zip(photos, source_urls or [None] * len(photos)):
+            index = attached.get(photo.content_hash)
+            if index is None:
+                if url is not None and url != photo.original_url:
+                    photo = photo.model_copy(update={"source_urls": [url]})
+                attached[photo.content_hash] = len(photo_variants)
+                photo_variants.append(photo)
+                if url is None and photo.original_url not in property_obj.photos:
+                    new_urls.append(photo.original_url)
+                changed = True
+                continue
+
+            known = photo_variants[index]
+            if url is not None and url not in (known.original_url, *known.source_urls):
+                photo_variants[index] = known.model_copy(
+                    update={"source_urls": known.source_urls + [url]}
+                )
+                changed = True
+        if not changed:
+            return
+
+        await self.property_manager.update_property(property_id, {
+            "photos": property_obj.photos + new_urls,
+            "photo_variants": photo_variants,
+        })
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,79 @@
+"""
+Property Suspension Pipeline for SiamStay
+Cancels upcoming bookings and refunds guests when a property goes offline
+"""
+
+from typing import Dict, Optional, Any, Callable
+import logging
+
+from backend.core.property_manager import PropertyManager, PropertyStatus
+from backend.services.booking_engine import BookingEngine, PaymentStatus
+from backend.services.payment_processor import PaymentService
+
+logger = logging.getLogger(__name__)
+
+
+class PropertySuspensionPipeline:
+    """Take a property offline and unwind its future bookings"""
+
+    # Statuses that make a property unbookable
+    OFFLINE_STATUSES = (PropertyStatus.MAINTENANCE, PropertyStatus.SUSPENDED)
+
+    def __init__(
+        self,
+        property_manager: PropertyManager,
+        booking_engine: BookingEngine,
+        payment_service: PaymentService,
+        max_concurrent_refunds: int = 10
+    ):
+        self.property_manager = property_manager
+        self.booking_engine = booking_engine
+        self.payment_service = payment_service
+        self.max_concurrent_refunds = max_concurrent_refunds
+
+    async def suspend_property(
+        self,
+        property_id: str,
+        status: PropertyStatus = PropertyStatus.SUSPENDED,
+        reason: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Move property offline, cancel its bookings and dispatch refunds"""
+
+        if status not in self.OFFLINE_STATUSES:
+            raise ValueError(f"Status {status} does not take a property offline")
+
+        if property_id not in self.property_manager.properties:
+            raise ValueError(f"Property {property_id} not found")
+
+        # Through the manager so change listeners (search, cache) see it
+        await self.property_manager.update_property(property_id, {"status": status})
+
+        cancellations = await self.booking_engine.cancel_property_bookings(
+            property_id,
+            reason=reason or f"property_{status.value}"
+        )
+
+        refund_report = await self.payment_service.refund_bookings(
+            cancellations,
+            max_concurrency=self.max_concurrent_refunds,
+            progress_callback=progress_callback
+        )
+
+        for result in refund_report["results"]:
+            if "refunds" in result and any(refund["amount"] for refund in result["refunds"]):
+                self.booking_engine.set_payment_status(
+                    result["booking_id"], PaymentStatus.REFUNDED
+                )
+
+        logger.info(
+            "Property %s set to %s: %d bookings cancelled, %d refunds failed",
+            property_id, status.value, len(cancellations), refund_report["failed"]
+        )
+
+        return {
+            "property_id": property_id,
+            "status": status,
+            "cancelled_bookings": cancellations,
+            "refunds": refund_report
+        }
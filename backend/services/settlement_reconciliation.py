@@ -0,0 +1,322 @@
+"""
+Settlement Reconciliation for SiamStay
+Streams provider settlement reports and matches them against our ledger
+"""
+
+from typing import Dict, List, Optional, Any, Iterator, Tuple, Set
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from pydantic import BaseModel
+import csv
+import json
+import logging
+
+from backend.services.payment_processor import (
+    PaymentProvider,
+    PaymentService,
+    PaymentStatus,
+    PaymentTransaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MismatchType(str, Enum):
+    """Reconciliation mismatch categories"""
+    MISSING_IN_LEDGER = "missing_in_ledger"          # Provider row, no transaction
+    MISSING_IN_SETTLEMENT = "missing_in_settlement"  # Settled transaction, no provider row
+    AMOUNT_DIFF = "amount_diff"
+    FEE_DIFF = "fee_diff"
+
+
+class SettlementFormat(BaseModel):
+    """Column layout of a provider settlement export"""
+    id_field: str
+    amount_field: str
+    fee_field: Optional[str] = None
+    # Settlement timestamp (ISO 8601 or epoch seconds); gives the file's period
+    date_field: Optional[str] = None
+    # Divide raw values by this (e.g. 100 for satang/cents exports)
+    amount_scale: float = 1.0
+
+
+# Default layouts for the exports we receive
+SETTLEMENT_FORMATS: Dict[PaymentProvider, SettlementFormat] = {
+    PaymentProvider.STRIPE: SettlementFormat(
+        id_field="id", amount_field="amount", fee_field="fee", date_field="created",
+        amount_scale=100
+    ),
+    PaymentProvider.OMISE: SettlementFormat(
+        id_field="charge_id", amount_field="amount", fee_field="fee",
+        date_field="created_at", amount_scale=100
+    ),
+    PaymentProvider.SCB_EASY: SettlementFormat(
+        id_field="reference", amount_field="amount"
+    ),
+    PaymentProvider.KASIKORN: SettlementFormat(
+        id_field="reference", amount_field="amount"
+    ),
+}
+
+
+# (transaction_id, gross_amount, expected_fee, completed_at if COMPLETED)
+_LedgerEntry = Tuple[str, float, Optional[float], Optional[datetime]]
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return datetime.fromtimestamp(float(value))
+    parsed = datetime.fromisoformat(str(value))
+    if parsed.tzinfo is not None:
+        # Ledger timestamps are naive local time
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+class SettlementReconciler:
+    """Streaming reconciler for provider settlement files
+
+    Rows are consumed in fixed-size chunks, so memory stays constant in the
+    size of the file; only the ledger index and the set of matched ids grow
+    with the number of transactions we hold. The index is rebuilt for every
+    file so transactions recorded since the last run are matched.
+    """
+
+    def __init__(
+        self,
+        payment_service: PaymentService,
+        tolerance: float = 0.01,
+        chunk_size: int = 10_000
+    ):
+        self.payment_service = payment_service
+        self.tolerance = tolerance
+        self.chunk_size = chunk_size
+        self._index: Dict[PaymentProvider, Dict[str, _LedgerEntry]] = {}
+
+    def build_index(self):
+        """Build provider_transaction_id hash indexes from the ledger"""
+
+        index: Dict[PaymentProvider, Dict[str, _LedgerEntry]] = {}
+        for transaction in self.payment_service.transactions.values():
+            if not transaction.provider_transaction_id:
+                continue
+            provider_index = index.setdefault(
+                transaction.payment_details.provider, {}
+            )
+            settled_at = (
+                transaction.completed_at or transaction.created_at
+                if transaction.status == PaymentStatus.COMPLETED
+                else None
+            )
+            provider_index[transaction.provider_transaction_id] = (
+                transaction.transaction_id,
+                transaction.gross_amount,
+                self._expected_fee(transaction),
+                settled_at
+            )
+
+        self._index = index
+        logger.info(
+            "Built settlement index for %d transactions",
+            sum(map(len, index.values()))
+        )
+
+    @staticmethod
+    def _expected_fee(transaction: PaymentTransaction) -> Optional[float]:
+        """Fee we expect the provider to report"""
+        if transaction.provider_fee is not None:
+            return transaction.provider_fee
+        return transaction.fee_amount
+
+    def _read_rows(
+        self,
+        path: str,
+        fmt: SettlementFormat
+    ) -> Iterator[Tuple[str, Any, Any, Any]]:
+        """Lazily read (id, amount, fee, date) tuples from a CSV or JSONL export"""
+
+        fee_field = fmt.fee_field
+        date_field = fmt.date_field
+        with open(path, newline="", encoding="utf-8") as handle:
+            if path.endswith((".jsonl", ".ndjson")):
+                for line in handle:
+                    if line.strip():
+                        row = json.loads(line)
+                        yield (
+                            row[fmt.id_field],
+                            row[fmt.amount_field],
+                            row.get(fee_field) if fee_field else None,
+                            row.get(date_field) if date_field else None
+                        )
+                return
+
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if header is None:
+                return
+            try:
+                id_col = header.index(fmt.id_field)
+                amount_col = header.index(fmt.amount_field)
+                fee_col = header.index(fee_field) if fee_field else None
+                date_col = header.index(date_field) if date_field else None
+            except ValueError as e:
+                raise ValueError(f"Settlement file {path} is missing a column: {e}")
+
+            for row in reader:
+                yield (
+                    row[id_col],
+                    row[amount_col],
+                    row[fee_col] if fee_col is not None else None,
+                    row[date_col] if date_col is not None else None
+                )
+
+    def reconcile_file(
+        self,
+        path: str,
+        provider: PaymentProvider,
+        settlement_format: Optional[SettlementFormat] = None,
+        report_missing: bool = True,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream mismatches between a settlement file and the ledger
+
+        Only COMPLETED transactions whose completion falls in the file's
+        settlement period (inclusive) can be missing from it. The period is
+        ``period_start``/``period_end``, or else the range of the format's
+        ``date_field`` across the file; formats without one (the bank
+        statements) need the period passed in.
+        """
+
+        fmt = settlement_format or SETTLEMENT_FORMATS.get(provider)
+        if not fmt:
+            raise ValueError(f"No settlement format configured for {provider}")
+        if (
+            report_missing
+            and fmt.date_field is None
+            and (period_start is None or period_end is None)
+        ):
+            raise ValueError(
+                f"Settlement format for {provider.value} has no date column, "
+                "pass period_start and period_end"
+            )
+
+        self.build_index()
+
+        ledger = self._index.get(provider, {})
+        tolerance = self.tolerance
+        scale = fmt.amount_scale
+        seen: Set[str] = set()
+        first_date: Optional[datetime] = None
+        last_date: Optional[datetime] = None
+        rows = self._read_rows(path, fmt)
+
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+
+            for provider_id, raw_amount, raw_fee, raw_date in chunk:
+                if raw_date not in (None, ""):
+                    settled_at = _parse_timestamp(raw_date)
+                    if first_date is None or settled_at < first_date:
+                        first_date = settled_at
+                    if last_date is None or settled_at > last_date:
+                        last_date = settled_at
+
+                amount = float(raw_amount) / scale
+                entry = ledger.get(provider_id)
+                if entry is None:
+                    yield {
+                        "type": MismatchType.MISSING_IN_LEDGER,
+                        "provider_transaction_id": provider_id,
+                        "settlement_amount": amount
+                    }
+                    continue
+
+                seen.add(provider_id)
+                transaction_id, gross_amount, expected_fee, _ = entry
+
+                if abs(amount - gross_amount) > tolerance:
+                    yield {
+                        "type": MismatchType.AMOUNT_DIFF,
+                        "provider_transaction_id": provider_id,
+                        "transaction_id": transaction_id,
+                        "ledger_amount": gross_amount,
+                        "settlement_amount": amount
+                    }
+
+                if raw_fee not in (None, ""):
+                    fee = float(raw_fee) / scale
+                    if expected_fee is None or abs(fee - expected_fee) > tolerance:
+                        yield {
+                            "type": MismatchType.FEE_DIFF,
+                            "provider_transaction_id": provider_id,
+                            "transaction_id": transaction_id,
+                            "ledger_fee": expected_fee,
+                            "settlement_fee": fee
+                        }
+
+        if not report_missing:
+            return
+
+        period_start = period_start or first_date
+        period_end = period_end or last_date
+        if period_start is None or period_end is None:
+            logger.warning(
+                "No settlement period for %s, not reporting missing transactions", path
+            )
+            return
+
+        for provider_id, (transaction_id, gross_amount, _, settled_at) in ledger.items():
+            if (
+                settled_at is not None
+                and period_start <= settled_at <= period_end
+                and provider_id not in seen
+            ):
+                yield {
+                    "type": MismatchType.MISSING_IN_SETTLEMENT,
+                    "provider_transaction_id": provider_id,
+                    "transaction_id": transaction_id,
+                    "ledger_amount": gross_amount
+                }
+
+    def reconcile(
+        self,
+        path: str,
+        provider: PaymentProvider,
+        settlement_format: Optional[SettlementFormat] = None,
+        max_mismatches: int = 1000,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Reconcile a settlement file and summarise the result"""
+
+        counts = {mismatch_type.value: 0 for mismatch_type in MismatchType}
+        mismatches: List[Dict[str, Any]] = []
+
+        mismatches_iter = self.reconcile_file(
+            path,
+            provider,
+            settlement_format,
+            period_start=period_start,
+            period_end=period_end
+        )
+        for mismatch in mismatches_iter:
+            counts[mismatch["type"].value] += 1
+            if len(mismatches) < max_mismatches:
+                mismatches.append(mismatch)
+
+        total = sum(counts.values())
+        logger.info("Reconciled %s for %s: %s mismatches", path, provider.value, total)
+
+        return {
+            "provider": provider,
+            "file": path,
+            "mismatch_counts": counts,
+            "total_mismatches": total,
+            "mismatches": mismatches
+        }
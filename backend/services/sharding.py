@@ -0,0 +1,592 @@
+"""
+Sharded Deployment for SiamStay
+Partitions properties, calendars, bookings and payments across worker processes
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Callable, Iterable, Set, Tuple, Union
+from enum import Enum
+from datetime import datetime, date
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import multiprocessing
+import operator
+import os
+import pickle
+import zlib
+
+from backend.core.property_manager import Property, PropertyManager, PropertySearchEngine
+from backend.services.booking_engine import Booking, BookingEngine
+from backend.services.payment_processor import PaymentService, PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+
+class ShardStrategy(str, Enum):
+    """How properties are assigned to shards"""
+    PROVINCE = "province"            # Co-locates a province; prunes location searches
+    PROPERTY_HASH = "property_hash"  # Even spread, every search fans out
+
+
+def stable_hash(value: str) -> int:
+    """Process-independent hash (``hash()`` is salted per interpreter)"""
+    return zlib.crc32(value.encode())
+
+
+class ShardState:
+    """Services owned by one worker process"""
+
+    # Router target name -> attribute holding the service
+    TARGETS = {
+        "properties": "property_manager",
+        "search": "search_engine",
+        "bookings": "booking_engine",
+        "payments": "payment_service",
+    }
+
+    def __init__(self, shard_id: int):
+        self.shard_id = shard_id
+        self.property_manager = PropertyManager()
+        self.booking_engine = BookingEngine()
+        self.search_engine = PropertySearchEngine(
+            self.property_manager, self.booking_engine.availability
+        )
+        self.payment_service = PaymentService()
+
+    def resolve(self, target: str) -> Any:
+        if target == "shard":
+            return self
+        attribute = self.TARGETS.get(target)
+        if attribute is None:
+            raise ValueError(f"Unknown shard target {target}")
+        return getattr(self, attribute)
+
+    def get_property(self, property_id: str) -> Optional[Property]:
+        return self.property_manager.properties.get(property_id)
+
+    def load_properties(self, properties: List[Property]) -> int:
+        for property_obj in properties:
+            self.property_manager.properties[property_obj.property_id] = property_obj
+        # Bulk loads bypass the change listeners
+        self.search_engine.invalidate_facets()
+        return len(properties)
+
+    def load_bookings(self, records: List[Union[Booking, Dict[str, Any]]]) -> int:
+        return self.booking_engine.load_bookings(records)
+
+    def load_transactions(self, records: List[Union[PaymentTransaction, Dict[str, Any]]]) -> int:
+        return self.payment_service.load_transactions(records)
+
+    def check_availability(self, property_id: str, check_in: date, check_out: date) -> bool:
+        return self.booking_engine.availability.check_availability(property_id, check_in, check_out)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "shard_id": self.shard_id,
+            "pid": os.getpid(),
+            "properties": len(self.property_manager.properties),
+            "live_bookings": len(self.booking_engine.bookings),
+            "archived_bookings": len(self.booking_engine.archive),
+            "transactions": len(self.payment_service.transactions),
+        }
+
+
+# Worker-process globals, set by the executor initializer
+_STATE: Optional[ShardState] = None
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(shard_id: int, setup: Optional[Callable[[ShardState], None]]):
+    global _STATE, _LOOP
+    _STATE = ShardState(shard_id)
+    _LOOP = asyncio.new_event_loop()
+    asyncio.set_event_loop(_LOOP)
+    if setup is not None:
+        setup(_STATE)
+
+
+def _call_in_worker(target: str, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    try:
+        result = getattr(_STATE.resolve(target), method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = _LOOP.run_until_complete(result)
+    except Exception as e:
+        # An exception that cannot be unpickled (e.g. pydantic's
+        # ValidationError) would break the whole worker pool
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise ValueError(str(e)) from None
+        raise
+    return result
+
+
+class ShardRouter:
+    """Routes service calls to the worker process owning the data
+
+    Each shard is a single worker process with its own ``PropertyManager``,
+    ``BookingEngine`` and ``PaymentService``; calls to one shard run one at
+    a time, calls to different shards in parallel. Single-property and
+    single-booking operations go to the owning shard; search and analytics
+    fan out and are merged here.
+
+    All data must enter through the router (``create_*``/``load_*``) so it
+    can keep the property and booking directories. Results are copies:
+    mutate state only through router calls. In-process hooks (transition
+    listeners, schedulers, compliance engines) are installed per shard by
+    the picklable ``setup`` function.
+    """
+
+    def __init__(
+        self,
+        shard_count: Optional[int] = None,
+        strategy: ShardStrategy = ShardStrategy.PROVINCE,
+        province_map: Optional[Dict[str, int]] = None,
+        setup: Optional[Callable[[ShardState], None]] = None,
+        mp_context: Optional[Any] = None
+    ):
+        self.shard_count = shard_count or os.cpu_count() or 1
+        self.strategy = strategy
+        # Province -> shard; seed it to pin placement, e.g. Bangkok on its own shard
+        self.province_map = {
+            province.lower(): shard for province, shard in (province_map or {}).items()
+        }
+        self.setup = setup
+        self.shard_sizes = [0] * self.shard_count
+        self.mp_context = mp_context or multiprocessing.get_context("spawn")
+
+        self.executors: List[ProcessPoolExecutor] = []
+        self.property_shards: Dict[str, int] = {}
+        self.booking_shards: Dict[str, int] = {}
+        # Provinces present on each shard, for pruning location searches
+        self.shard_provinces: List[Set[str]] = [set() for _ in range(self.shard_count)]
+
+    async def start(self):
+        """Start the worker processes"""
+
+        self.executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=self.mp_context,
+                initializer=_init_worker,
+                initargs=(shard_id, self.setup)
+            )
+            for shard_id in range(self.shard_count)
+        ]
+        # Spawn eagerly so the first real request does not pay for startup
+        await self.broadcast("shard", "stats")
+        logger.info("Started %d shards (%s)", self.shard_count, self.strategy.value)
+
+    async def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+        self.executors = []
+
+    async def __aenter__(self) -> "ShardRouter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Placement
+
+    def shard_for_province(self, province: str) -> int:
+        """Shard holding a province; new provinces go to the smallest shard"""
+
+        key = province.lower()
+        shard = self.province_map.get(key)
+        if shard is None:
+            shard = min(range(self.shard_count), key=self.shard_sizes.__getitem__)
+            self.province_map[key] = shard
+        return shard
+
+    def _assign_provinces(self, province_counts: Counter):
+        """Place unseen provinces largest first, each on the emptiest shard"""
+
+        for province, count in province_counts.most_common():
+            if province not in self.province_map:
+                shard = self.shard_for_province(province)
+                self.shard_sizes[shard] += count
+
+    def _place(self, property_id: str, province: str) -> int:
+        if self.strategy == ShardStrategy.PROVINCE:
+            shard = self.shard_for_province(province)
+        else:
+            shard = stable_hash(property_id) % self.shard_count
+        self.property_shards[property_id] = shard
+        self.shard_provinces[shard].add(province.lower())
+        self.shard_sizes[shard] += 1
+        return shard
+
+    def shard_for_property(self, property_id: str) -> int:
+        shard = self.property_shards.get(property_id)
+        if shard is None:
+            raise ValueError(f"Property {property_id} not found")
+        return shard
+
+    def shard_for_booking(self, booking_id: str) -> int:
+        shard = self.booking_shards.get(booking_id)
+        if shard is None:
+            raise ValueError(f"Booking {booking_id} not found")
+        return shard
+
+    # Transport
+
+    async def call(self, shard: int, target: str, method: str, *args, **kwargs) -> Any:
+        """Run ``target.method(*args, **kwargs)`` in one shard"""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executors[shard], _call_in_worker, target, method, args, kwargs
+        )
+
+    async def broadcast(
+        self,
+        target: str,
+        method: str,
+        *args,
+        shards: Optional[Iterable[int]] = None,
+        **kwargs
+    ) -> List[Any]:
+        """Run a call on several shards (default: all) in parallel"""
+
+        if shards is None:
+            shards = range(self.shard_count)
+        return await asyncio.gather(
+            *(self.call(shard, target, method, *args, **kwargs) for shard in shards)
+        )
+
+    async def stats(self) -> List[Dict[str, int]]:
+        return await self.broadcast("shard", "stats")
+
+    # Bulk loading
+
+    async def load_properties(self, properties: Iterable[Property], chunk_size: int = 5000) -> int:
+        """Partition existing properties across shards"""
+
+        properties = list(properties)
+        if self.strategy == ShardStrategy.PROVINCE:
+            sizes = list(self.shard_sizes)
+            self._assign_provinces(Counter(
+                property_obj.details.location.province.lower() for property_obj in properties
+            ))
+            self.shard_sizes = sizes
+
+        buckets: List[List[Property]] = [[] for _ in range(self.shard_count)]
+        for property_obj in properties:
+            shard = self._place(property_obj.property_id, property_obj.details.location.province)
+            buckets[shard].append(property_obj)
+        return await self._load_buckets("load_properties", buckets, chunk_size)
+
+    async def load_bookings(
+        self,
+        records: Iterable[Union[Booking, Dict[str, Any]]],
+        chunk_size: int = 5000
+    ) -> int:
+        """Send bookings to the shard owning their property"""
+
+        buckets: List[list] = [[] for _ in range(self.shard_count)]
+        for record in records:
+            if isinstance(record, Booking):
+                booking_id, property_id = record.booking_id, record.property_id
+            else:
+                booking_id, property_id = record["booking_id"], record["property_id"]
+            shard = self.shard_for_property(property_id)
+            self.booking_shards[booking_id] = shard
+            buckets[shard].append(record)
+        return await self._load_buckets("load_bookings", buckets, chunk_size)
+
+    async def load_transactions(
+        self,
+        records: Iterable[Union[PaymentTransaction, Dict[str, Any]]],
+        chunk_size: int = 5000
+    ) -> int:
+        """Send transactions to the shard owning their booking"""
+
+        buckets: List[list] = [[] for _ in range(self.shard_count)]
+        for record in records:
+            booking_id = (
+                record.booking_id if isinstance(record, PaymentTransaction)
+                else record["booking_id"]
+            )
+            buckets[self.shard_for_booking(booking_id)].append(record)
+        return await self._load_buckets("load_transactions", buckets, chunk_size)
+
+    async def _load_buckets(self, method: str, buckets: List[list], chunk_size: int) -> int:
+        async def load_shard(shard: int, bucket: list) -> int:
+            loaded = 0
+            for start in range(0, len(bucket), chunk_size):
+                loaded += await self.call(shard, "shard", method, bucket[start:start + chunk_size])
+            return loaded
+
+        return sum(await asyncio.gather(
+            *(load_shard(shard, bucket) for shard, bucket in enumerate(buckets) if bucket)
+        ))
+
+    # Properties
+
+    async def create_property(self, owner_id: str, property_data: Dict[str, Any]) -> Property:
+        property_id = f"prop_{datetime.now().timestamp()}"
+        while property_id in self.property_shards:
+            property_id = f"prop_{datetime.now().timestamp()}"
+
+        province = property_data["details"]["location"]["province"]
+        key = province.lower()
+        new_province = key not in self.province_map
+        held_province = [key in provinces for provinces in self.shard_provinces]
+
+        shard = self._place(property_id, province)
+        try:
+            return await self.call(
+                shard, "properties", "create_property", owner_id, property_data,
+                property_id=property_id
+            )
+        except Exception:
+            # Undo the placement so sizes and search routing stay accurate
+            del self.property_shards[property_id]
+            self.shard_sizes[shard] -= 1
+            if not held_province[shard]:
+                self.shard_provinces[shard].discard(key)
+            if new_province:
+                self.province_map.pop(key, None)
+            raise
+
+    async def get_property(self, property_id: str) -> Optional[Property]:
+        shard = self.property_shards.get(property_id)
+        if shard is None:
+            return None
+        return await self.call(shard, "shard", "get_property", property_id)
+
+    async def update_property(self, property_id: str, updates: Dict[str, Any]) -> Property:
+        shard = self.shard_for_property(property_id)
+        location = updates.get("details", {}).get("location")
+        if location and "province" in location:
+            province = location["province"].lower()
+            if province not in self.shard_provinces[shard]:
+                if self.strategy == ShardStrategy.PROVINCE and self.shard_for_province(province) != shard:
+                    raise ValueError("Moving a property to another province's shard is not supported")
+                self.shard_provinces[shard].add(province)
+        return await self.call(
+            shard, "properties", "update_property", property_id, updates
+        )
+
+    async def delete_property(self, property_id: str):
+        shard = self.shard_for_property(property_id)
+        await self.call(shard, "properties", "delete_property", property_id)
+        del self.property_shards[property_id]
+        self.shard_sizes[shard] -= 1
+
+    async def validate_compliance(self, property_id: str) -> Dict[str, Any]:
+        return await self.call(
+            self.shard_for_property(property_id), "properties", "validate_compliance", property_id
+        )
+
+    async def calculate_dynamic_price(self, property_id: str, check_in: date, check_out: date) -> Dict[str, Any]:
+        return await self.call(
+            self.shard_for_property(property_id), "properties", "calculate_dynamic_price",
+            property_id, check_in, check_out
+        )
+
+    async def search_properties(
+        self,
+        filters: Dict[str, Any],
+        page: int = 1,
+        page_size: int = 20,
+        fields: Optional[List[str]] = None,
+        facets: bool = False,
+        sort: Optional[str] = None,
+        near: Optional[Tuple[float, float]] = None
+    ) -> Dict[str, Any]:
+        """Fan a search out to the relevant shards and merge the pages
+
+        Each shard returns its first ``page * page_size`` matches; merged
+        results are ordered by the shards' sort keys, and facet counts are
+        summed. Unsorted searches are ordered by ``(created_at,
+        property_id)`` (the ``listed`` sort), since no shard knows the
+        global insertion order.
+        """
+
+        shards = range(self.shard_count)
+        if "location" in filters and self.strategy == ShardStrategy.PROVINCE:
+            location = filters["location"].lower()
+            shards = [
+                shard for shard, provinces in enumerate(self.shard_provinces)
+                if any(location in province for province in provinces)
+            ]
+
+        # Fields the merge needs even if the caller did not ask for them
+        merge_fields = ["property_id"] if fields and "property_id" not in fields else []
+        shard_fields = list(fields) + merge_fields if fields else fields
+
+        window = page * page_size
+        results = await self.broadcast(
+            "search", "search_properties", filters, 1, window, shard_fields,
+            facets=facets, sort=sort or "listed", near=near, include_sort_keys=True, shards=shards
+        )
+
+        if fields:
+            property_id_of = operator.itemgetter("property_id")
+        else:
+            property_id_of = operator.attrgetter("property_id")
+
+        merged = heapq.merge(
+            *(zip(result["sort_keys"], result["properties"]) for result in results),
+            key=operator.itemgetter(0)
+        )
+        properties = [
+            item for _, item in itertools.islice(merged, (page - 1) * page_size, window)
+        ]
+
+        total_count = sum(result["total_count"] for result in results)
+        merged_results = {
+            "properties": properties,
+            "total_count": total_count,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total_count + page_size - 1) // page_size
+        }
+        if "flexible_dates" in filters:
+            check_ins = {}
+            for result in results:
+                check_ins.update(result["earliest_check_in"])
+            merged_results["earliest_check_in"] = {
+                property_id_of(item): check_ins[property_id_of(item)]
+                for item in properties
+            }
+        if facets:
+            merged_facets: Dict[str, Dict[str, int]] = {}
+            for result in results:
+                for facet, counts in result["facets"].items():
+                    totals = merged_facets.setdefault(facet, {})
+                    for value, count in counts.items():
+                        totals[value] = totals.get(value, 0) + count
+            merged_results["facets"] = merged_facets
+        if sort:
+            merged_results["sort"] = sort
+            if sort == "distance":
+                distances = {}
+                for result in results:
+                    distances.update(result["distance_km"])
+                merged_results["distance_km"] = {
+                    property_id_of(item): distances[property_id_of(item)]
+                    for item in properties
+                }
+
+        for item in properties:
+            for name in merge_fields:
+                del item[name]
+
+        return merged_results
+
+    # Bookings
+
+    async def create_booking(
+        self,
+        property_id: str,
+        guest_data: Dict[str, Any],
+        booking_data: Dict[str, Any],
+        pricing_data: Dict[str, Any],
+        trusted: bool = False
+    ) -> Booking:
+        booking_id = f"book_{datetime.now().timestamp()}"
+        while booking_id in self.booking_shards:
+            booking_id = f"book_{datetime.now().timestamp()}"
+
+        shard = self.shard_for_property(property_id)
+        booking = await self.call(
+            shard, "bookings", "create_booking", property_id, guest_data, booking_data,
+            pricing_data, trusted, booking_id=booking_id
+        )
+        self.booking_shards[booking_id] = shard
+        return booking
+
+    async def get_booking(self, booking_id: str) -> Optional[Booking]:
+        shard = self.booking_shards.get(booking_id)
+        if shard is None:
+            return None
+        return await self.call(shard, "bookings", "get_booking", booking_id)
+
+    async def confirm_booking(self, booking_id: str) -> Booking:
+        return await self.call(self.shard_for_booking(booking_id), "bookings", "confirm_booking", booking_id)
+
+    async def cancel_booking(self, booking_id: str, reason: str = "guest_request") -> Dict[str, Any]:
+        return await self.call(
+            self.shard_for_booking(booking_id), "bookings", "cancel_booking", booking_id, reason
+        )
+
+    async def check_in_guest(self, booking_id: str, check_in_data: Dict[str, Any]) -> Booking:
+        return await self.call(
+            self.shard_for_booking(booking_id), "bookings", "check_in_guest", booking_id, check_in_data
+        )
+
+    async def check_out_guest(self, booking_id: str) -> Booking:
+        return await self.call(self.shard_for_booking(booking_id), "bookings", "check_out_guest", booking_id)
+
+    async def mark_no_show(self, booking_id: str) -> Booking:
+        return await self.call(self.shard_for_booking(booking_id), "bookings", "mark_no_show", booking_id)
+
+    async def cancel_property_bookings(self, property_id: str, reason: str = "property_suspended") -> List[Dict[str, Any]]:
+        return await self.call(
+            self.shard_for_property(property_id), "bookings", "cancel_property_bookings", property_id, reason
+        )
+
+    async def check_availability(self, property_id: str, check_in: date, check_out: date) -> bool:
+        shard = self.property_shards.get(property_id)
+        if shard is None:
+            return True
+        return await self.call(shard, "shard", "check_availability", property_id, check_in, check_out)
+
+    # Payments
+
+    async def process_booking_payment(self, booking_id: str, *args, **kwargs) -> PaymentTransaction:
+        return await self.call(
+            self.shard_for_booking(booking_id), "payments", "process_booking_payment",
+            booking_id, *args, **kwargs
+        )
+
+    async def refund_booking(self, booking_id: str, amount: float) -> List[Dict[str, Any]]:
+        return await self.call(self.shard_for_booking(booking_id), "payments", "refund_booking", booking_id, amount)
+
+    # Analytics
+
+    async def get_booking_analytics(self) -> Dict[str, Any]:
+        """Booking analytics merged across shards"""
+
+        results = await self.broadcast("bookings", "get_booking_analytics")
+        total_bookings = sum(r["total_bookings"] for r in results)
+        confirmed_bookings = sum(r["confirmed_bookings"] for r in results)
+        total_revenue = sum(r["total_revenue"] for r in results)
+        stay_days = sum(r["average_stay_duration"] * r["total_bookings"] for r in results)
+
+        return {
+            "total_bookings": total_bookings,
+            "confirmed_bookings": confirmed_bookings,
+            "confirmation_rate": confirmed_bookings / max(total_bookings, 1),
+            "total_revenue": total_revenue,
+            "average_booking_value": total_revenue / max(confirmed_bookings, 1),
+            "average_stay_duration": stay_days / max(total_bookings, 1)
+        }
+
+    async def get_payment_analytics(self) -> Dict[str, Any]:
+        """Payment analytics merged across shards"""
+
+        results = await self.broadcast("payments", "get_payment_analytics")
+        total_transactions = sum(r["total_transactions"] for r in results)
+        completed_transactions = sum(r["completed_transactions"] for r in results)
+        total_volume = sum(r["total_volume"] for r in results)
+        total_fees = sum(r["total_fees_collected"] for r in results)
+
+        return {
+            "total_transactions": total_transactions,
+            "completed_transactions": completed_transactions,
+            "success_rate": completed_transactions / max(total_transactions, 1),
+            "total_volume": total_volume,
+            "total_fees_collected": total_fees,
+            "average_transaction_size": total_volume / max(completed_transactions, 1),
+            "revenue_from_fees": total_fees
+        }
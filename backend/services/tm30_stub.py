@@ -0,0 +1,117 @@
+"""
+Local TM30 Endpoint Stub for SiamStay
+Stand-in for the immigration batch API used in development and testing
+
+    python -m backend.services.tm30_stub --port 8930 --error-rate 0.1
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Tuple
+import argparse
+import json
+import random
+import threading
+import uuid
+
+
+class TM30StubHandler(BaseHTTPRequestHandler):
+    """Accepts ``POST /tm30/batches`` and answers per filing"""
+
+    server: "TM30StubServer"
+
+    def do_POST(self):
+        if self.path != "/tm30/batches":
+            self.send_error(404)
+            return
+
+        stub = self.server
+        if stub.random.random() < stub.batch_failure_rate:
+            self.send_error(503, "Service temporarily unavailable")
+            return
+
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        results = []
+        for filing in payload["filings"]:
+            results.append(stub.judge(filing))
+
+        with stub.lock:
+            stub.batches.append({"owner_id": payload["owner_id"], "size": len(results)})
+
+        body = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TM30StubServer(ThreadingHTTPServer):
+    """HTTP server recording every batch it receives
+
+    Filings without a passport number are rejected; ``error_rate`` and
+    ``batch_failure_rate`` inject transient per-filing and batch failures.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        error_rate: float = 0.0,
+        batch_failure_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        super().__init__(address, TM30StubHandler)
+        self.error_rate = error_rate
+        self.batch_failure_rate = batch_failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.batches: List[Dict[str, Any]] = []
+        self.accepted: Dict[str, str] = {}
+
+    def judge(self, filing: Dict[str, Any]) -> Dict[str, Any]:
+        booking_id = filing["booking_id"]
+        if not filing.get("passport_number"):
+            return {"booking_id": booking_id, "outcome": "rejected", "message": "Missing passport number"}
+        if self.random.random() < self.error_rate:
+            return {"booking_id": booking_id, "outcome": "error", "message": "Upstream timeout"}
+
+        with self.lock:
+            reference = self.accepted.setdefault(booking_id, f"TM30-{uuid.uuid4().hex[:10].upper()}")
+        return {"booking_id": booking_id, "outcome": "accepted", "reference": reference}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(port: int = 0, **kwargs) -> TM30StubServer:
+    """Start the stub on a background thread; ``port=0`` picks a free port"""
+
+    server = TM30StubServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local TM30 endpoint stub")
+    parser.add_argument("--port", type=int, default=8930)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--batch-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = TM30StubServer(
+        ("127.0.0.1", args.port),
+        error_rate=args.error_rate,
+        batch_failure_rate=args.batch_failure_rate
+    )
+    print(f"TM30 stub listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+TM30 Submission Pipeline for SiamStay
+Batched, rate-limited and crash-safe filing of guest residence notifications
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Callable, Tuple
+from enum import Enum
+from datetime import datetime, date, timedelta
+from pydantic import BaseModel
+import asyncio
+import json
+import logging
+import os
+
+from backend.core.metrics import REGISTRY
+from backend.core.rate_limit import AsyncRateLimiter, backoff_delay
+from backend.services.booking_engine import Booking, BookingEngine, BookingStatus
+from backend.services.booking_scheduler import BookingLifecycleScheduler, LifecycleAction
+
+logger = logging.getLogger(__name__)
+
+TM30_SUBMISSIONS = REGISTRY.counter(
+    "siamstay_tm30_submissions_total",
+    "TM30 filings by outcome",
+    ("outcome",),
+)
+
+TM30_OVERDUE = REGISTRY.counter(
+    "siamstay_tm30_overdue_total",
+    "TM30 filings still unacknowledged at the end of the legal window",
+    ("state",),
+)
+
+
+class TM30Outcome(str, Enum):
+    """Per-filing result reported by the immigration endpoint"""
+    ACCEPTED = "accepted"
+    REJECTED = "rejected"  # Permanent, needs manual correction
+    ERROR = "error"        # Transient, retried
+
+
+class TM30Filing(BaseModel):
+    """One guest notification waiting to be filed"""
+    booking_id: str
+    property_id: str
+    owner_id: str
+
+    guest_name: str
+    nationality: str
+    passport_number: Optional[str] = None
+    visa_type: Optional[str] = None
+    thai_address: Optional[str] = None
+    check_in: date
+    check_out: date
+
+    enqueued_at: datetime
+    attempts: int = 0
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+
+
+class TM30SubmissionResult(BaseModel):
+    """Endpoint answer for one filing"""
+    booking_id: str
+    outcome: TM30Outcome
+    reference: Optional[str] = None
+    message: Optional[str] = None
+
+
+class BaseTM30Client(ABC):
+    """Transport to the immigration TM30 system"""
+
+    @abstractmethod
+    async def submit_batch(
+        self,
+        owner_id: str,
+        filings: List[TM30Filing]
+    ) -> List[TM30SubmissionResult]:
+        """Submit filings for one owner; raise for batch-level failures"""
+        pass
+
+
+class HttpTM30Client(BaseTM30Client):
+    """TM30 client for the HTTP batch endpoint (and its local stub)"""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 10.0):
+        import httpx
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout)
+
+    async def submit_batch(
+        self,
+        owner_id: str,
+        filings: List[TM30Filing]
+    ) -> List[TM30SubmissionResult]:
+        response = await self._client.post("/tm30/batches", json={
+            "owner_id": owner_id,
+            "filings": [
+                filing.model_dump(mode="json", exclude={"attempts", "next_attempt_at", "last_error"})
+                for filing in filings
+            ]
+        })
+        response.raise_for_status()
+        return [TM30SubmissionResult(**item) for item in response.json()["results"]]
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class TM30QueueStore:
+    """Append-only journal of pending filings for crash recovery
+
+    Every enqueue, retry, completion and rejection is recorded as one JSON
+    line. ``save()``, ``remove()`` and ``reject()`` only buffer the line in
+    memory; ``drain()`` and ``write()`` (or ``flush()``) append the buffer
+    with a single fsync, so callers on the event loop can push the disk
+    write to a thread. ``load_state()`` replays the journal and
+    ``compact()`` rewrites it with only the pending and rejected filings.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._entries = 0
+        self._buffer: List[str] = []
+
+    def save(self, filing: TM30Filing):
+        self._buffer.append(json.dumps({"op": "put", "filing": filing.model_dump(mode="json")}))
+
+    def remove(self, booking_id: str):
+        self._buffer.append(json.dumps({"op": "del", "booking_id": booking_id}))
+
+    def reject(self, result: TM30SubmissionResult):
+        """Record a filing given up on, so a restart does not send it again"""
+        self._buffer.append(self._reject_line(result))
+
+    @staticmethod
+    def _reject_line(result: TM30SubmissionResult) -> str:
+        return json.dumps({"op": "reject", "result": result.model_dump(mode="json")})
+
+    def drain(self) -> List[str]:
+        """Take the buffered journal lines (call from the owning thread)"""
+        lines, self._buffer = self._buffer, []
+        return lines
+
+    def write(self, lines: List[str]):
+        """Append drained lines to the journal"""
+
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+            if self.fsync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        self._entries += len(lines)
+
+    def flush(self):
+        self.write(self.drain())
+
+    def load(self) -> Dict[str, TM30Filing]:
+        return self.load_state()[0]
+
+    def load_state(self) -> Tuple[Dict[str, TM30Filing], Dict[str, TM30SubmissionResult]]:
+        """Pending filings and rejections recorded in the journal"""
+
+        pending: Dict[str, TM30Filing] = {}
+        rejected: Dict[str, TM30SubmissionResult] = {}
+        if not os.path.exists(self.path):
+            return pending, rejected
+
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping torn TM30 journal line")
+                    continue
+                self._entries += 1
+                if record["op"] == "put":
+                    filing = TM30Filing(**record["filing"])
+                    pending[filing.booking_id] = filing
+                elif record["op"] == "reject":
+                    result = TM30SubmissionResult(**record["result"])
+                    rejected[result.booking_id] = result
+                    pending.pop(result.booking_id, None)
+                else:
+                    pending.pop(record["booking_id"], None)
+        return pending, rejected
+
+    def compact(
+        self,
+        pending: Dict[str, TM30Filing],
+        rejected: Optional[Dict[str, TM30SubmissionResult]] = None
+    ):
+        rejected = rejected or {}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            for filing in pending.values():
+                handle.write(json.dumps({"op": "put", "filing": filing.model_dump(mode="json")}) + "\n")
+            for result in rejected.values():
+                handle.write(self._reject_line(result) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.path)
+        self._entries = len(pending) + len(rejected)
+
+    @property
+    def entries(self) -> int:
+        return self._entries
+
+
+class TM30SubmissionQueue:
+    """Feeds check-ins to the TM30 system in per-owner batches
+
+    ``Booking.tm30_filed`` is only set once the endpoint acknowledges the
+    filing. Transient failures are retried with exponential backoff;
+    rejections are moved to ``rejected`` for manual follow-up and are
+    journaled, so they are not filed again after a restart. Given the
+    lifecycle scheduler, the queue handles its ``TM30_DUE`` deadline:
+    an overdue filing skips its backoff and an overdue rejection is
+    escalated. Enqueueing
+    never touches the disk: the journal is written from ``process_due`` in
+    a worker thread, and filings the journal does not have (not yet
+    flushed, or the journal was lost) are rebuilt from checked-in bookings.
+    """
+
+    def __init__(
+        self,
+        booking_engine: BookingEngine,
+        client: BaseTM30Client,
+        owner_resolver: Callable[[str], str],
+        store: Optional[TM30QueueStore] = None,
+        batch_size: int = 50,
+        requests_per_second: float = 2.0,
+        max_attempts: int = 10,
+        retry_base_seconds: float = 30.0,
+        scheduler: Optional[BookingLifecycleScheduler] = None
+    ):
+        self.booking_engine = booking_engine
+        self.client = client
+        self.owner_resolver = owner_resolver
+        self.store = store
+        self.batch_size = batch_size
+        self.limiter = AsyncRateLimiter(requests_per_second, name="tm30_submission")
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        self.pending: Dict[str, TM30Filing] = {}
+        self.rejected: Dict[str, TM30SubmissionResult] = {}
+        if store:
+            self.pending, self.rejected = store.load_state()
+        self._wakeup = asyncio.Event()
+
+        booking_engine.add_transition_listener(self._on_transition)
+        if scheduler is not None:
+            scheduler.set_handler(LifecycleAction.TM30_DUE, self.expedite_overdue)
+
+        if self.pending:
+            logger.info("Recovered %d pending TM30 filings", len(self.pending))
+        self.rebuild_from_bookings()
+
+    def _on_transition(self, booking: Booking, previous: Optional[BookingStatus]):
+        if booking.status == BookingStatus.CHECKED_IN and not booking.tm30_filed:
+            self.enqueue(booking)
+
+    def rebuild_from_bookings(self) -> int:
+        """Queue every checked-in, unfiled live booking not already pending"""
+
+        missing = [
+            booking for booking in self.booking_engine.bookings.values()
+            if booking.status == BookingStatus.CHECKED_IN
+            and not booking.tm30_filed
+            and booking.booking_id not in self.pending
+            and booking.booking_id not in self.rejected
+        ]
+        for booking in missing:
+            self.enqueue(booking)
+
+        if missing:
+            logger.info("Rebuilt %d TM30 filings from booking state", len(missing))
+        return len(missing)
+
+    async def expedite_overdue(self, booking: Booking):
+        """Lifecycle scheduler handler for ``TM30_DUE``"""
+
+        rejected = self.rejected.get(booking.booking_id)
+        if rejected is not None:
+            TM30_OVERDUE.inc(("rejected",))
+            logger.error(
+                "TM30 filing %s is overdue and needs manual correction: %s",
+                booking.booking_id, rejected.message
+            )
+            return
+
+        filing = self.pending.get(booking.booking_id)
+        if filing is None:
+            TM30_OVERDUE.inc(("missing",))
+            self.enqueue(booking)
+            return
+
+        TM30_OVERDUE.inc(("pending",))
+        logger.warning(
+            "TM30 filing %s is overdue after %d attempts, retrying now",
+            booking.booking_id, filing.attempts
+        )
+        filing.next_attempt_at = datetime.now()
+        if self.store:
+            self.store.save(filing)
+        self._wakeup.set()
+
+    def enqueue(self, booking: Booking) -> TM30Filing:
+        """Queue a checked-in booking for filing"""
+
+        existing = self.pending.get(booking.booking_id)
+        if existing:
+            return existing
+
+        guest = booking.guest
+        now = datetime.now()
+        filing = TM30Filing(
+            booking_id=booking.booking_id,
+            property_id=booking.property_id,
+            owner_id=self.owner_resolver(booking.property_id),
+            guest_name=f"{guest.first_name} {guest.last_name}",
+            nationality=guest.nationality,
+            passport_number=guest.passport_number,
+            visa_type=guest.visa_type,
+            thai_address=guest.thai_address,
+            check_in=booking.details.check_in,
+            check_out=booking.details.check_out,
+            enqueued_at=now,
+            next_attempt_at=now
+        )
+
+        self.pending[filing.booking_id] = filing
+        if self.store:
+            self.store.save(filing)
+        self._wakeup.set()
+
+        return filing
+
+    def _complete(self, booking_id: str):
+        self.pending.pop(booking_id, None)
+        if self.store:
+            self.store.remove(booking_id)
+
+    def _reject(self, result: TM30SubmissionResult):
+        self.rejected[result.booking_id] = result
+        self.pending.pop(result.booking_id, None)
+        if self.store:
+            self.store.reject(result)
+
+    def _acknowledge(self, result: TM30SubmissionResult):
+        try:
+            # Also reaches bookings archived while the filing was in flight
+            self.booking_engine.mark_tm30_filed(result.booking_id)
+        except ValueError:
+            logger.warning(
+                "TM30 acknowledged for unknown booking %s", result.booking_id
+            )
+        self._complete(result.booking_id)
+
+    def _retry_later(self, filing: TM30Filing, error: str, now: datetime):
+        filing.attempts += 1
+        filing.last_error = error
+
+        if filing.attempts >= self.max_attempts:
+            logger.error(
+                "Giving up on TM30 filing %s after %d attempts: %s",
+                filing.booking_id, filing.attempts, error
+            )
+            self._reject(TM30SubmissionResult(
+                booking_id=filing.booking_id,
+                outcome=TM30Outcome.ERROR,
+                message=error
+            ))
+            return
+
+        filing.next_attempt_at = now + timedelta(
+            seconds=backoff_delay(filing.attempts, base=self.retry_base_seconds)
+        )
+        if self.store:
+            self.store.save(filing)
+
+    async def _submit(self, owner_id: str, batch: List[TM30Filing]) -> Dict[str, int]:
+        await self.limiter.acquire()
+        now = datetime.now()
+        counts = {outcome.value: 0 for outcome in TM30Outcome}
+
+        try:
+            results = await self.client.submit_batch(owner_id, batch)
+        except Exception as e:
+            for filing in batch:
+                self._retry_later(filing, str(e), now)
+            counts[TM30Outcome.ERROR.value] += len(batch)
+            TM30_SUBMISSIONS.inc((TM30Outcome.ERROR.value,), len(batch))
+            return counts
+
+        answered = {result.booking_id: result for result in results}
+        for filing in batch:
+            result = answered.get(filing.booking_id) or TM30SubmissionResult(
+                booking_id=filing.booking_id,
+                outcome=TM30Outcome.ERROR,
+                message="Missing from batch response"
+            )
+
+            if result.outcome == TM30Outcome.ACCEPTED:
+                self._acknowledge(result)
+            elif result.outcome == TM30Outcome.REJECTED:
+                logger.error("TM30 filing %s rejected: %s", filing.booking_id, result.message)
+                self._reject(result)
+            else:
+                self._retry_later(filing, result.message or "error", now)
+
+            counts[result.outcome.value] += 1
+            TM30_SUBMISSIONS.inc((result.outcome.value,))
+
+        return counts
+
+    async def _flush_journal(self):
+        lines = self.store.drain()
+        if lines:
+            await asyncio.get_running_loop().run_in_executor(None, self.store.write, lines)
+
+    async def process_due(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Submit every filing whose next attempt is due, batched per owner"""
+
+        if self.store:
+            # Persist new filings before they are submitted
+            await self._flush_journal()
+
+        now = now or datetime.now()
+        by_owner: Dict[str, List[TM30Filing]] = {}
+        for filing in self.pending.values():
+            if filing.next_attempt_at <= now:
+                by_owner.setdefault(filing.owner_id, []).append(filing)
+
+        batches = [
+            (owner_id, filings[start:start + self.batch_size])
+            for owner_id, filings in by_owner.items()
+            for start in range(0, len(filings), self.batch_size)
+        ]
+        totals = {outcome.value: 0 for outcome in TM30Outcome}
+        for counts in await asyncio.gather(
+            *(self._submit(owner_id, batch) for owner_id, batch in batches)
+        ):
+            for outcome, count in counts.items():
+                totals[outcome] += count
+
+        if self.store:
+            await self._flush_journal()
+            live = len(self.pending) + len(self.rejected)
+            if self.store.entries > 4 * max(live, 256):
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.store.compact, dict(self.pending), dict(self.rejected)
+                )
+
+        return totals
+
+    async def run(self, poll_interval: float = 5.0):
+        """Process the queue until cancelled"""
+
+        while True:
+            await self.process_due()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,64 @@
+"""
+Shared test fixtures for SiamStay
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from backend.services.booking_engine import Booking, BookingEngine
+
+
+def guest_data(i: int = 0):
+    return {
+        "guest_id": f"guest_{i}",
+        "first_name": "Anna",
+        "last_name": "Muller",
+        "email": f"guest_{i}@example.com",
+        "phone": "+49 30 1234567",
+        "nationality": "DE",
+        "passport_number": f"C0{i}X4Y5Z6",
+    }
+
+
+PRICING = {
+    "base_rent": 30000,
+    "subtotal": 30000,
+    "total_amount": 33000,
+    "deposit_required": 10000,
+    "balance_due": 23000,
+}
+
+
+@pytest.fixture
+def make_booking():
+    """Factory for pending 35-night bookings checking in ``days_ahead`` from today"""
+
+    async def make(
+        engine: BookingEngine,
+        property_id: str = "prop_1",
+        days_ahead: int = 30,
+        guest: int = 0
+    ) -> Booking:
+        check_in = date.today() + timedelta(days=days_ahead)
+        return await engine.create_booking(
+            property_id,
+            guest_data(guest),
+            {"check_in": check_in, "check_out": check_in + timedelta(days=35), "guests_count": 1},
+            dict(PRICING),
+        )
+
+    return make
+
+
+@pytest.fixture
+def checked_in_booking(make_booking):
+    """Factory for bookings of guest ``i`` at ``prop_<i>`` checked in today"""
+
+    async def check_in(engine: BookingEngine, i: int = 0) -> Booking:
+        booking = await make_booking(engine, f"prop_{i}", days_ahead=0, guest=i)
+        await engine.confirm_booking(booking.booking_id)
+        await engine.check_in_guest(booking.booking_id, {})
+        return booking
+
+    return check_in
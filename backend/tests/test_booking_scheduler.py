@@ -0,0 +1,98 @@
+"""
+Booking lifecycle scheduler tests for SiamStay
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+
+from backend.services.booking_engine import BookingEngine
+from backend.services.booking_scheduler import BookingLifecycleScheduler, LifecycleAction
+
+
+def test_actions_without_handler_are_not_scheduled(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine)
+        booking = await make_booking(engine, days_ahead=2)
+        key = (booking.booking_id, LifecycleAction.CHECK_IN_INSTRUCTIONS)
+        assert scheduler.deadlines.due_at(key) is None
+
+        sent = []
+
+        async def send(booking):
+            sent.append(booking.booking_id)
+
+        scheduler.set_handler(LifecycleAction.CHECK_IN_INSTRUCTIONS, send)
+        due_at = scheduler.deadlines.due_at(key)
+        assert due_at is not None
+
+        await scheduler.run_due(due_at)
+        assert sent == [booking.booking_id]
+
+    asyncio.run(scenario())
+
+
+def test_failed_handler_is_retried_with_backoff(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine, retry_base_seconds=60)
+        booking = await make_booking(engine, days_ahead=2)
+        key = (booking.booking_id, LifecycleAction.CHECK_IN_INSTRUCTIONS)
+        calls = []
+
+        async def flaky(booking):
+            calls.append(booking.booking_id)
+            if len(calls) == 1:
+                raise ConnectionError("mail server unavailable")
+
+        scheduler.set_handler(LifecycleAction.CHECK_IN_INSTRUCTIONS, flaky)
+        due_at = scheduler.deadlines.due_at(key)
+
+        fired = await scheduler.run_due(due_at)
+        assert fired[0]["error"] == "mail server unavailable"
+        retry_at = scheduler.deadlines.due_at(key)
+        # 60s base with 10% jitter
+        assert retry_at >= due_at + timedelta(seconds=54)
+
+        # A transition keeps the retry time instead of resetting the deadline
+        await engine.confirm_booking(booking.booking_id)
+        assert scheduler.deadlines.due_at(key) == retry_at
+
+        assert await scheduler.run_due(retry_at - timedelta(seconds=1)) == []
+        fired = await scheduler.run_due(retry_at)
+        assert fired[0]["handled"] and len(calls) == 2
+        assert scheduler.deadlines.due_at(key) is None
+
+    asyncio.run(scenario())
+
+
+def test_payment_expiry_cancels_pending_booking(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine)
+        booking = await make_booking(engine, days_ahead=2)
+
+        await scheduler.run_due(datetime.now() + scheduler.policy.payment_expiry)
+        assert engine.get_booking(booking.booking_id).status == "cancelled"
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_no_show_keeps_the_rebooked_nights(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine)
+        no_show = await make_booking(engine, days_ahead=0)
+        await engine.confirm_booking(no_show.booking_id)
+        await scheduler.run_due(datetime.now() + scheduler.policy.no_show_grace + timedelta(days=1))
+        assert engine.get_booking(no_show.booking_id).status == "no_show"
+
+        rebooked = await make_booking(engine, days_ahead=0)
+        await engine.cancel_booking(no_show.booking_id)
+
+        details = rebooked.details
+        assert not engine.availability.check_availability(
+            "prop_1", details.check_in, details.check_out
+        )
+
+    asyncio.run(scenario())
@@ -0,0 +1,137 @@
+"""
+External calendar sync tests for SiamStay
+"""
+
+from datetime import date, timedelta
+import asyncio
+
+from backend.services.booking_engine import AvailabilityCalendar
+from backend.services.calendar_sync import CalendarFeedPublisher, CalendarSyncEngine
+from backend.services.ical_stub import start_stub_server
+
+DAY = date(2026, 1, 1)
+
+
+def ical(*events):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for uid, start, end in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{end:%Y%m%d}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines)
+
+
+def test_unchanged_feed_answers_304_and_changes_are_applied():
+    async def scenario():
+        stub = start_stub_server()
+        availability = AvailabilityCalendar()
+        engine = CalendarSyncEngine(availability)
+        feed = engine.add_feed("prop_1", stub.url("/villa.ics"))
+        try:
+            stub.set_feed("/villa.ics", ical(("a", DAY, DAY + timedelta(days=3))))
+            assert await engine.sync_feed(feed) == "updated"
+            assert feed.etag is not None
+            assert availability.busy_periods("prop_1") == [(DAY, DAY + timedelta(days=3))]
+
+            assert await engine.sync_feed(feed) == "not_modified"
+            assert stub.not_modified == 1
+
+            stub.set_feed("/villa.ics", ical(("a", DAY + timedelta(days=1), DAY + timedelta(days=4))))
+            assert await engine.sync_feed(feed) == "updated"
+            assert availability.busy_periods("prop_1") == [
+                (DAY + timedelta(days=1), DAY + timedelta(days=4))
+            ]
+        finally:
+            await engine.close()
+            stub.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_server_without_validators_is_deduplicated_by_content():
+    async def scenario():
+        stub = start_stub_server(conditional=False)
+        engine = CalendarSyncEngine(AvailabilityCalendar())
+        feed = engine.add_feed("prop_1", stub.url("/villa.ics"))
+        try:
+            stub.set_feed("/villa.ics", ical(("a", DAY, DAY + timedelta(days=3))))
+            assert await engine.sync_feed(feed) == "updated"
+            assert await engine.sync_feed(feed) == "unchanged"
+            assert feed.etag is None
+        finally:
+            await engine.close()
+            stub.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_validators_are_kept_back_when_apply_fails():
+    async def scenario():
+        stub = start_stub_server()
+        availability = AvailabilityCalendar()
+        engine = CalendarSyncEngine(availability)
+        feed = engine.add_feed("prop_1", stub.url("/villa.ics"))
+        try:
+            stub.set_feed("/villa.ics", ical(("a", DAY, DAY + timedelta(days=3))))
+            apply_events = engine.apply_events
+
+            def failing(feed, events):
+                raise RuntimeError("calendar unavailable")
+
+            engine.apply_events = failing
+            assert await engine.sync_feed(feed) == "failed"
+            assert feed.etag is None and feed.content_hash is None
+
+            # The next poll fetches the full body again instead of a 304
+            engine.apply_events = apply_events
+            assert await engine.sync_feed(feed) == "updated"
+            assert availability.busy_periods("prop_1") == [(DAY, DAY + timedelta(days=3))]
+        finally:
+            await engine.close()
+            stub.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_published_feed_honours_if_none_match():
+    availability = AvailabilityCalendar()
+    availability.block_dates("prop_1", DAY, DAY + timedelta(days=5), "book_1")
+    publisher = CalendarFeedPublisher(availability)
+
+    status, headers, body = publisher.respond("prop_1")
+    assert status == 200 and body
+
+    assert publisher.respond("prop_1", headers["ETag"])[0] == 304
+
+    availability.block_dates("prop_1", DAY + timedelta(days=10), DAY + timedelta(days=12), "book_2")
+    assert publisher.respond("prop_1", headers["ETag"])[0] == 200
+
+
+def test_days_held_by_a_booking_are_imported_once_released():
+    async def scenario():
+        stub = start_stub_server()
+        availability = AvailabilityCalendar()
+        availability.block_dates("prop_1", DAY + timedelta(days=2), DAY + timedelta(days=4), "book_1")
+        engine = CalendarSyncEngine(availability)
+        feed = engine.add_feed("prop_1", stub.url("/villa.ics"))
+        try:
+            stub.set_feed("/villa.ics", ical(("a", DAY, DAY + timedelta(days=5))))
+            assert await engine.sync_feed(feed) == "updated"
+            assert feed.conflicts == {"a": [DAY + timedelta(days=2), DAY + timedelta(days=3)]}
+
+            availability.release_hold("prop_1", DAY, DAY + timedelta(days=5), "book_1")
+            assert await engine.sync_feed(feed) == "not_modified"
+            assert not feed.conflicts
+            assert not availability.check_availability(
+                "prop_1", DAY + timedelta(days=2), DAY + timedelta(days=3)
+            )
+        finally:
+            await engine.close()
+            stub.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+"""
+Guest notification outbox tests for SiamStay
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+
+from backend.services.booking_engine import BookingEngine
+from backend.services.booking_scheduler import BookingLifecycleScheduler
+from backend.services.notifications import (
+    NotificationKind,
+    NotificationOutbox,
+    StubNotificationTransport,
+)
+
+
+def after_window(outbox: NotificationOutbox) -> datetime:
+    return datetime.now() + outbox.coalesce_window + timedelta(seconds=1)
+
+
+def test_events_for_one_guest_are_coalesced(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        transport = StubNotificationTransport()
+        outbox = NotificationOutbox(engine, transport, requests_per_second=1000)
+
+        first = await make_booking(engine, "prop_1")
+        second = await make_booking(engine, "prop_2")
+        await engine.confirm_booking(first.booking_id)
+        await engine.confirm_booking(second.booking_id)
+        await engine.cancel_booking(second.booking_id)
+
+        assert len(outbox.queue) == 1
+        await outbox.process_due(after_window(outbox))
+
+        assert transport.batches == [1]
+        (message,) = transport.delivered
+        # The cancellation superseded the second booking's confirmation
+        assert [(item.booking_id, item.kind) for item in message.items] == [
+            (first.booking_id, NotificationKind.BOOKING_CONFIRMED),
+            (second.booking_id, NotificationKind.BOOKING_CANCELLED),
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_sent_flag_is_set_only_after_delivery(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        transport = StubNotificationTransport(batch_failure_rate=1.0)
+        outbox = NotificationOutbox(engine, transport, requests_per_second=1000, retry_base_seconds=60)
+
+        booking = await make_booking(engine)
+        await engine.confirm_booking(booking.booking_id)
+
+        assert await outbox.process_due(after_window(outbox)) == {
+            "delivered": 0, "rejected": 0, "error": 1
+        }
+        assert not booking.confirmation_sent
+        (message,) = outbox.queue.values()
+        assert message.attempts == 1
+        # Retried with backoff: 60s base with 10% jitter
+        assert message.next_attempt_at > datetime.now() + timedelta(seconds=50)
+
+        transport.batch_failure_rate = 0.0
+        await outbox.process_due(message.next_attempt_at)
+        assert booking.confirmation_sent
+        assert not outbox.queue
+
+    asyncio.run(scenario())
+
+
+def test_check_in_instructions_come_from_the_scheduler(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine)
+        transport = StubNotificationTransport()
+        outbox = NotificationOutbox(engine, transport, requests_per_second=1000, scheduler=scheduler)
+
+        booking = await make_booking(engine, days_ahead=2)
+        await engine.confirm_booking(booking.booking_id)
+        await scheduler.run_due()
+
+        kinds = {item.kind for message in outbox.queue.values() for item in message.items}
+        assert NotificationKind.CHECK_IN_INSTRUCTIONS in kinds
+        assert not booking.check_in_instructions_sent
+
+        await outbox.process_due(after_window(outbox))
+        assert booking.check_in_instructions_sent
+
+    asyncio.run(scenario())
+
+
+def test_unsent_confirmations_are_rebuilt_at_startup(make_booking):
+    async def scenario():
+        engine = BookingEngine()
+        booking = await make_booking(engine)
+        await engine.confirm_booking(booking.booking_id)
+
+        # A fresh outbox (e.g. after a restart) finds the unsent confirmation
+        transport = StubNotificationTransport()
+        outbox = NotificationOutbox(engine, transport, requests_per_second=1000)
+        assert len(outbox.queue) == 1
+
+        await outbox.process_due(after_window(outbox))
+        assert booking.confirmation_sent
+        assert NotificationOutbox(engine, transport).queue == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,202 @@
+"""
+TM30 submission queue tests for SiamStay
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+
+from backend.services.booking_engine import BookingEngine
+from backend.services.booking_scheduler import BookingLifecycleScheduler, LifecycleAction
+from backend.services.tm30_stub import start_stub_server
+from backend.services.tm30_submission import (
+    BaseTM30Client,
+    HttpTM30Client,
+    TM30Outcome,
+    TM30QueueStore,
+    TM30SubmissionQueue,
+    TM30SubmissionResult,
+)
+
+
+class ScriptedClient(BaseTM30Client):
+    """Fails the first ``failures`` batches, then rejects filings without a passport"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches = []
+
+    async def submit_batch(self, owner_id, filings):
+        self.batches.append([filing.booking_id for filing in filings])
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("endpoint unavailable")
+        return [
+            TM30SubmissionResult(
+                booking_id=filing.booking_id,
+                outcome=TM30Outcome.ACCEPTED if filing.passport_number else TM30Outcome.REJECTED
+            )
+            for filing in filings
+        ]
+
+
+def make_queue(engine, client, **kwargs):
+    return TM30SubmissionQueue(
+        engine,
+        client,
+        owner_resolver=lambda property_id: "owner_1",
+        requests_per_second=1000,
+        **kwargs
+    )
+
+
+def test_transient_failure_is_retried_with_backoff(checked_in_booking):
+    async def scenario():
+        engine = BookingEngine()
+        client = ScriptedClient(failures=1)
+        queue = make_queue(engine, client, retry_base_seconds=60)
+        booking = await checked_in_booking(engine)
+
+        assert await queue.process_due() == {"accepted": 0, "rejected": 0, "error": 1}
+        filing = queue.pending[booking.booking_id]
+        assert filing.attempts == 1
+        assert filing.last_error == "endpoint unavailable"
+        # 60s base with 10% jitter
+        assert filing.next_attempt_at > datetime.now() + timedelta(seconds=50)
+        assert not booking.tm30_filed
+
+        # Not due yet: nothing is sent
+        await queue.process_due()
+        assert len(client.batches) == 1
+
+        assert (await queue.process_due(filing.next_attempt_at))["accepted"] == 1
+        assert booking.tm30_filed
+        assert not queue.pending
+
+    asyncio.run(scenario())
+
+
+def test_gives_up_after_max_attempts(checked_in_booking):
+    async def scenario():
+        engine = BookingEngine()
+        queue = make_queue(engine, ScriptedClient(failures=3), max_attempts=3, retry_base_seconds=0)
+        booking = await checked_in_booking(engine)
+
+        for _ in range(3):
+            await queue.process_due(datetime.now() + timedelta(seconds=1))
+
+        assert not queue.pending
+        assert queue.rejected[booking.booking_id].outcome == TM30Outcome.ERROR
+        assert not booking.tm30_filed
+
+    asyncio.run(scenario())
+
+
+def test_journal_is_written_by_the_worker(tmp_path, checked_in_booking):
+    async def scenario():
+        path = str(tmp_path / "tm30.jsonl")
+        engine = BookingEngine()
+        queue = make_queue(engine, ScriptedClient(failures=1), store=TM30QueueStore(path), retry_base_seconds=60)
+        booking = await checked_in_booking(engine)
+
+        # Enqueued from the check-in listener without touching the disk
+        assert not (tmp_path / "tm30.jsonl").exists()
+
+        await queue.process_due()
+        recovered = TM30QueueStore(path).load()
+        assert recovered[booking.booking_id].attempts == 1
+
+    asyncio.run(scenario())
+
+
+def test_pending_filings_are_rebuilt_from_bookings(checked_in_booking):
+    async def scenario():
+        engine = BookingEngine()
+        booking = await checked_in_booking(engine)
+
+        # No journal: the checked-in, unfiled booking is queued again
+        queue = make_queue(engine, ScriptedClient())
+        assert list(queue.pending) == [booking.booking_id]
+
+        # Acknowledged after check-out moved the booking to the archive
+        await engine.check_out_guest(booking.booking_id)
+        await queue.process_due()
+        assert engine.get_booking(booking.booking_id).tm30_filed
+
+    asyncio.run(scenario())
+
+
+def test_rejections_survive_a_restart(tmp_path, checked_in_booking):
+    async def scenario():
+        path = str(tmp_path / "tm30.jsonl")
+        engine = BookingEngine()
+        queue = make_queue(engine, ScriptedClient(), store=TM30QueueStore(path))
+        booking = await checked_in_booking(engine)
+        booking.guest.passport_number = None
+        queue.pending.clear()
+        queue.enqueue(booking)
+
+        assert (await queue.process_due())["rejected"] == 1
+
+        # The restarted queue neither rebuilds nor resends the rejected filing
+        client = ScriptedClient()
+        restarted = make_queue(engine, client, store=TM30QueueStore(path))
+        assert not restarted.pending
+        assert booking.booking_id in restarted.rejected
+        await restarted.process_due()
+        assert client.batches == []
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_expedites_overdue_filings(checked_in_booking):
+    async def scenario():
+        engine = BookingEngine()
+        scheduler = BookingLifecycleScheduler(engine)
+        client = ScriptedClient(failures=1)
+        queue = make_queue(engine, client, retry_base_seconds=300, scheduler=scheduler)
+        booking = await checked_in_booking(engine)
+
+        await queue.process_due()
+        filing = queue.pending[booking.booking_id]
+        assert filing.next_attempt_at > datetime.now() + timedelta(minutes=4)
+
+        # Reaching the TM30 deadline skips the remaining backoff
+        due_at = scheduler.deadlines.due_at((booking.booking_id, LifecycleAction.TM30_DUE))
+        await scheduler.run_due(due_at)
+        assert filing.next_attempt_at <= datetime.now()
+
+        assert (await queue.process_due())["accepted"] == 1
+        assert booking.tm30_filed
+
+    asyncio.run(scenario())
+
+
+def test_http_client_against_the_stub_endpoint(checked_in_booking):
+    async def scenario():
+        stub = start_stub_server(batch_failure_rate=1.0)
+        client = HttpTM30Client(stub.url)
+        engine = BookingEngine()
+        queue = make_queue(engine, client, retry_base_seconds=0)
+        try:
+            accepted = await checked_in_booking(engine, 0)
+            rejected = await checked_in_booking(engine, 1)
+            rejected.guest.passport_number = None
+            queue.pending.clear()
+            queue.rebuild_from_bookings()
+
+            # 503 for the whole batch: both filings are retried
+            assert await queue.process_due() == {"accepted": 0, "rejected": 0, "error": 2}
+            assert all(filing.attempts == 1 for filing in queue.pending.values())
+
+            stub.batch_failure_rate = 0.0
+            assert await queue.process_due(datetime.now() + timedelta(seconds=1)) == {
+                "accepted": 1, "rejected": 1, "error": 0
+            }
+            assert accepted.tm30_filed and accepted.booking_id in stub.accepted
+            assert queue.rejected[rejected.booking_id].message == "Missing passport number"
+            assert not rejected.tm30_filed and not queue.pending
+        finally:
+            await client.close()
+            stub.shutdown()
+
+    asyncio.run(scenario())